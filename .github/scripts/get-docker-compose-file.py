@@ -1,21 +1,18 @@
 #!/usr/bin/env python3
 """
 Helper script to determine the correct docker-compose file name for each instance.
+The mapping comes from x-instances in docker-compose.yml (deployment/topology.py).
 """
 import sys
+from pathlib import Path
 
-# Mapping from instance names to their docker-compose file names
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "deployment"))
+import topology
+
+# Mapping from instance names (aliases) to their docker-compose file names
 COMPOSE_FILES = {
-    'messaging': 'docker-compose.ec2-messaging.yml',
-    'db': 'docker-compose.ec2-db.yml',
-    'core': 'docker-compose.ec2-core.yml',
-    'api_gateway': 'docker-compose.api-gateway.yml',
-    'reportes': 'docker-compose.ec2-reportes.yml',
-    'notificaciones': 'docker-compose.ec2-notificaciones.yml',
-    'analytics': 'docker-compose.ec2-analytics.yml',
-    'monitoring': 'docker-compose.ec2-monitoring.yml',
-    'frontend': 'docker-compose.frontend.yml',
-    'bastion': 'docker-compose.ec2-bastion.yml',
+    instance['alias']: instance['compose_file']
+    for instance in topology.load().instances.values()
 }
 
 if __name__ == '__main__':
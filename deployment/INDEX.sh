@@ -124,9 +124,9 @@ cat << 'EOF'
   chmod +x deployment/scripts/*.sh
   ./deployment/scripts/deploy-all-instances.sh dev
 
-[OPCIÓN 3] Python Orchestrator (Requiere: Python 3, boto3)
+[OPCIÓN 3] Python Orchestrator (Requiere: Python 3, boto3, PyYAML)
 ──────────────────────────────────────────────────────────────
-  pip install boto3
+  pip install -r deployment/requirements.txt
   python3 deployment/orchestrator.py deploy-all --environment dev
 
 
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Backends de AWS para el Deployment Orchestrator
+Un backend expone los clientes ``ec2`` y ``ssm`` con la API de boto3 que usa
+el orquestador; FakeBackend los simula en proceso para pruebas y simulación
+"""
+
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from logstream import RESULT_PREFIX, STEP_END, STEP_PREFIX, stream_name
+
+# Latencias simuladas por defecto (segundos)
+DEFAULT_PULL_LATENCY = 20.0
+DEFAULT_START_LATENCY = 2.0
+COMMAND_OVERHEAD = 0.1
+
+# Funciones de paso de los scripts de despliegue (orchestrator.DEPLOY_SCRIPT_HELPERS)
+FUNCTION_START = re.compile(r"^(\w+)\(\) \{$")
+RUN_STEP = re.compile(r"^run_step (\S+) (\w+)( &[^|]*)?(?: \|\| deploy_result \d+)?$")
+DEPLOY_RESULT = re.compile(r"^deploy_result (\d+)$")
+# Espera de readiness.shell_wait que termina con ready_mark <contenedor> <check>
+READY_WAIT = re.compile(r"^ready_start=.*; ready_mark (\S+) (\S+)$")
+# Llamada a la función de calentamiento de un contenedor recién recreado
+WARMUP_CALL = re.compile(r'^\( warmup_\w+ \) \|\| echo "⚠️  Calentamiento de (\S+) ')
+
+
+class AwsBackend:
+    """Clientes reales de boto3"""
+
+    def __init__(self, region: str = "us-east-1"):
+        import boto3
+
+        self.ec2 = boto3.client("ec2", region_name=region)
+        self.ssm = boto3.client("ssm", region_name=region)
+        self.logs = boto3.client("logs", region_name=region)
+
+
+class FakeBackend:
+    """Backend en memoria que simula EC2 y SSM
+
+    Cada tag de ``instances`` tiene una o más réplicas running. Un comando SSM
+    dura la suma de sus pasos: ``docker pull`` según ``pull_latency`` por
+    imagen, ``docker run`` según ``start_latency`` por contenedor, la espera
+    de su healthcheck de protocolo según ``ready_latency``, su calentamiento
+    según ``warmup`` (contenedor -> {seconds, unit, items, bytes}), ``sleep N``
+    N segundos y COMMAND_OVERHEAD el resto. En los bloques ``if ...; then``
+    multilínea se simula siempre la rama ``else`` (el contenedor cambió). En
+    los scripts de despliegue, ``run_step <paso> <función>`` ejecuta el
+    cuerpo de la función (a la vez que los demás si termina en ``&``, hasta
+    el siguiente ``wait_steps``) y ``deploy_result`` imprime la línea RESULT
+    con los pasos simulados, todos con código de salida 0, las esperas de
+    readiness y los calentamientos. Los
+    tags en ``failures`` terminan en Failed. ``speedup`` divide el tiempo real
+    de espera para simular rollouts largos en segundos; los tiempos que se
+    reportan siguen en segundos simulados.
+
+    Con CloudWatchOutputConfig, la salida se escribe línea a línea en
+    ``<log group>/<stream>`` como si el log group fuera un directorio local
+    (el sustituto que lee logstream.FileLogSink).
+    """
+
+    def __init__(
+        self,
+        instances: Dict[str, int],
+        pull_latency: Optional[Dict[str, float]] = None,
+        start_latency: Optional[Dict[str, float]] = None,
+        ready_latency: Optional[Dict[str, float]] = None,
+        warmup: Optional[Dict[str, Dict]] = None,
+        default_pull_latency: float = DEFAULT_PULL_LATENCY,
+        default_start_latency: float = DEFAULT_START_LATENCY,
+        failures: Iterable[str] = (),
+        speedup: float = 1.0
+    ):
+        self.pull_latency = pull_latency or {}
+        self.start_latency = start_latency or {}
+        self.ready_latency = ready_latency or {}
+        self.warmup = warmup or {}
+        self.default_pull_latency = default_pull_latency
+        self.default_start_latency = default_start_latency
+        self.failures = set(failures)
+        self.speedup = speedup
+
+        ids = itertools.count(1)
+        self.instances: Dict[str, List[str]] = {
+            tag: [f"i-fake{next(ids):012x}" for _ in range(replicas)]
+            for tag, replicas in instances.items()
+        }
+        self.tags_by_id = {
+            instance_id: tag for tag, instance_ids in self.instances.items() for instance_id in instance_ids
+        }
+
+        self.ec2 = FakeEC2(self)
+        self.ssm = FakeSSM(self)
+
+    def step_duration(self, command: str) -> float:
+        """Duración simulada de una línea del script"""
+        parallel = re.match(r"printf '%s\\n' (.+?) \| xargs -P (\d+) -n 1 .*docker pull", command)
+        if parallel:
+            latencies = [self.pull_latency.get(image, self.default_pull_latency) for image in parallel.group(1).split()]
+            return self._makespan(latencies, int(parallel.group(2)))
+        pull = re.match(r"docker pull (\S+)", command)
+        if pull:
+            return self.pull_latency.get(pull.group(1), self.default_pull_latency)
+        run = re.search(r"docker run .*--name (\S+)", command)
+        if run:
+            return self.start_latency.get(run.group(1), self.default_start_latency)
+        ready = READY_WAIT.match(command)
+        if ready:
+            return self.ready_latency.get(ready.group(1), COMMAND_OVERHEAD)
+        warmup = WARMUP_CALL.match(command)
+        if warmup:
+            return float(self.warmup.get(warmup.group(1), {}).get("seconds", COMMAND_OVERHEAD))
+        if re.match(r"^\w+\(\) \{ .* \}$", command):
+            # Definición de una función de una línea
+            return 0.0
+        sleep = re.match(r"sleep (\d+(?:\.\d+)?)$", command)
+        if sleep:
+            return float(sleep.group(1))
+        return COMMAND_OVERHEAD
+
+    @staticmethod
+    def _makespan(durations: List[float], workers: int) -> float:
+        """Duración de ``durations`` repartidas entre ``workers`` slots (xargs -P toma la siguiente al liberarse uno)"""
+        slots = [0.0] * max(1, workers)
+        for duration in durations:
+            slots[slots.index(min(slots))] += duration
+        return max(slots)
+
+    def executed(self, commands: List[str]) -> Iterator[str]:
+        """Líneas que se ejecutan, saltando la rama ``then`` de los bloques multilínea"""
+        skipping = []
+        for command in commands:
+            if command.startswith("if ") and command.endswith("; then"):
+                skipping.append(True)
+                continue
+            if skipping and command == "else":
+                skipping[-1] = False
+                continue
+            if skipping and command == "fi":
+                skipping.pop()
+                continue
+            if not any(skipping):
+                yield command
+
+    def simulate(self, commands: List[str], started: float = 0.0) -> Tuple[List[Tuple[float, Optional[str]]], float]:
+        """(segundos desde el inicio al terminar cada línea, salida o None) en orden, y duración total"""
+        functions: Dict[str, List[str]] = {}
+        main: List[str] = []
+        body: Optional[List[str]] = None
+        for command in commands:
+            definition = FUNCTION_START.match(command)
+            if body is None and definition:
+                body = functions.setdefault(definition.group(1), [])
+            elif body is not None and command == "}":
+                body = None
+            elif body is not None:
+                body.append(command)
+            else:
+                main.append(command)
+
+        events: List[Tuple[float, Optional[str]]] = []
+        steps: List[Dict] = []
+        records: Dict[str, List[Dict]] = {"readiness": [], "warmup": []}
+        background: List[float] = []
+        offset = 0.0
+        for command in self.executed(main):
+            step = RUN_STEP.match(command)
+            result = DEPLOY_RESULT.match(command)
+            if step:
+                lane, function, parallel = step.groups()
+                end = self._run_lines(functions.get(function, []), offset, started, events, records)
+                events.append((end, f"{STEP_PREFIX} {self._wall(started, end)} [{lane}] {STEP_END}"))
+                steps.append({
+                    "step": lane, "exit_code": 0,
+                    "start": float(self._wall(started, offset)), "end": float(self._wall(started, end))
+                })
+                if parallel:
+                    background.append(end)
+                else:
+                    offset = end
+            elif command.startswith("wait_steps"):
+                offset = max([offset, *background])
+                background = []
+            elif result:
+                summary = {"exit_code": int(result.group(1)), "steps": steps, **records}
+                events.append((offset, f"{RESULT_PREFIX} {json.dumps(summary)}"))
+                break
+            else:
+                offset = self._run_lines([command], offset, started, events, records)
+        events.sort(key=lambda event: event[0])
+        return events, max([offset, *background])
+
+    def _run_lines(
+        self,
+        commands: List[str],
+        offset: float,
+        started: float,
+        events: List[Tuple[float, Optional[str]]],
+        records: Optional[Dict[str, List[Dict]]] = None
+    ) -> float:
+        """Simula ``commands`` en serie desde ``offset``; devuelve el offset final
+
+        En ``records`` se acumulan las entradas "readiness" y "warmup" de la línea RESULT.
+        """
+        for command in self.executed(commands):
+            step_start = offset
+            offset += self.step_duration(command)
+            echo = re.match(r"echo '(.*)'$", command)
+            marker = re.match(rf'echo "{STEP_PREFIX} \$\(date \+%s\.%N\) (.*)"$', command)
+            ready = READY_WAIT.match(command)
+            warmup = WARMUP_CALL.match(command)
+            span = {"start": float(self._wall(started, step_start)), "end": float(self._wall(started, offset))}
+            if ready and records is not None:
+                records["readiness"].append({"service": ready.group(1), "check": ready.group(2), "attempts": 1, **span})
+            if warmup:
+                # La función de calentamiento no se expande: su marcador y su entrada se simulan aquí
+                container = warmup.group(1)
+                events.append((step_start, f"{STEP_PREFIX} {span['start']:.6f} [{container}] Calentando {container}..."))
+                if records is not None and container in self.warmup:
+                    loaded = self.warmup[container]
+                    records["warmup"].append({
+                        "service": container, "unit": loaded.get("unit", "items"),
+                        "items": loaded.get("items", 0), "bytes": loaded.get("bytes", 0), **span
+                    })
+            if echo:
+                events.append((offset, echo.group(1)))
+            elif marker:
+                # Hora de pared, como la de `date` en la instancia
+                events.append((offset, f"{STEP_PREFIX} {self._wall(started, step_start)} {marker.group(1)}"))
+            else:
+                events.append((offset, None))
+        return offset
+
+    def _wall(self, started: float, offset: float) -> str:
+        return f"{(started + offset) / self.speedup:.6f}"
+
+    def timeline(self, commands: List[str], started: float) -> Iterator[Tuple[float, Optional[str]]]:
+        """(segundos desde el inicio al terminar la línea, salida de la línea o None)"""
+        return iter(self.simulate(commands, started)[0])
+
+    def estimate_duration(self, commands: List[str]) -> float:
+        return self.simulate(commands)[1]
+
+    def now(self) -> float:
+        """Reloj en segundos simulados"""
+        return time.time() * self.speedup
+
+
+class FakeEC2:
+    def __init__(self, backend: FakeBackend):
+        self.backend = backend
+
+    def describe_instances(self, Filters: List[Dict]) -> Dict:
+        return {"Reservations": self._reservations(Filters)}
+
+    def get_paginator(self, operation: str):
+        if operation == "describe_instance_status":
+            return _Paginator(self._instance_statuses)
+        if operation != "describe_instances":
+            raise NotImplementedError(operation)
+        return _Paginator(lambda **kwargs: [{"Reservations": self._reservations(kwargs.get("Filters", []))}])
+
+    def _instance_statuses(self, InstanceIds: List[str], IncludeAllInstances: bool = False) -> List[Dict]:
+        """Las instancias que ya no están en ``backend.instances`` figuran como terminadas"""
+        running = {instance_id for ids in self.backend.instances.values() for instance_id in ids}
+        return [{
+            "InstanceStatuses": [
+                {"InstanceId": instance_id, "InstanceState": {"Name": "running" if instance_id in running else "terminated"}}
+                for instance_id in InstanceIds
+                if IncludeAllInstances or instance_id in running
+            ]
+        }]
+
+    def _reservations(self, filters: List[Dict]) -> List[Dict]:
+        names = next((f["Values"] for f in filters if f["Name"] == "tag:Name"), list(self.backend.instances))
+        return [
+            {
+                "Instances": [
+                    {
+                        "InstanceId": instance_id,
+                        "LaunchTime": index,
+                        "Tags": [{"Key": "Name", "Value": tag}],
+                        "State": {"Name": "running"}
+                    }
+                    for index, instance_id in enumerate(self.backend.instances[tag])
+                ]
+            }
+            for tag in names if self.backend.instances.get(tag)
+        ]
+
+
+class FakeSSM:
+    def __init__(self, backend: FakeBackend):
+        self.backend = backend
+        self.invocations: Dict[str, Dict[str, Dict]] = {}
+        self.api_calls: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _count(self, operation: str):
+        with self._lock:
+            self.api_calls[operation] = self.api_calls.get(operation, 0) + 1
+
+    def send_command(
+        self,
+        DocumentName: str,
+        InstanceIds: List[str],
+        Parameters: Dict,
+        CloudWatchOutputConfig: Optional[Dict] = None
+    ) -> Dict:
+        self._count("send_command")
+        unknown = [instance_id for instance_id in InstanceIds if instance_id not in self.backend.tags_by_id]
+        if unknown:
+            raise ValueError(f"InvalidInstanceId: {', '.join(unknown)}")
+
+        commands = Parameters["commands"]
+        duration = self.backend.estimate_duration(commands)
+        now = self.backend.now()
+        with self._lock:
+            command_id = f"fake-{next(self._ids):08d}"
+            self.invocations[command_id] = {
+                instance_id: {
+                    "invoked": time.time(),
+                    "started": now,
+                    "duration": duration,
+                    "commands": commands,
+                    "fails": self.backend.tags_by_id[instance_id] in self.backend.failures
+                }
+                for instance_id in InstanceIds
+            }
+        if CloudWatchOutputConfig and CloudWatchOutputConfig.get("CloudWatchOutputEnabled"):
+            for instance_id in InstanceIds:
+                path = os.path.join(
+                    CloudWatchOutputConfig["CloudWatchLogGroupName"], stream_name(command_id, instance_id)
+                )
+                threading.Thread(
+                    target=self._stream_output,
+                    args=(path, self.invocations[command_id][instance_id]),
+                    daemon=True
+                ).start()
+        return {"Command": {"CommandId": command_id}}
+
+    def _stream_output(self, path: str, invocation: Dict):
+        """Escribe cada línea de salida cuando el script simulado llega a ella"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            for offset, line in self.backend.timeline(invocation["commands"], invocation["started"]):
+                wait = invocation["started"] + offset - self.backend.now()
+                if wait > 0:
+                    time.sleep(wait / self.backend.speedup)
+                if line is not None:
+                    f.write(line + "\n")
+                    f.flush()
+
+    def _invocation(self, command_id: str, instance_id: str) -> Dict:
+        invocation = self.invocations[command_id][instance_id]
+        elapsed = self.backend.now() - invocation["started"]
+
+        # Salida acumulada hasta el paso en curso, como la que SSM devuelve al terminar
+        output = [
+            line for offset, line in self.backend.timeline(invocation["commands"], invocation["started"])
+            if offset <= elapsed and line is not None
+        ]
+
+        if elapsed < invocation["duration"]:
+            status = "InProgress"
+        else:
+            status = "Failed" if invocation["fails"] else "Success"
+        return {
+            "CommandId": command_id,
+            "InstanceId": instance_id,
+            "Status": status,
+            "StandardOutputContent": "\n".join(output),
+            "StandardErrorContent": "simulated failure" if status == "Failed" else ""
+        }
+
+    def get_command_invocation(self, CommandId: str, InstanceId: str) -> Dict:
+        self._count("get_command_invocation")
+        return self._invocation(CommandId, InstanceId)
+
+    def get_paginator(self, operation: str):
+        if operation != "list_command_invocations":
+            raise NotImplementedError(operation)
+        return _Paginator(self._list_command_invocations)
+
+    def _list_command_invocations(
+        self,
+        CommandId: Optional[str] = None,
+        Details: bool = False,
+        Filters: Optional[List[Dict]] = None,
+        **kwargs
+    ) -> List[Dict]:
+        self._count("list_command_invocations")
+        # Como SSM, InvokedAfter (hora real, UTC) deja fuera las invocaciones anteriores
+        invoked_after = next((
+            datetime.strptime(f["value"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+            for f in Filters or [] if f["key"] == "InvokedAfter"
+        ), None)
+        with self._lock:
+            command_ids = [CommandId] if CommandId else list(self.invocations)
+        invocations = []
+        for command_id in command_ids:
+            for instance_id, record in self.invocations.get(command_id, {}).items():
+                if invoked_after is not None and record["invoked"] < invoked_after:
+                    continue
+                invocation = self._invocation(command_id, instance_id)
+                if Details:
+                    invocation["CommandPlugins"] = [{"Output": invocation["StandardOutputContent"]}]
+                invocations.append(invocation)
+        return [{"CommandInvocations": invocations}]
+
+
+class _Paginator:
+    def __init__(self, fetch):
+        self.fetch = fetch
+
+    def paginate(self, **kwargs):
+        return iter(self.fetch(**kwargs))
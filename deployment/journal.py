@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Journal de despliegues del Deployment Orchestrator
+Registro local append-only (JSONL, una línea por evento y fsync tras cada
+una) del progreso de deploy_all: estado de cada instancia, IDs resueltos,
+comandos SSM enviados, resultado de cada invocación con los digests
+descargados y pasos completados. Si el rollout falla o se interrumpe, la
+acción resume lo reconstruye desde aquí para seguir esperando los comandos
+que quedaron en curso y desplegar sólo lo que falta
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFAULT_JOURNAL = Path(__file__).resolve().parent.parent / ".deploy-journal.jsonl"
+JOURNAL_VERSION = 1
+
+# Estados de instancia registrados por el orquestador
+STARTED = "started"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def parse_digests(output: str) -> Dict[str, str]:
+    """Líneas "Digest <imagen>: <id>" que imprime el script de prefetch"""
+    digests = {}
+    for line in output.splitlines():
+        if line.startswith("Digest ") and ": " in line:
+            image, _, digest = line[len("Digest "):].partition(": ")
+            digests[image.strip()] = digest.strip()
+    return digests
+
+
+class RolloutState:
+    """Estado del último rollout reconstruido a partir de sus eventos"""
+
+    def __init__(self, start: Dict):
+        self.rollout_id: str = start["rollout"]
+        self.environment: str = start.get("environment", "dev")
+        self.order: List[str] = start.get("instances", [])
+        self.prefetch: bool = start.get("prefetch", True)
+        self.started_at: float = start["ts"]
+        self.finished = False
+        self.success = False
+        self.instances: Dict[str, str] = {}
+        # command_id -> {"phase", "targets": {instance_id: instance_tag}, "ts"}
+        self.commands: Dict[str, Dict] = {}
+        # (command_id, instance_id) -> {"status", "digests"}
+        self.invocations: Dict[Tuple[str, str], Dict] = {}
+        # instance_tag -> instance_id -> [paso, segundos] de los pasos terminados
+        self.steps: Dict[str, Dict[str, List]] = {}
+
+    def apply(self, event: Dict):
+        kind = event["event"]
+        if kind == "instance":
+            self.instances[event["instance"]] = event["status"]
+        elif kind == "command":
+            self.commands[event["command_id"]] = {
+                "phase": event["phase"], "targets": event["targets"], "ts": event["ts"]
+            }
+        elif kind == "invocation":
+            self.invocations[(event["command_id"], event["instance_id"])] = {
+                "status": event["status"],
+                "digests": event.get("digests", {})
+            }
+        elif kind == "steps":
+            self.steps.setdefault(event["instance"], {}).setdefault(event["instance_id"], []).extend(event["steps"])
+        elif kind == "end":
+            self.finished = True
+            self.success = event["success"]
+
+    def succeeded(self) -> List[str]:
+        return [tag for tag in self.order if self.instances.get(tag) == SUCCEEDED]
+
+    def in_flight(self) -> Dict[str, Dict[str, str]]:
+        """command_id -> {instance_id: instance_tag} de las invocaciones sin resultado"""
+        pending: Dict[str, Dict[str, str]] = {}
+        for command_id, command in self.commands.items():
+            for instance_id, instance_tag in command["targets"].items():
+                if (command_id, instance_id) not in self.invocations:
+                    pending.setdefault(command_id, {})[instance_id] = instance_tag
+        return pending
+
+    def in_flight_since(self) -> Optional[float]:
+        """Instante (epoch) en que se envió el más antiguo de los comandos en curso"""
+        pending = self.in_flight()
+        return min((self.commands[command_id]["ts"] for command_id in pending), default=None)
+
+    def completed_ids(self, instance_tag: str, phase: str) -> Set[str]:
+        """Réplicas de la instancia en las que un comando de ``phase`` terminó con éxito"""
+        return {
+            instance_id
+            for command_id, command in self.commands.items() if command["phase"] == phase
+            for instance_id, tag in command["targets"].items()
+            if tag == instance_tag and self.invocations.get((command_id, instance_id), {}).get("status") == "Success"
+        }
+
+
+class Journal:
+    """Journal JSONL; cada evento se escribe con flush + fsync antes de seguir"""
+
+    def __init__(self, path=DEFAULT_JOURNAL):
+        self.path = Path(path)
+        self.rollout_id: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def start(self, environment: str, instances: List[str], **options) -> str:
+        """Empieza un rollout nuevo; el journal anterior se reemplaza de forma atómica"""
+        self.rollout_id = uuid.uuid4().hex[:12]
+        record = self._record(
+            "start", version=JOURNAL_VERSION, environment=environment, instances=instances, **options
+        )
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w") as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        return self.rollout_id
+
+    def reopen(self, state: RolloutState):
+        """Sigue escribiendo en un rollout existente (resume)"""
+        self.rollout_id = state.rollout_id
+        self.append("resume")
+
+    def append(self, event: str, **fields):
+        if not self.rollout_id:
+            return
+        record = self._record(event, **fields)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load(self) -> Optional[RolloutState]:
+        """Estado del último rollout; una última línea cortada (proceso matado) se ignora"""
+        if not self.path.exists():
+            return None
+        state = None
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("event") == "start":
+                    state = RolloutState(event)
+                elif state and event.get("rollout") == state.rollout_id:
+                    state.apply(event)
+        return state
+
+    def _record(self, event: str, **fields) -> str:
+        record = {"ts": round(time.time(), 3), "rollout": self.rollout_id, "event": event, **fields}
+        return json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
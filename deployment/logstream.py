@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Streaming de la salida de los comandos SSM del Deployment Orchestrator
+SSM sólo devuelve StandardOutputContent al terminar y truncado a 24KB; con un
+sink (CloudWatch Logs, o un directorio local como sustituto) la salida se lee
+a medida que se escribe, se multiplexa por instancia y se extraen las
+duraciones de cada paso a partir de los marcadores STEP del script y el
+resultado estructurado (RESULT) con el código de salida de cada paso
+"""
+
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Marcador que emiten los scripts: "STEP <epoch> <texto>"
+STEP_PREFIX = "STEP"
+STEP_END = "Fin"
+STEP_PATTERN = re.compile(rf"^{STEP_PREFIX} (\d+(?:\.\d+)?) (.*)$")
+# Los pasos que el script ejecuta en paralelo marcan su carril: "STEP <epoch> [kafka] <texto>"
+LANE_PATTERN = re.compile(r"^\[([^\]]+)\] (.*)$")
+# Última línea del script: "RESULT {"exit_code": N, "steps": [{"step", "exit_code", "start", "end"}],
+# "readiness": [{"service", "check", "attempts", "start", "end"}],
+# "warmup": [{"service", "unit", "items", "bytes", "start", "end"}]}"
+RESULT_PREFIX = "RESULT"
+
+# Tipo de paso según el texto del marcador
+STEP_KINDS = [
+    ("Pulling", "pull"),
+    ("Sin cambios", "check"),
+    ("Deteniendo", "stop"),
+    ("Iniciando", "run"),
+    ("Calentando", "warmup"),
+    ("Esperando /health", "health"),
+    ("Esperando", "ready"),
+    ("Rolling", "rolling"),
+    ("Verificando", "verify"),
+]
+
+# Nombre del stream que SSM crea en CloudWatch para cada invocación
+STREAM_SUFFIX = "aws-runShellScript/stdout"
+
+
+def step_marker(text: str, lane: Optional[str] = None) -> str:
+    """Línea de script que marca el inicio de un paso con la hora de la instancia"""
+    if lane:
+        text = f"[{lane}] {text}"
+    return f"echo \"{STEP_PREFIX} $(date +%s.%N) {text}\""
+
+
+def step_kind(label: str) -> str:
+    for prefix, kind in STEP_KINDS:
+        if label.startswith(prefix):
+            return kind
+    return "other"
+
+
+def parse_steps(lines: List[str]) -> List[Tuple[str, float, Optional[float]]]:
+    """(texto, inicio, fin) de cada paso; fin es None si el script no llegó al siguiente marcador
+
+    Cada paso termina con el siguiente marcador de su mismo carril, así los
+    pasos que corren en paralelo no se cortan entre sí.
+    """
+    markers = []
+    for line in lines:
+        match = STEP_PATTERN.match(line)
+        if match:
+            lane = LANE_PATTERN.match(match.group(2))
+            lane_name, label = lane.groups() if lane else ("", match.group(2))
+            markers.append((lane_name, label, float(match.group(1))))
+
+    steps = []
+    for index, (lane, label, start) in enumerate(markers):
+        if label == STEP_END:
+            continue
+        end = next((marker[2] for marker in markers[index + 1:] if marker[0] == lane), None)
+        steps.append((label, start, end))
+    return steps
+
+
+def parse_result(output: str) -> Optional[Dict]:
+    """Resultado estructurado del script (línea RESULT) o None si no llegó a imprimirlo"""
+    for line in reversed(output.splitlines()):
+        if line.startswith(f"{RESULT_PREFIX} "):
+            try:
+                return json.loads(line[len(RESULT_PREFIX) + 1:])
+            except ValueError:
+                return None
+    return None
+
+
+def stream_name(command_id: str, instance_id: str) -> str:
+    return f"{command_id}/{instance_id}/{STREAM_SUFFIX}"
+
+
+class CloudWatchLogSink:
+    """Lee la salida que SSM envía a CloudWatch Logs (CloudWatchOutputConfig)"""
+
+    def __init__(self, logs, log_group: str):
+        self.logs = logs
+        self.log_group = log_group
+
+    def command_kwargs(self) -> Dict:
+        """Parámetros extra de send_command para que SSM publique la salida en el sink"""
+        return {
+            "CloudWatchOutputConfig": {
+                "CloudWatchLogGroupName": self.log_group,
+                "CloudWatchOutputEnabled": True
+            }
+        }
+
+    def read(self, command_id: str, instance_id: str, cursor: Optional[str]) -> Tuple[List[str], Optional[str]]:
+        """Líneas nuevas desde ``cursor`` y el cursor siguiente"""
+        kwargs = {
+            "logGroupName": self.log_group,
+            "logStreamName": stream_name(command_id, instance_id),
+            "startFromHead": True
+        }
+        if cursor:
+            kwargs["nextToken"] = cursor
+        try:
+            response = self.logs.get_log_events(**kwargs)
+        except Exception as e:
+            # El agente crea el stream con la primera línea de salida
+            if "ResourceNotFound" in str(e):
+                return [], cursor
+            raise
+        lines = [line for event in response.get("events", []) for line in event["message"].splitlines()]
+        return lines, response.get("nextForwardToken", cursor)
+
+
+class FileLogSink(CloudWatchLogSink):
+    """Sustituto local de CloudWatch: el log group es un directorio y cada stream un archivo"""
+
+    def __init__(self, directory: str):
+        super().__init__(None, directory)
+
+    def read(self, command_id: str, instance_id: str, cursor: Optional[int]) -> Tuple[List[str], Optional[int]]:
+        path = os.path.join(self.log_group, stream_name(command_id, instance_id))
+        offset = cursor or 0
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], cursor
+        # Sólo líneas completas; el resto se relee en la próxima llamada
+        complete = data.rfind(b"\n") + 1
+        lines = data[:complete].decode(errors="replace").splitlines()
+        return lines, offset + complete
+
+
+class LogTailer:
+    """Sigue varias invocaciones a la vez e imprime sus líneas con hora e instancia"""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.cursors: Dict[Tuple[str, str], Optional[object]] = {}
+        self.lines: Dict[Tuple[str, str], List[str]] = {}
+
+    def poll(self, invocations: Dict[Tuple[str, str], str]):
+        """Lee e imprime lo nuevo de cada (command_id, instance_id) -> instance_tag"""
+        for (command_id, instance_id), instance_tag in invocations.items():
+            key = (command_id, instance_id)
+            try:
+                lines, self.cursors[key] = self.sink.read(command_id, instance_id, self.cursors.get(key))
+            except Exception as e:
+                print(f"⚠️  Error leyendo logs de {instance_tag}: {str(e)}")
+                continue
+            self.lines.setdefault(key, []).extend(lines)
+            for line in lines:
+                print(self._format(instance_tag, instance_id, line))
+
+    def output(self, command_id: str, instance_id: str) -> str:
+        """Salida completa leída hasta ahora (sin el límite de 24KB de SSM)"""
+        return "\n".join(self.lines.get((command_id, instance_id), []))
+
+    def steps(self, command_id: str, instance_id: str) -> List[Tuple[str, str, Optional[float]]]:
+        """(tipo, texto, segundos) de cada paso; segundos es None si el paso no terminó"""
+        return [
+            (step_kind(label), label, end - start if end is not None else None)
+            for label, start, end in self.step_spans(command_id, instance_id)
+        ]
+
+    def step_spans(self, command_id: str, instance_id: str) -> List[Tuple[str, float, Optional[float]]]:
+        """(texto, inicio, fin) de cada paso con la hora de la instancia"""
+        return parse_steps(self.lines.get((command_id, instance_id), []))
+
+    @staticmethod
+    def _format(instance_tag: str, instance_id: str, line: str) -> str:
+        match = STEP_PATTERN.match(line)
+        if match:
+            stamp, line = float(match.group(1)), f"▶ {match.group(2)}"
+        else:
+            stamp = time.time()
+        return f"   [{datetime.fromtimestamp(stamp).strftime('%H:%M:%S')}] {instance_tag}/{instance_id} | {line}"
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Manifiestos declarativos de despliegue del Deployment Orchestrator
+Cada instancia EC2 se describe en manifests/<alias>.json: de qué instancias
+depende, su capacidad, si es exclusiva ("dedicated": el planificador de
+placement.py no le asigna otros contenedores) y, por contenedor, imagen,
+puertos, volúmenes, variables de entorno, health check, recursos
+(requests, limits y ulimits), calentamiento de datos tras recrearlo
+(warmup) y dependencias. Los puertos de los
+contenedores que declara la topología (topology.py) salen de ahí; si el
+manifiesto los repite deben coincidir, y un contenedor fuera de la topología
+tiene que declararlos. El orquestador compila cada manifiesto en un único
+script por host y guarda los scripts en un cache indexado por el hash del
+manifiesto, de las opciones de compilación y del código del compilador
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import topology
+
+MANIFESTS_DIR = Path(__file__).resolve().parent / "manifests"
+PLAN_CACHE_FILE = topology.REPO_ROOT / ".deploy-plan-cache.json"
+# Subir al cambiar el formato del cache; los cambios del código del compilador ya los detecta compiler_hash()
+COMPILER_VERSION = 6
+# Módulos que generan los scripts de despliegue (los _build_* del orquestador y sus helpers)
+COMPILER_SOURCES = ("orchestrator.py", "readiness.py", "logstream.py", "manifests.py")
+
+MANIFEST_KEYS = {"instance", "depends_on", "capacity", "dedicated", "containers"}
+CONTAINER_KEYS = {
+    "image", "ports", "volumes", "env", "healthcheck", "resources", "depends_on", "restart", "pinned", "warmup"
+}
+RESOURCE_KEYS = {"requests", "limits", "ulimits"}
+QUANTITY_KEYS = {"cpus", "memory"}
+HEALTHCHECK_TYPES = {"http", "tcp", "zookeeper", "kafka", "amqp"}
+# Claves de warmup según su type (las de la primera lista son obligatorias)
+WARMUP_KEYS = {
+    "redis": ({"snapshot"}, set()),
+    "postgres": ({"database"}, {"user", "tables", "queries"}),
+    "mongo": ({"collections"}, set()),
+}
+RESTART_POLICIES = {"no", "always", "unless-stopped", "on-failure"}
+MEMORY_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([bkmg]?)$", re.IGNORECASE)
+MEMORY_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+ULIMIT_PATTERN = re.compile(r"^-?\d+(:-?\d+)?$")
+
+
+class ManifestError(ValueError):
+    """Algún manifiesto es inválido o contradice la topología"""
+
+
+def parse_port_mapping(value) -> Tuple[int, int]:
+    """"80:5500" -> (80, 5500); "22" -> (22, 22)"""
+    published, _, target = str(value).partition(":")
+    published_port = int(published)
+    return published_port, int(target) if target else published_port
+
+
+def parse_memory(value) -> int:
+    """"512m" -> bytes, con las unidades de docker run --memory"""
+    match = MEMORY_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"memoria inválida '{value}' (ej: 512m, 1g)")
+    return int(float(match.group(1)) * MEMORY_UNITS[match.group(2).lower()])
+
+
+def format_memory(size: float) -> str:
+    return f"{size / 1024 ** 3:.2f}g" if abs(size) >= 1024 ** 3 else f"{size / 1024 ** 2:.0f}m"
+
+
+def _validate_quantities(where: str, quantities, errors: List[str]) -> Dict:
+    """{"cpus", "memory"} con cpus > 0 y memoria en formato docker; devuelve {"cpus", "memory" (bytes)}"""
+    if not isinstance(quantities, dict):
+        errors.append(f"{where}: debe ser un objeto con cpus y/o memory")
+        return {}
+    unknown = set(quantities) - QUANTITY_KEYS
+    if unknown:
+        errors.append(f"{where}: claves desconocidas: {', '.join(sorted(unknown))}")
+    parsed = {}
+    cpus = quantities.get("cpus")
+    if cpus is not None:
+        if not isinstance(cpus, (int, float)) or cpus <= 0:
+            errors.append(f"{where}.cpus debe ser un número positivo")
+        else:
+            parsed["cpus"] = cpus
+    if "memory" in quantities:
+        try:
+            parsed["memory"] = parse_memory(quantities["memory"])
+        except ValueError as e:
+            errors.append(f"{where}.memory: {e}")
+    return parsed
+
+
+def _validate_resources(where: str, resources, errors: List[str]):
+    if not isinstance(resources, dict):
+        errors.append(f"{where}: resources debe ser un objeto")
+        return
+    unknown = set(resources) - RESOURCE_KEYS
+    if unknown:
+        errors.append(f"{where}: resources con claves desconocidas: {', '.join(sorted(unknown))}")
+    requests = _validate_quantities(f"{where}: resources.requests", resources.get("requests", {}), errors)
+    limits = _validate_quantities(f"{where}: resources.limits", resources.get("limits", {}), errors)
+    for key in QUANTITY_KEYS:
+        if key in requests and key in limits and requests[key] > limits[key]:
+            errors.append(f"{where}: resources.requests.{key} supera resources.limits.{key}")
+    ulimits = resources.get("ulimits", {})
+    if not isinstance(ulimits, dict):
+        errors.append(f"{where}: resources.ulimits debe ser un objeto")
+        ulimits = {}
+    for name, value in ulimits.items():
+        if not re.match(r"^[a-z]+$", name) or not ULIMIT_PATTERN.match(str(value)):
+            errors.append(f"{where}: ulimit inválido {name}={value} (ej: nofile: \"65536:65536\")")
+
+
+def _validate_warmup(where: str, warmup, errors: List[str]) -> Optional[Dict]:
+    if not isinstance(warmup, dict) or warmup.get("type") not in WARMUP_KEYS:
+        errors.append(f"{where}: warmup.type debe ser uno de {', '.join(sorted(WARMUP_KEYS))}")
+        return None
+    required, optional = WARMUP_KEYS[warmup["type"]]
+    unknown = set(warmup) - required - optional - {"type"}
+    missing = required - set(warmup)
+    if unknown:
+        errors.append(f"{where}: warmup con claves desconocidas: {', '.join(sorted(unknown))}")
+    if missing:
+        errors.append(f"{where}: warmup {warmup['type']} sin {', '.join(sorted(missing))}")
+    lists = [key for key in ("tables", "queries", "collections") if key in warmup]
+    for key in lists:
+        if not isinstance(warmup[key], list) or not all(isinstance(item, str) and item for item in warmup[key]):
+            errors.append(f"{where}: warmup.{key} debe ser una lista de textos")
+    if warmup["type"] == "postgres" and not (warmup.get("tables") or warmup.get("queries")):
+        errors.append(f"{where}: warmup postgres sin tables ni queries")
+    collections = warmup.get("collections", [])
+    if isinstance(collections, list) and not all("." in str(name) for name in collections):
+        errors.append(f"{where}: warmup.collections usa \"base.colección\"")
+    return dict(warmup)
+
+
+def _normalize_container(
+    tag: str,
+    container: str,
+    spec: Dict,
+    topo: topology.Topology,
+    errors: List[str]
+) -> Optional[Dict]:
+    where = f"{tag}/{container}"
+    unknown = set(spec) - CONTAINER_KEYS
+    if unknown:
+        errors.append(f"{where}: claves desconocidas: {', '.join(sorted(unknown))}")
+    if not spec.get("image"):
+        errors.append(f"{where}: falta image")
+        return None
+
+    try:
+        ports = [list(parse_port_mapping(port)) for port in spec.get("ports", [])]
+    except ValueError:
+        errors.append(f"{where}: puertos inválidos {spec.get('ports')}")
+        return None
+    entry = topo.by_container(container)
+    if entry:
+        if entry["instance"] != tag:
+            errors.append(f"{where}: la topología lo ubica en {entry['instance']}")
+        expected = [entry["port"], entry["container_port"]]
+        if not ports:
+            ports = [expected]
+        elif ports[0] != expected:
+            errors.append(
+                f"{where}: puerto {ports[0][0]}:{ports[0][1]} distinto del de la topología "
+                f"{expected[0]}:{expected[1]}"
+            )
+    elif not ports:
+        errors.append(f"{where}: no está en la topología; declara ports (\"publicado:contenedor\")")
+        return None
+
+    healthcheck = spec.get("healthcheck")
+    if healthcheck:
+        if healthcheck.get("type") not in HEALTHCHECK_TYPES:
+            errors.append(f"{where}: healthcheck.type debe ser uno de {', '.join(sorted(HEALTHCHECK_TYPES))}")
+        elif healthcheck["type"] == "http" and not str(healthcheck.get("path", "")).startswith("/"):
+            errors.append(f"{where}: healthcheck http sin path")
+
+    resources = spec.get("resources", {})
+    _validate_resources(where, resources, errors)
+    if not isinstance(resources, dict):
+        resources = {}
+
+    warmup = _validate_warmup(where, spec["warmup"], errors) if "warmup" in spec else None
+
+    restart = spec.get("restart", "always")
+    if restart not in RESTART_POLICIES:
+        errors.append(f"{where}: restart debe ser uno de {', '.join(sorted(RESTART_POLICIES))}")
+
+    return {
+        "image": spec["image"],
+        "ports": ports,
+        "volumes": list(spec.get("volumes", [])),
+        "env": {str(key): str(value) for key, value in spec.get("env", {}).items()},
+        "healthcheck": healthcheck or None,
+        "resources": {
+            key: dict(resources[key]) if isinstance(resources.get(key), dict) else {} for key in RESOURCE_KEYS
+        },
+        "depends_on": list(spec.get("depends_on", [])),
+        "restart": restart,
+        "pinned": bool(spec.get("pinned", False)),
+        "warmup": warmup
+    }
+
+
+def load_manifests(
+    directory: Path = MANIFESTS_DIR,
+    topo: Optional[topology.Topology] = None
+) -> Dict[str, Dict]:
+    """Lee y valida todos los manifiestos; tag -> manifiesto normalizado, en el orden de la topología"""
+    topo = topo or topology.load()
+    errors = []
+    manifests = {}
+    containers = {}
+
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            with open(path) as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            errors.append(f"{path.name}: {e}")
+            continue
+        tag = raw.get("instance")
+        if tag not in topo.instances:
+            errors.append(f"{path.name}: instancia desconocida '{tag}'")
+            continue
+        if tag in manifests:
+            errors.append(f"{path.name}: {tag} ya tiene manifiesto")
+            continue
+
+        unknown = set(raw) - MANIFEST_KEYS
+        if unknown:
+            errors.append(f"{path.name}: claves desconocidas: {', '.join(sorted(unknown))}")
+        if "capacity" in raw:
+            _validate_quantities(f"{tag}: capacity", raw["capacity"], errors)
+
+        normalized = {}
+        bound_ports = {}
+        for container, spec in (raw.get("containers") or {}).items():
+            if container in containers:
+                errors.append(f"{tag}/{container}: contenedor repetido (también en {containers[container]})")
+                continue
+            containers[container] = tag
+            entry = _normalize_container(tag, container, spec, topo, errors)
+            if not entry:
+                continue
+            for published, _ in entry["ports"]:
+                if published in bound_ports:
+                    errors.append(f"{tag}/{container}: el puerto {published} ya lo usa {bound_ports[published]}")
+                bound_ports[published] = container
+            normalized[container] = entry
+        if not normalized:
+            errors.append(f"{path.name}: sin contenedores")
+
+        manifest = {"instance": tag, "depends_on": list(raw.get("depends_on", [])), "containers": normalized}
+        if "capacity" in raw:
+            manifest["capacity"] = dict(raw["capacity"])
+        if raw.get("dedicated"):
+            manifest["dedicated"] = True
+        unknown_dependencies = False
+        for container, entry in normalized.items():
+            unknown = [dep for dep in entry["depends_on"] if dep not in normalized]
+            if unknown:
+                unknown_dependencies = True
+                errors.append(f"{tag}/{container}: depends_on fuera de la instancia: {', '.join(unknown)}")
+        if not unknown_dependencies:
+            try:
+                start_order(manifest)
+            except ValueError as e:
+                errors.append(f"{tag}: {e}")
+        manifests[tag] = manifest
+
+    for tag, manifest in manifests.items():
+        unknown = [dep for dep in manifest["depends_on"] if dep not in manifests]
+        if unknown:
+            errors.append(f"{tag}: depende de instancias sin manifiesto: {', '.join(unknown)}")
+
+    if errors:
+        raise ManifestError("Manifiestos inválidos:\n" + "\n".join(f"  - {error}" for error in errors))
+    return {tag: manifests[tag] for tag in topo.instances if tag in manifests}
+
+
+def start_order(manifest: Dict) -> List[List[str]]:
+    """Grupos de contenedores que pueden arrancar a la vez; cada grupo espera a los anteriores"""
+    pending = {container: set(spec["depends_on"]) for container, spec in manifest["containers"].items()}
+    levels = []
+    while pending:
+        ready = [container for container, deps in pending.items() if not deps]
+        if not ready:
+            raise ValueError(f"dependencias circulares entre contenedores: {', '.join(pending)}")
+        levels.append(ready)
+        for container in ready:
+            del pending[container]
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return levels
+
+
+def manifest_hash(manifest: Dict) -> str:
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def to_instance_config(manifest: Dict) -> Dict:
+    """Entrada de instances_config (listas paralelas por contenedor) con el manifiesto completo"""
+    containers = manifest["containers"]
+    config = {
+        "images": [spec["image"] for spec in containers.values()],
+        "containers": list(containers),
+        "ports": [spec["ports"][0][0] for spec in containers.values()],
+        "volumes": [
+            volume.split(":")[0]
+            for spec in containers.values() for volume in spec["volumes"]
+            if not volume.startswith(("/", "."))
+        ],
+        "depends_on": manifest["depends_on"],
+        "manifest": manifest
+    }
+    health_paths = [
+        spec["healthcheck"]["path"] for spec in containers.values()
+        if spec["healthcheck"] and spec["healthcheck"]["type"] == "http"
+    ]
+    if health_paths:
+        config["health_path"] = health_paths[0]
+    return config
+
+
+_compiler_hash: Optional[str] = None
+
+
+def compiler_hash() -> str:
+    """Hash del código fuente de COMPILER_SOURCES: cualquier cambio en el compilador invalida el cache"""
+    global _compiler_hash
+    if _compiler_hash is None:
+        digest = hashlib.sha256()
+        for name in COMPILER_SOURCES:
+            digest.update(name.encode())
+            digest.update((Path(__file__).resolve().parent / name).read_bytes())
+        _compiler_hash = digest.hexdigest()
+    return _compiler_hash
+
+
+def compiler_version() -> str:
+    return f"{COMPILER_VERSION}:{compiler_hash()}"
+
+
+class PlanCache:
+    """Scripts compilados, indexados por hash del manifiesto, opciones y versión y código del compilador
+
+    Con ``path`` el cache se lee al crearlo y ``save`` lo reescribe de forma
+    atómica, descartando los scripts de manifiestos que ya cambiaron.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        if self.path and self.path.exists():
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+                if data.get("version") == compiler_version():
+                    self.entries = data["entries"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+    @staticmethod
+    def key(manifest: Dict, options: Dict) -> str:
+        payload = json.dumps({"manifest": manifest, "options": options, "version": compiler_version()}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_or_compile(self, manifest: Dict, options: Dict, compile: Callable[[], List[str]]) -> List[str]:
+        key = self.key(manifest, options)
+        entry = self.entries.get(key)
+        if entry:
+            self.hits += 1
+            return list(entry["commands"])
+        self.misses += 1
+        commands = compile()
+        self.entries[key] = {
+            "instance": manifest["instance"],
+            "manifest_hash": manifest_hash(manifest),
+            "options": options,
+            "commands": commands
+        }
+        return list(commands)
+
+    def save(self, manifests: Dict[str, Dict]):
+        if not self.path:
+            return
+        current = {manifest_hash(manifest) for manifest in manifests.values()}
+        entries = {key: entry for key, entry in self.entries.items() if entry["manifest_hash"] in current}
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": compiler_version(), "entries": entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  No se pudo guardar el cache de scripts: {str(e)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida los manifiestos y precompila el script de cada host")
+    parser.add_argument("--instance", help="Mostrar el script compilado de esta instancia")
+    parser.add_argument("--prefetched", action="store_true", help="Compilar el cutover sin pull (tras el prefetch)")
+    args = parser.parse_args()
+
+    # El compilador son los _build_* del orquestador, que a su vez importa este módulo
+    from backends import FakeBackend
+    from orchestrator import DeploymentOrchestrator
+
+    try:
+        orchestrator = DeploymentOrchestrator(backend=FakeBackend({}))
+    except (ManifestError, topology.TopologyError) as e:
+        print(f"❌ {e}")
+        return 1
+    orchestrator.plan_cache = PlanCache(PLAN_CACHE_FILE)
+
+    if args.instance:
+        config = orchestrator.instances_config.get(args.instance)
+        if not config:
+            print(f"❌ {args.instance} no tiene manifiesto")
+            return 1
+        print("\n".join(orchestrator._build_deploy_commands(args.instance, config, prefetched=args.prefetched)))
+        return 0
+
+    print(f"\n{'Instancia':<20} {'Hash':<18} {'Contenedores':>12} {'Líneas':>7} {'Bytes':>7}")
+    for tag, config in orchestrator.instances_config.items():
+        commands = orchestrator._build_deploy_commands(tag, config)
+        orchestrator._build_deploy_commands(tag, config, prefetched=True)
+        size = sum(len(command) + 1 for command in commands)
+        print(
+            f"{tag:<20} {manifest_hash(config['manifest']):<18} {len(config['containers']):>12} "
+            f"{len(commands):>7} {size:>7}"
+        )
+    orchestrator.plan_cache.save({tag: config["manifest"] for tag, config in orchestrator.instances_config.items()})
+    print(f"\n✅ {len(orchestrator.instances_config)} manifiestos válidos; scripts en {PLAN_CACHE_FILE.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,141 +5,374 @@ Coordina despliegues de imágenes Docker en múltiples instancias EC2
 """
 
 import argparse
-import boto3
 import json
+import os
+import re
+import shlex
+import threading
 import time
 import sys
-from typing import List, Dict, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, List, Dict, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+
+from backends import AwsBackend
+from journal import DEFAULT_JOURNAL, FAILED, SKIPPED, STARTED, SUCCEEDED, Journal, parse_digests
+import manifests
+from logstream import (
+    RESULT_PREFIX, STEP_END, CloudWatchLogSink, LogTailer, parse_result, parse_steps, step_kind, step_marker
+)
+from readiness import READY_TIMEOUT, AmqpReady, CommandSucceeds, KafkaReady, PortOpen, ZookeeperReady, shell_wait
+from telemetry import API_BUCKETS, Telemetry
+import topology
+
+# SSM admite como máximo 50 InstanceIds por send_command
+SSM_MAX_INSTANCE_IDS = 50
+SSM_TERMINAL_STATUSES = {"Success", "Failed", "Cancelled", "TimedOut"}
+
+# Backoff adaptativo del poller de comandos (segundos)
+POLL_MIN_INTERVAL = 1.0
+POLL_MAX_INTERVAL = 15.0
+POLL_BACKOFF = 1.5
+COMMAND_TIMEOUT = 300
+# Con streaming de logs el poller no se espacia más que esto
+LOG_TAIL_MAX_INTERVAL = 2.0
+# Margen de InvokedAfter en list_command_invocations (desfase de reloj y comandos recién enviados)
+INVOKED_AFTER_MARGIN = timedelta(minutes=5)
+
+# Vigencia de la caché de IDs de instancias (segundos)
+INSTANCE_CACHE_TTL = 300
+# Intervalo mínimo entre comprobaciones del estado de las instancias en caché durante un rollout
+INSTANCE_STATE_POLL_INTERVAL = 30
+
+# Estrategia rolling: el contenedor nuevo se valida en puerto + offset antes del swap
+ROLLING_SIDE_PORT_OFFSET = 10000
+HEALTH_CHECK_RETRIES = 30
+HEALTH_CHECK_INTERVAL = 2
+
+# Canary: muestras de /health por puerto y SLO que debe cumplir antes de seguir
+CANARY_SAMPLES = 20
+CANARY_MAX_ERROR_RATE = 0.01
+CANARY_MAX_P95 = 0.5
+CANARY_TIMEOUT = 120
+CANARY_INTERVAL = 10
+
+# Condición de cada tipo de healthcheck de los manifiestos que el script espera
+# (en la propia instancia) antes de dar el despliegue por terminado; los "http"
+# se validan con /health en la estrategia rolling y en el canary
+READINESS_CHECKS = {
+    "tcp": PortOpen,
+    "zookeeper": ZookeeperReady,
+    "kafka": KafkaReady,
+    "amqp": AmqpReady,
+}
+
+# Pulls simultáneos por host (xargs -P)
+PULL_PARALLELISM = 4
+
+# Calentamiento (warmup de los manifiestos) de un contenedor de datos recién
+# recreado: comando que indica que ya acepta clientes y plazo para esperarlo
+WARMUP_PROBES = {
+    "redis": "docker exec {container} redis-cli ping 2>/dev/null | grep -q PONG",
+    "postgres": "docker exec {container} pg_isready -q -U {user}",
+    "mongo": "docker exec {container} mongosh --quiet --eval 'db.runCommand({{ping: 1}}).ok' 2>/dev/null | grep -q 1",
+}
+WARMUP_TIMEOUT = 120
+
+# Funciones de shell al inicio de cada script de despliegue. run_step ejecuta
+# una función del script en un subshell y anota en $DEPLOY_STEPS su código de
+# salida y sus tiempos; wait_steps espera los pasos lanzados en segundo plano;
+# ready_mark anota en $DEPLOY_READY cuándo un servicio pasó su healthcheck,
+# warmup_mark en $DEPLOY_WARMUP lo que cargó el calentamiento de un contenedor
+# y deploy_result imprime la línea RESULT con todo ello y termina el script
+DEPLOY_SCRIPT_HELPERS = [
+    'DEPLOY_STEPS=$(mktemp); DEPLOY_READY=$(mktemp); DEPLOY_WARMUP=$(mktemp); pids=""',
+    'run_step() { start=$(date +%s.%N); ( "$2" ); code=$?; '
+    + step_marker(STEP_END, lane="$1")
+    + '; printf \'{"step": "%s", "exit_code": %d, "start": %s, "end": %s}\\n\' '
+    '"$1" "$code" "$start" "$(date +%s.%N)" >> "$DEPLOY_STEPS"; return $code; }',
+    'wait_steps() { failed=0; for pid in $pids; do wait $pid || failed=1; done; pids=""; return $failed; }',
+    'ready_mark() { printf \'{"service": "%s", "check": "%s", "attempts": %d, "start": %s, "end": %s}\\n\' '
+    '"$1" "$2" "$attempts" "$ready_start" "$(date +%s.%N)" >> "$DEPLOY_READY"; }',
+    'warmup_mark() { printf \'{"service": "%s", "unit": "%s", "items": %d, "bytes": %d, "start": %s, "end": %s}\\n\' '
+    '"$1" "$2" "$3" "$4" "$warmup_start" "$(date +%s.%N)" >> "$DEPLOY_WARMUP"; }',
+    f'deploy_result() {{ echo "{RESULT_PREFIX} {{\\"exit_code\\": $1, \\"steps\\": [$(paste -sd, "$DEPLOY_STEPS")], '
+    '\\"readiness\\": [$(paste -sd, "$DEPLOY_READY")], \\"warmup\\": [$(paste -sd, "$DEPLOY_WARMUP")]}"; '
+    'rm -f "$DEPLOY_STEPS" "$DEPLOY_READY" "$DEPLOY_WARMUP"; exit $1; }',
+]
+
+
+class InstanceResolver:
+    """Resuelve tags Name -> IDs de instancias con una sola consulta y caché TTL
+
+    Todas las etiquetas conocidas se resuelven con un único describe_instances
+    paginado. El resultado se guarda en memoria y, si se indica ``cache_file``,
+    también en disco para que ejecuciones posteriores no repitan la consulta
+    mientras no expire el TTL. Durante un rollout ``poll_states`` comprueba
+    el estado de las instancias en caché y retira las que dejaron de estar
+    running sin esperar al TTL.
+    """
+
+    def __init__(self, ec2, tags: List[str], ttl: int = INSTANCE_CACHE_TTL, cache_file: Optional[str] = None):
+        self.ec2 = ec2
+        self.tags = list(tags)
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self._instances: Dict[str, List[str]] = {}
+        self._fetched_at = 0.0
+        self._polled_at = 0.0
+        self._lock = threading.Lock()
+        self._load_cache_file()
+
+    def get_instance_ids(self, instance_tag: str) -> List[str]:
+        """Devuelve todas las instancias running con ese tag (más antiguas primero)"""
+        with self._lock:
+            if instance_tag not in self.tags:
+                self.tags.append(instance_tag)
+                self._fetched_at = 0.0
+            if time.time() - self._fetched_at > self.ttl:
+                self._refresh()
+            return list(self._instances.get(instance_tag, []))
+
+    def get_instance_id(self, instance_tag: str) -> Optional[str]:
+        """Devuelve la primera instancia running con ese tag"""
+        instance_ids = self.get_instance_ids(instance_tag)
+        return instance_ids[0] if instance_ids else None
+
+    def invalidate(self):
+        """Fuerza una nueva consulta en el próximo acceso"""
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def poll_states(self, min_interval: float = INSTANCE_STATE_POLL_INTERVAL) -> List[str]:
+        """Consulta con describe_instance_status el estado de las instancias en caché
+
+        Como mucho una vez cada ``min_interval`` segundos. Cada instancia que
+        ya no está running se pasa a ``handle_state_change`` como un evento
+        de cambio de estado. Devuelve los IDs retirados.
+        """
+        with self._lock:
+            if time.time() - self._polled_at < min_interval:
+                return []
+            self._polled_at = time.time()
+            instance_ids = sorted({instance_id for ids in self._instances.values() for instance_id in ids})
+        if not instance_ids:
+            return []
+
+        changed = []
+        paginator = self.ec2.get_paginator("describe_instance_status")
+        for page in paginator.paginate(InstanceIds=instance_ids, IncludeAllInstances=True):
+            for status in page.get("InstanceStatuses", []):
+                state = status["InstanceState"]["Name"]
+                if state != "running":
+                    changed.append(status["InstanceId"])
+                    self.handle_state_change({"detail": {"instance-id": status["InstanceId"], "state": state}})
+        return changed
+
+    def handle_state_change(self, event: Dict):
+        """Invalida la caché ante un evento "EC2 Instance State-change Notification"
+
+        Una instancia que deja de estar running se retira de inmediato; una
+        que pasa a running puede pertenecer a cualquier tag, así que se
+        marca la caché como expirada.
+        """
+        detail = event.get("detail", {})
+        instance_id = detail.get("instance-id")
+        state = detail.get("state")
+        if not instance_id or not state:
+            return
+
+        with self._lock:
+            if state == "running":
+                self._fetched_at = 0.0
+                return
+            for instance_ids in self._instances.values():
+                if instance_id in instance_ids:
+                    instance_ids.remove(instance_id)
+            self._save_cache_file()
+
+    def _refresh(self):
+        """Resuelve todas las etiquetas con un describe_instances paginado"""
+        found: Dict[str, List[Tuple[datetime, str]]] = {tag: [] for tag in self.tags}
+        paginator = self.ec2.get_paginator("describe_instances")
+        pages = paginator.paginate(
+            Filters=[
+                {"Name": "tag:Name", "Values": self.tags},
+                {"Name": "instance-state-name", "Values": ["running"]}
+            ]
+        )
+
+        for page in pages:
+            for reservation in page["Reservations"]:
+                for instance in reservation["Instances"]:
+                    name = next(
+                        (tag["Value"] for tag in instance.get("Tags", []) if tag["Key"] == "Name"),
+                        None
+                    )
+                    if name in found:
+                        found[name].append((instance.get("LaunchTime", datetime.min), instance["InstanceId"]))
+
+        self._instances = {
+            tag: [instance_id for _, instance_id in sorted(instances, key=lambda item: str(item[0]))]
+            for tag, instances in found.items()
+        }
+        self._fetched_at = time.time()
+        self._save_cache_file()
+
+    def _load_cache_file(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+            if set(self.tags) <= set(data["instances"]) and time.time() - data["fetched_at"] <= self.ttl:
+                self._instances = data["instances"]
+                self._fetched_at = data["fetched_at"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Caché de instancias ignorada ({self.cache_file}): {str(e)}")
+
+    def _save_cache_file(self):
+        if not self.cache_file:
+            return
+        try:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump({"fetched_at": self._fetched_at, "instances": self._instances}, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"⚠️  No se pudo guardar la caché de instancias: {str(e)}")
+
 
 class DeploymentOrchestrator:
     """Orquestador de despliegues en instancias EC2"""
     
-    def __init__(self, region: str = "us-east-1"):
-        self.ec2 = boto3.client("ec2", region_name=region)
-        self.ssm = boto3.client("ssm", region_name=region)
+    def __init__(
+        self,
+        region: str = "us-east-1",
+        instance_cache_ttl: int = INSTANCE_CACHE_TTL,
+        instance_cache_file: Optional[str] = None,
+        backend=None
+    ):
+        # backend expone clientes ec2/ssm con la API de boto3 (AwsBackend o FakeBackend)
+        backend = backend or AwsBackend(region)
+        self.ec2 = backend.ec2
+        self.ssm = backend.ssm
+        self.logs = getattr(backend, "logs", None)
         self.region = region
         
-        # Mapping de instancias a imágenes
+        # Poller de comandos SSM (el simulador los escala junto con las latencias)
+        self.poll_min_interval = POLL_MIN_INTERVAL
+        self.poll_max_interval = POLL_MAX_INTERVAL
+        self.command_timeout = COMMAND_TIMEOUT
+        
+        # Inicio y fin (segundos desde el arranque del rollout) de cada instancia en el último deploy_all
+        self.deploy_timings: Dict[str, Dict[str, float]] = {}
+        
+        # Sink de logs (CloudWatchLogSink o FileLogSink); si hay uno, la salida se sigue en vivo
+        # y step_timings guarda tag -> instance_id -> [(tipo, paso, segundos)]
+        self.log_sink = None
+        self.step_timings: Dict[str, Dict[str, List[Tuple[str, str, Optional[float]]]]] = {}
+        # tag -> servicio -> segundos hasta pasar su healthcheck de protocolo (línea RESULT)
+        self.readiness_latency: Dict[str, Dict[str, float]] = {}
+        # tag -> contenedor -> {unit, items, bytes, seconds} de su último calentamiento
+        self.warmup_stats: Dict[str, Dict[str, Dict]] = {}
+        
+        # Spans e histogramas por fase (exportables a Prometheus y como traza OTLP)
+        self.telemetry = Telemetry()
+        
+        # Journal de deploy_all (journal.Journal); si hay uno, la acción resume retoma el último rollout
+        self.journal = None
+        
+        # Si es False sólo se recrean los contenedores cuya imagen cambió
+        self.force_recreate = False
+        
+        # "recreate" reemplaza los contenedores directamente; "rolling" los
+        # valida uno a uno en un puerto lateral (sólo instancias con "health_path")
+        self.strategy = "recreate"
+        self.canary = False
+        self.canary_max_error_rate = CANARY_MAX_ERROR_RATE
+        self.canary_max_p95 = CANARY_MAX_P95
+        self.canary_timeout = CANARY_TIMEOUT
+        self.canary_interval = CANARY_INTERVAL
+        self.readiness_timeout = READY_TIMEOUT
+        # Opt-in (--warmup): los contenedores con "warmup" calientan sus datos al recrearse
+        self.warmup = False
+        self._rollout_started = time.time()
+        
+        # Una entrada por manifiesto (manifests/*.json) con los puertos de la topología compilada
+        # "depends_on" define el grafo usado por deploy_all para ordenar y paralelizar
+        # "health_path" marca los servicios HTTP que admiten la estrategia rolling
+        self.topology = topology.load()
         self.instances_config = {
-            "EC2-Bastion": {
-                "images": ["bastion-host:latest"],
-                "containers": ["bastion-host"],
-                "ports": [22]
-            },
-            "EC2-API-Gateway": {
-                "images": ["api-gateway:latest"],
-                "containers": ["api-gateway"],
-                "ports": [8080]
-            },
-            "EC2-CORE": {
-                "images": [
-                    "micro-auth:latest",
-                    "micro-estudiantes:latest",
-                    "micro-maestros:latest",
-                    "micro-core:latest"
-                ],
-                "containers": [
-                    "micro-auth",
-                    "micro-estudiantes",
-                    "micro-maestros",
-                    "micro-core"
-                ],
-                "ports": [3001, 3002, 3003, 3004]
-            },
-            "EC2-Reportes": {
-                "images": [
-                    "micro-reportes-estudiantes:latest",
-                    "micro-reportes-maestros:latest"
-                ],
-                "containers": [
-                    "micro-reportes-estudiantes",
-                    "micro-reportes-maestros"
-                ],
-                "ports": [4001, 4002]
-            },
-            "EC2-Notificaciones": {
-                "images": ["micro-notificaciones:latest"],
-                "containers": ["micro-notificaciones"],
-                "ports": [5000]
-            },
-            "EC2-Messaging": {
-                "images": [
-                    "proyecto-zookeeper:1.0",
-                    "proyecto-kafka:1.0",
-                    "proyecto-rabbitmq:1.0"
-                ],
-                "containers": ["zookeeper", "kafka", "rabbitmq"],
-                "ports": [2181, 9092, 5672]
-            },
-            "EC2-DB": {
-                "images": [
-                    "mongo:latest",
-                    "postgres:latest",
-                    "redis:latest"
-                ],
-                "containers": ["mongo", "postgres", "redis"],
-                "ports": [27017, 5432, 6379],
-                "volumes": ["mongo_data", "postgres_data", "redis_data"]
-            },
-            "EC2-Analytics": {
-                "images": ["micro-analytics:latest"],
-                "containers": ["micro-analytics"],
-                "ports": [6000]
-            },
-            "EC2-Monitoring": {
-                "images": [
-                    "proyecto-prometheus:1.0",
-                    "proyecto-grafana:1.0"
-                ],
-                "containers": ["prometheus", "grafana"],
-                "ports": [9090, 3000],
-                "volumes": ["prometheus_data", "grafana_data"]
-            },
-            "EC2-Frontend": {
-                "images": ["frontend-web:latest"],
-                "containers": ["frontend-web"],
-                "ports": [80, 443]
-            }
+            tag: manifests.to_instance_config(manifest)
+            for tag, manifest in manifests.load_manifests(topo=self.topology).items()
         }
+        
+        # Scripts compilados por hash de manifiesto y opciones; en disco con manifests.PlanCache(path)
+        self.plan_cache = manifests.PlanCache()
+        
+        self.resolver = InstanceResolver(
+            self.ec2,
+            list(self.instances_config.keys()),
+            ttl=instance_cache_ttl,
+            cache_file=instance_cache_file
+        )
     
     def get_instance_id(self, instance_tag: str) -> Optional[str]:
         """Obtiene el ID de una instancia por tag"""
+        instance_ids = self.get_instance_ids(instance_tag)
+        return instance_ids[0] if instance_ids else None
+    
+    def get_instance_ids(self, instance_tag: str) -> List[str]:
+        """Obtiene los IDs de todas las instancias running con ese tag"""
         try:
-            response = self.ec2.describe_instances(
-                Filters=[
-                    {"Name": "tag:Name", "Values": [instance_tag]},
-                    {"Name": "instance-state-name", "Values": ["running"]}
-                ]
-            )
-            
-            if response["Reservations"]:
-                return response["Reservations"][0]["Instances"][0]["InstanceId"]
-            return None
+            with self._api_timer("get_instance_ids"):
+                return self.resolver.get_instance_ids(instance_tag)
         except Exception as e:
             print(f"❌ Error obteniendo instancia {instance_tag}: {str(e)}")
-            return None
+            return []
     
-    def send_deploy_command(self, instance_id: str, commands: List[str]) -> str:
-        """Envía comandos de despliegue a una instancia"""
+    def refresh_instance_states(self):
+        """Retira de la caché las instancias que dejaron de estar running (antes de lanzar más despliegues)"""
         try:
-            response = self.ssm.send_command(
-                DocumentName="AWS-RunShellScript",
-                InstanceIds=[instance_id],
-                Parameters={"commands": commands}
-            )
+            with self._api_timer("describe_instance_status"):
+                changed = self.resolver.poll_states()
+        except Exception as e:
+            print(f"⚠️  Error comprobando el estado de las instancias: {str(e)}")
+            return
+        if changed:
+            print(f"🔄 Instancias que ya no están running: {', '.join(changed)}")
+
+    def send_deploy_command(self, instance_ids: Union[str, List[str]], commands: List[str]) -> str:
+        """Envía comandos de despliegue a una o varias instancias en un solo send_command"""
+        if isinstance(instance_ids, str):
+            instance_ids = [instance_ids]
+        try:
+            with self.telemetry.span("ssm.send_command", instances=len(instance_ids)) as span, \
+                    self._api_timer("send_command"):
+                response = self.ssm.send_command(
+                    DocumentName="AWS-RunShellScript",
+                    InstanceIds=instance_ids,
+                    Parameters={"commands": commands},
+                    **(self.log_sink.command_kwargs() if self.log_sink else {})
+                )
+                span["attributes"]["command_id"] = response["Command"]["CommandId"]
             return response["Command"]["CommandId"]
         except Exception as e:
             print(f"❌ Error enviando comando: {str(e)}")
+            if "InvalidInstanceId" in str(e):
+                # La instancia cambió de estado desde la última resolución
+                self.resolver.invalidate()
             return None
     
     def get_command_status(self, command_id: str, instance_id: str) -> Dict:
         """Obtiene el estado de un comando"""
         try:
-            response = self.ssm.get_command_invocation(
-                CommandId=command_id,
-                InstanceId=instance_id
-            )
+            with self._api_timer("get_command_invocation"):
+                response = self.ssm.get_command_invocation(
+                    CommandId=command_id,
+                    InstanceId=instance_id
+                )
             return {
                 "status": response["Status"],
                 "stdout": response.get("StandardOutputContent", ""),
@@ -149,17 +382,81 @@ class DeploymentOrchestrator:
             print(f"⚠️  Error obteniendo estado: {str(e)}")
             return None
     
-    def deploy_instance(self, instance_tag: str, wait: bool = True) -> bool:
-        """Despliega imágenes en una instancia"""
+    def list_command_statuses(
+        self,
+        command_ids: List[str],
+        invoked_after: datetime
+    ) -> Dict[Tuple[str, str], Dict]:
+        """Obtiene en una sola consulta paginada el estado de todos los comandos en curso
+
+        Devuelve un dict indexado por (command_id, instance_id). Con un único
+        comando se filtra por CommandId; con varios se listan las invocaciones
+        recientes y se descartan las que no pertenecen a este despliegue.
+        """
+        params = {"Details": True}
+        if len(command_ids) == 1:
+            params["CommandId"] = command_ids[0]
+        else:
+            params["Filters"] = [{
+                "key": "InvokedAfter",
+                "value": invoked_after.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            }]
+
+        wanted = set(command_ids)
+        statuses = {}
+        try:
+            with self._api_timer("list_command_invocations"):
+                pages = list(self.ssm.get_paginator("list_command_invocations").paginate(**params))
+            for page in pages:
+                for invocation in page.get("CommandInvocations", []):
+                    if invocation["CommandId"] not in wanted:
+                        continue
+                    output = "".join(
+                        plugin.get("Output", "") for plugin in invocation.get("CommandPlugins", [])
+                    )
+                    statuses[(invocation["CommandId"], invocation["InstanceId"])] = {
+                        "status": invocation["Status"],
+                        "stdout": output,
+                        "stderr": ""
+                    }
+        except Exception as e:
+            print(f"⚠️  Error listando invocaciones: {str(e)}")
+        return statuses
+    
+    def deploy_instance(
+        self,
+        instance_tag: str,
+        wait: bool = True,
+        prefetch: bool = False,
+        prefetched: bool = False
+    ) -> bool:
+        """Despliega imágenes en una instancia
+
+        Con ``prefetch`` primero descarga las imágenes sin tocar los
+        contenedores; con ``prefetched`` (o tras el prefetch) el script de
+        cutover no hace pull y sólo reinicia contenedores.
+        """
+        if prefetch and not prefetched:
+            if not self.prefetch([instance_tag]).get(instance_tag, False):
+                print(f"❌ Prefetch de {instance_tag} falló; los contenedores actuales siguen en marcha")
+                return False
+            prefetched = True
+        
+        with self.telemetry.span("deploy_instance", instance=instance_tag, prefetched=prefetched) as span:
+            success = self._deploy_instance(instance_tag, wait, prefetched)
+            span["error"] = not success
+        return success
+    
+    def _deploy_instance(self, instance_tag: str, wait: bool, prefetched: bool) -> bool:
         print(f"\n🚀 Iniciando despliegue en {instance_tag}...")
         
-        # Obtener ID de la instancia
-        instance_id = self.get_instance_id(instance_tag)
-        if not instance_id:
+        # Obtener IDs de las instancias (todas las réplicas running con ese tag)
+        instance_ids = self.get_instance_ids(instance_tag)
+        if not instance_ids:
             print(f"❌ Instancia {instance_tag} no encontrada o no está corriendo")
             return False
         
-        print(f"📍 Instancia encontrada: {instance_id}")
+        print(f"📍 Instancia encontrada: {', '.join(instance_ids)}")
         
         # Obtener configuración
         config = self.instances_config.get(instance_tag)
@@ -168,191 +465,1184 @@ class DeploymentOrchestrator:
             return False
         
         # Construir comandos de despliegue
-        commands = self._build_deploy_commands(instance_tag, config)
+        commands = self._build_deploy_commands(instance_tag, config, prefetched=prefetched)
+        
+        # Canary: primero una réplica, y el resto sólo si cumple el SLO
+        if self.canary and wait and config.get("health_path"):
+            canary_id, instance_ids = instance_ids[0], instance_ids[1:]
+            print(f"🐤 Canary de {instance_tag}: {canary_id}")
+            if not self._send_and_wait(instance_tag, [canary_id], commands, wait):
+                return False
+            if not self._wait_for_canary_slo(instance_tag, canary_id, config):
+                print(f"❌ Canary de {instance_tag} no cumplió el SLO; el resto de réplicas no se toca")
+                return False
+            if not instance_ids:
+                return True
         
-        # Enviar comando
-        command_id = self.send_deploy_command(instance_id, commands)
+        return self._send_and_wait(instance_tag, instance_ids, commands, wait)
+    
+    def _send_and_wait(self, instance_tag: str, instance_ids: List[str], commands: List[str], wait: bool) -> bool:
+        """Envía el script a las instancias y, si ``wait``, espera a que termine en todas"""
+        command_id = self.send_deploy_command(instance_ids, commands)
         if not command_id:
             return False
         
         print(f"📤 Comandos enviados. ID de comando: {command_id}")
+        self._journal(
+            "command", phase="deploy", command_id=command_id,
+            targets={instance_id: instance_tag for instance_id in instance_ids}
+        )
         
         # Esperar resultado si se solicita
         if wait:
-            return self._wait_for_completion(command_id, instance_id, instance_tag)
+            if len(instance_ids) == 1:
+                return self._wait_for_completion(command_id, instance_ids[0], instance_tag)
+            results = self._wait_for_commands({command_id: {instance_id: instance_tag for instance_id in instance_ids}})
+            return all(results.get((command_id, instance_id), False) for instance_id in instance_ids)
         
         return True
     
-    def _build_deploy_commands(self, instance_tag: str, config: Dict) -> List[str]:
-        """Construye los comandos de despliegue"""
-        commands = []
+    def _wait_for_canary_slo(self, instance_tag: str, instance_id: str, config: Dict) -> bool:
+        """Sondea /health en el canary hasta que cumple el SLO o vence canary_timeout
+
+        Las muestras se toman en la propia instancia vía SSM (curl contra
+        127.0.0.1), así no hace falta alcanzar su IP privada desde aquí.
+        """
+        commands = self._build_canary_probe_commands(config)
+        start_time = time.time()
         
-        # Crear volúmenes si es necesario
-        if "volumes" in config:
-            for volume in config["volumes"]:
-                commands.append(f"docker volume create {volume} || true")
-        
-        # Pull de imágenes
-        for image in config["images"]:
-            commands.append(f"echo 'Pulling {image}...'")
-            commands.append(f"docker pull {image}")
-        
-        # Detener y remover contenedores viejos
-        for container in config["containers"]:
-            commands.append(f"docker stop {container} || true")
-            commands.append(f"docker rm {container} || true")
-        
-        # Iniciar nuevos contenedores
-        for i, (image, container, port) in enumerate(
-            zip(config["images"], config["containers"], config["ports"])
-        ):
-            if instance_tag == "EC2-DB":
-                commands.append(self._build_db_container_cmd(container, image, port, i, config))
-            elif instance_tag == "EC2-Monitoring":
-                commands.append(self._build_monitoring_container_cmd(container, image, port, i, config))
-            else:
-                commands.append(
-                    f"docker run -d --name {container} -p {port}:{self._get_internal_port(container)} "
-                    f"--restart always {image}"
+        while True:
+            command_id = self.send_deploy_command(instance_id, commands)
+            outputs: Dict[str, str] = {}
+            if command_id:
+                self._wait_for_commands({command_id: {instance_id: f"{instance_tag} (canary)"}}, outputs=outputs)
+            
+            errors, total, p95 = 0, 0, 0.0
+            for line in outputs.get(instance_id, "").splitlines():
+                parts = line.split()
+                if len(parts) == 5 and parts[0] == "SLO":
+                    errors += int(parts[2])
+                    total += int(parts[3])
+                    p95 = max(p95, float(parts[4]))
+            
+            if total:
+                error_rate = errors / total
+                print(
+                    f"🐤 Canary {instance_tag}: {total} muestras, error {error_rate:.1%} "
+                    f"(máx. {self.canary_max_error_rate:.1%}), p95 {p95 * 1000:.0f}ms "
+                    f"(máx. {self.canary_max_p95 * 1000:.0f}ms)"
                 )
+                if error_rate <= self.canary_max_error_rate and p95 <= self.canary_max_p95:
+                    print(f"✅ Canary de {instance_tag} cumple el SLO")
+                    return True
+            else:
+                print(f"⚠️  Canary {instance_tag}: sin muestras de /health")
+            
+            if time.time() - start_time + self.canary_interval > self.canary_timeout:
+                return False
+            time.sleep(self.canary_interval)
+    
+    def deploy_batch(self, instance_tags: List[str], wait: bool = True, prefetched: bool = False) -> Dict[str, bool]:
+        """Despliega varias instancias a la vez
+
+        Las instancias cuyos comandos coinciden comparten un único send_command
+        (hasta SSM_MAX_INSTANCE_IDS por llamada) y todas las invocaciones se
+        siguen con un solo poller multiplexado.
+        """
+        with self.telemetry.span("deploy_batch", instances=",".join(instance_tags)):
+            return self._run_batch(
+                instance_tags,
+                lambda instance_tag, config: self._build_deploy_commands(instance_tag, config, prefetched=prefetched),
+                wait,
+                phase="deploy"
+            )
+    
+    def prefetch(self, instance_tags: List[str]) -> Dict[str, bool]:
+        """Descarga las imágenes en todas las instancias a la vez, sin parar contenedores
+
+        Una instancia queda lista para el cutover sólo si su script termina
+        con éxito, es decir, si todas sus imágenes están presentes localmente.
+        """
+        print(f"\n📥 Prefetch de imágenes en: {', '.join(instance_tags)}")
+        start_time = time.time()
+        with self.telemetry.span("prefetch", instances=",".join(instance_tags)):
+            results = self._run_batch(
+                instance_tags,
+                lambda instance_tag, config: self._build_prefetch_commands(config),
+                wait=True,
+                phase="prefetch"
+            )
+        self.telemetry.observe(
+            "deploy_prefetch_duration_seconds",
+            time.time() - start_time,
+            description="Duración del prefetch de imágenes en todas las instancias"
+        )
+        ready = [tag for tag in instance_tags if results.get(tag)]
+        print(f"📥 Prefetch completado en {time.time() - start_time:.1f}s: {len(ready)}/{len(instance_tags)} instancias listas")
+        return results
+    
+    def plan(self, instance_tags: List[str]) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """Dry-run: qué contenedores recrearía un despliegue incremental
+
+        Sólo lee el estado del host: compara el ID de la imagen de cada
+        contenedor en ejecución con el de la imagen de ese tag que ya está en
+        el host, sin pull (lo hace el prefetch del despliegue real). Una
+        versión nueva publicada en el registro aparece en el plan cuando el
+        prefetch la descarga. Devuelve tag -> instance_id -> contenedor ->
+        acción ("sin-cambios", "actualizar", "crear" o "descargar" si la
+        imagen aún no está en el host).
+        """
+        outputs: Dict[str, str] = {}
+        self._run_batch(
+            instance_tags,
+            lambda instance_tag, config: self._build_plan_commands(config),
+            wait=True,
+            outputs=outputs
+        )
+
+        plan = {}
+        for instance_tag in instance_tags:
+            plan[instance_tag] = {}
+            for instance_id in self.get_instance_ids(instance_tag):
+                actions = {}
+                for line in outputs.get(instance_id, "").splitlines():
+                    parts = line.split()
+                    if len(parts) >= 3 and parts[0] == "PLAN":
+                        actions[parts[1]] = parts[2]
+                plan[instance_tag][instance_id] = actions
+        return plan
+    
+    def _print_plan(self, plan: Dict[str, Dict[str, Dict[str, str]]]):
+        """Imprime el plan de despliegue incremental"""
+        icons = {"sin-cambios": "⏸️ ", "actualizar": "🔄", "crear": "🆕", "descargar": "📥"}
+        changes = 0
+        print("\n" + "="*60)
+        print("📝 PLAN DE DESPLIEGUE (dry-run)")
+        print("="*60)
+        for instance_tag, instances in plan.items():
+            for instance_id, actions in instances.items():
+                print(f"\n{instance_tag} ({instance_id})")
+                if not actions:
+                    print("   ⚠️  Sin respuesta del plan")
+                for container, action in actions.items():
+                    print(f"   {icons.get(action, '•')} {container}: {action}")
+                    changes += action != "sin-cambios"
+        print(f"\n📈 Contenedores a recrear: {changes}")
+        print("="*60 + "\n")
+    
+    def _run_batch(
+        self,
+        instance_tags: List[str],
+        build_commands: Callable[[str, Dict], List[str]],
+        wait: bool,
+        outputs: Optional[Dict[str, str]] = None,
+        phase: Optional[str] = None
+    ) -> Dict[str, bool]:
+        """Envía a cada instancia los comandos de ``build_commands`` agrupando los idénticos
+
+        Con ``phase`` ("prefetch" o "deploy") los comandos se anotan en el journal.
+        """
+        results = {}
+        groups: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+
+        for instance_tag in instance_tags:
+            config = self.instances_config.get(instance_tag)
+            if not config:
+                print(f"❌ Configuración no encontrada para {instance_tag}")
+                results[instance_tag] = False
+                continue
+
+            instance_ids = self.get_instance_ids(instance_tag)
+            if not instance_ids:
+                print(f"❌ Instancia {instance_tag} no encontrada o no está corriendo")
+                results[instance_tag] = False
+                continue
+
+            commands = tuple(build_commands(instance_tag, config))
+            groups.setdefault(commands, []).extend((instance_tag, instance_id) for instance_id in instance_ids)
+
+        in_flight: Dict[str, Dict[str, str]] = {}
+        for commands, targets in groups.items():
+            for i in range(0, len(targets), SSM_MAX_INSTANCE_IDS):
+                chunk = targets[i:i + SSM_MAX_INSTANCE_IDS]
+                tags = [tag for tag, _ in chunk]
+                command_id = self.send_deploy_command([instance_id for _, instance_id in chunk], list(commands))
+                if not command_id:
+                    results.update({tag: False for tag in tags})
+                    continue
+                print(f"📤 Comando {command_id} enviado a: {', '.join(sorted(set(tags)))}")
+                in_flight[command_id] = {instance_id: tag for tag, instance_id in chunk}
+                if phase:
+                    self._journal("command", phase=phase, command_id=command_id, targets=in_flight[command_id])
+
+        if not wait:
+            for targets in in_flight.values():
+                results.update({tag: True for tag in targets.values()})
+            return results
+
+        statuses = self._wait_for_commands(in_flight, outputs=outputs)
+        for command_id, targets in in_flight.items():
+            for instance_id, instance_tag in targets.items():
+                results[instance_tag] = results.get(instance_tag, True) and statuses.get((command_id, instance_id), False)
+
+        return results
+    
+    def _build_prefetch_commands(self, config: Dict) -> List[str]:
+        """Construye los comandos de prefetch: pull en paralelo y verificación de digests, sin downtime"""
+        images = list(dict.fromkeys(config["images"]))
+        # El script falla si alguna imagen no quedó en la caché local
+        return self._build_pull_commands(images) + [
+            f"for image in {' '.join(images)}; do "
+            f"docker image inspect --format \"Digest $image: {{{{.Id}}}}\" $image || exit 1; done",
+            step_marker(STEP_END)
+        ]
+    
+    def _build_pull_commands(self, images: List[str], lane: Optional[str] = None) -> List[str]:
+        """Pull de las imágenes, hasta PULL_PARALLELISM a la vez; el script aborta si falla alguno"""
+        if len(images) == 1:
+            return [step_marker(f"Pulling {images[0]}...", lane), f"docker pull {images[0]} || exit 1"]
+        return [
+            step_marker(f"Pulling {', '.join(images)}...", lane),
+            f"printf '%s\\n' {' '.join(images)} "
+            f"| xargs -P {min(len(images), PULL_PARALLELISM)} -n 1 docker pull -q > /dev/null || exit 1"
+        ]
+    
+    def _build_deploy_commands(self, instance_tag: str, config: Dict, prefetched: bool = False) -> List[str]:
+        """Script de despliegue del host compilado desde su manifiesto
+
+        El resultado se guarda en ``plan_cache`` indexado por el hash del
+        manifiesto y de las opciones que cambian el script, así que cada
+        host se compila una vez por rollout (o una vez en total con el cache
+        en disco).
+        """
+        options = {
+            "prefetched": prefetched,
+            "strategy": self.strategy,
+            "force_recreate": self.force_recreate,
+            "readiness_timeout": self.readiness_timeout,
+            "warmup": self.warmup
+        }
+        return self.plan_cache.get_or_compile(
+            config["manifest"], options, lambda: self._compile_deploy_commands(config, prefetched)
+        )
+    
+    def _compile_deploy_commands(self, config: Dict, prefetched: bool) -> List[str]:
+        """Compila el script de despliegue
+
+        Los volúmenes se crean en un solo bucle y las imágenes se descargan
+        en paralelo. Con ``prefetched`` no se hace pull: un único docker image
+        inspect comprueba que todas están en la caché local y se aborta antes
+        de parar nada si falta alguna.
+
+        Cada contenedor (reemplazo, calentamiento de sus datos si se recreó
+        y espera a su healthcheck de protocolo) es una función del script.
+        Los de un mismo grupo de manifests.start_order arrancan en paralelo
+        y un grupo no empieza hasta que el anterior terminó bien (zookeeper
+        listo antes de arrancar kafka); en rolling los contenedores HTTP
+        siguen yendo de uno en uno. El script termina con una línea RESULT
+        (JSON) con el código de salida y los tiempos de cada paso, las
+        latencias de readiness y lo que cargó cada calentamiento.
+        """
+        manifest = config["manifest"]
+        containers = manifest["containers"]
+        images = list(dict.fromkeys(config["images"]))
+        commands = list(DEPLOY_SCRIPT_HELPERS)
+        
+        if config["volumes"]:
+            commands.append(f"for volume in {' '.join(config['volumes'])}; do docker volume create $volume > /dev/null; done")
         
-        # Agregar esperas para dependencias
-        if instance_tag == "EC2-Messaging":
-            commands.append("sleep 5")
+        if prefetched:
+            commands.append(
+                f"docker image inspect {' '.join(images)} > /dev/null "
+                f"|| {{ echo 'Faltan imágenes del prefetch en la caché local'; deploy_result 1; }}"
+            )
+        else:
+            commands.extend(self._define_step("pull_images", self._build_pull_commands(images, lane="pull")))
         
-        # Verificar despliegue
-        commands.append(f"echo 'Verificando despliegue...'")
-        commands.append("docker ps | grep -E '" + "|".join(config["containers"]) + "'")
+        for container, spec in containers.items():
+            if self.warmup and spec["warmup"]:
+                commands.extend(self._define_step(
+                    self._warmup_function(container), self._build_warmup_commands(container, spec["warmup"])
+                ))
+            commands.extend(self._define_step(self._step_function(container), self._build_container_step(container, spec)))
+        
+        commands.extend(self._define_step("verify_containers", [
+            step_marker("Verificando despliegue...", lane="verify"),
+            "docker ps | grep -E '" + "|".join(containers) + "'"
+        ]))
+        
+        if not prefetched:
+            commands.append("run_step pull pull_images || deploy_result 1")
+        for group in self._start_groups(manifest):
+            if len(group) == 1:
+                commands.append(f"run_step {group[0]} {self._step_function(group[0])} || deploy_result 1")
+                continue
+            for container in group:
+                commands.append(f"run_step {container} {self._step_function(container)} & pids=\"$pids $!\"")
+            commands.append("wait_steps || deploy_result 1")
+        commands.append("run_step verify verify_containers || deploy_result 1")
+        commands.append("deploy_result 0")
         
         return commands
     
-    def _build_db_container_cmd(self, container: str, image: str, port: int, index: int, config: Dict) -> str:
-        """Construye comando para contenedores de base de datos"""
-        volume = config.get("volumes", [])[index] if index < len(config.get("volumes", [])) else None
+    def _start_groups(self, manifest: Dict) -> List[List[str]]:
+        """Grupos de arranque del script: los de start_order, con los rolling HTTP de uno en uno"""
+        groups = []
+        for level in manifests.start_order(manifest):
+            rolling = [
+                container for container in level
+                if self.strategy == "rolling" and (manifest["containers"][container]["healthcheck"] or {}).get("type") == "http"
+            ]
+            together = [container for container in level if container not in rolling]
+            groups.extend(([together] if together else []) + [[container] for container in rolling])
+        return groups
+    
+    @staticmethod
+    def _step_function(container: str) -> str:
+        return "deploy_" + re.sub(r"\W", "_", container)
+    
+    @staticmethod
+    def _warmup_function(container: str) -> str:
+        return "warmup_" + re.sub(r"\W", "_", container)
+    
+    @staticmethod
+    def _define_step(function: str, commands: List[str]) -> List[str]:
+        """Función de shell multilínea del script (los pasos se ejecutan con run_step)"""
+        return [f"{function}() {{", *commands, "}"]
+    
+    def _build_container_step(self, container: str, spec: Dict) -> List[str]:
+        """Reemplaza el contenedor si su imagen cambió y espera a su healthcheck tcp/kafka/amqp"""
+        healthcheck = spec["healthcheck"] or {}
+        if self.strategy == "rolling" and healthcheck.get("type") == "http":
+            # El resto de servicios sigue sirviendo mientras tanto
+            replace_commands = self._build_rolling_commands(container, spec)
+        else:
+            replace_commands = [
+                step_marker(f"Deteniendo {container}...", container),
+                f"docker stop {container} && docker rm {container} || true",
+                step_marker(f"Iniciando {container}...", container),
+                self._build_container_cmd(container, spec) + " || exit 1"
+            ]
+            if self.warmup and spec["warmup"]:
+                # Sin calentamiento el contenedor funciona igual, sólo con la caché fría
+                replace_commands.append(
+                    f"( {self._warmup_function(container)} ) "
+                    f"|| echo \"⚠️  Calentamiento de {container} incompleto; sigue con la caché fría\""
+                )
+        # Sin --force sólo se recrean los contenedores cuya imagen local difiere de la que ejecutan
+        commands = self._if_changed(container, spec["image"], replace_commands)
         
-        if container == "mongo":
-            return (
-                f"docker run -d --name {container} -p {port}:27017 "
-                f"-v {volume}:/data/db --restart always {image}"
-            )
-        elif container == "postgres":
-            return (
-                f"docker run -d --name {container} -p {port}:5432 "
-                f"-e POSTGRES_PASSWORD=postgres -v {volume}:/var/lib/postgresql/data "
-                f"--restart always {image}"
+        # Los servicios de los que dependen otros contenedores o instancias deben aceptar clientes;
+        # ready_mark deja su latencia en la línea RESULT
+        condition = READINESS_CHECKS.get(healthcheck.get("type"))
+        if condition:
+            check = condition("127.0.0.1", spec["ports"][0][0], container)
+            commands.append(step_marker(f"Esperando {container}...", container))
+            commands.append(shell_wait(check, self.readiness_timeout, on_ready=f"ready_mark {container} {check.protocol}"))
+        return commands
+    
+    def _build_warmup_commands(self, container: str, warmup: Dict) -> List[str]:
+        """Calienta los datos de un contenedor recién recreado y anota con warmup_mark lo cargado
+
+        - redis: carga con ``redis-cli --pipe`` los ``SET`` del snapshot que
+          hay en la instancia, con NX para no pisar claves que ya existan
+          (unidad: respuestas, una por clave).
+        - postgres: ``pg_prewarm`` de las tablas y de sus índices (unidad:
+          bloques) y después las consultas configuradas.
+        - mongo: recorre cada colección y cada índice para llevarlos a la
+          caché de WiredTiger (unidad: documentos; bytes: datos + índices).
+        """
+        kind = warmup["type"]
+        user = warmup.get("user", "postgres")
+        probe = CommandSucceeds(WARMUP_PROBES[kind].format(container=container, user=shlex.quote(user)), container)
+        commands = [
+            step_marker(f"Calentando {container}...", container),
+            "warmup_start=$(date +%s.%N)",
+            shell_wait(probe, WARMUP_TIMEOUT)
+        ]
+        
+        if kind == "redis":
+            snapshot = shlex.quote(warmup["snapshot"])
+            commands.extend([
+                f"[ -f {snapshot} ] || {{ echo \"⚠️  No existe el snapshot {warmup['snapshot']}\"; exit 1; }}",
+                # Sólo SET, y con NX: una clave que ya trae el volumen o que escribió un cliente no se sobrescribe
+                f"loaded=$(awk 'toupper($1) == \"SET\" {{ print $0 \" NX\" }}' {snapshot} "
+                f"| docker exec -i {container} redis-cli --pipe) || {{ echo \"$loaded\"; exit 1; }}",
+                f"warmup_mark {container} keys \"$(echo \"$loaded\" | sed -n 's/.*replies: \\([0-9]*\\).*/\\1/p')\" "
+                f"\"$(wc -c < {snapshot})\""
+            ])
+        elif kind == "postgres":
+            psql = (
+                f"docker exec {container} psql -U {shlex.quote(user)} -d {shlex.quote(warmup['database'])} "
+                "-v ON_ERROR_STOP=1 -qAt"
             )
-        elif container == "redis":
-            return (
-                f"docker run -d --name {container} -p {port}:6379 "
-                f"-v {volume}:/data --restart always {image}"
+            tables = warmup.get("tables", [])
+            if tables:
+                relations = "ARRAY[" + ", ".join("'" + table.replace("'", "''") + "'" for table in tables) + "]::regclass[]"
+                prewarm = (
+                    "SELECT coalesce(sum(blocks), 0), coalesce(sum(blocks), 0) * current_setting('block_size')::bigint "
+                    f"FROM (SELECT pg_prewarm(relation) AS blocks FROM unnest({relations}) AS relation "
+                    f"UNION ALL SELECT pg_prewarm(indexrelid::regclass) FROM pg_index WHERE indrelid = ANY({relations})) AS loaded"
+                )
+                commands.append(
+                    f"loaded=$({psql} -F ' ' -c 'CREATE EXTENSION IF NOT EXISTS pg_prewarm' -c {shlex.quote(prewarm)}) || exit 1"
+                )
+            else:
+                commands.append('loaded="0 0"')
+            commands.extend(f"{psql} -c {shlex.quote(query)} > /dev/null || exit 1" for query in warmup.get("queries", []))
+            commands.append(f"warmup_mark {container} blocks $loaded")
+        else:
+            # Sin $collStats (colección inexistente) sólo se cuentan los documentos recorridos
+            script = (
+                "let docs = 0, bytes = 0; "
+                f"for (const name of {json.dumps(warmup['collections'])}) {{ "
+                "const [base, ...rest] = name.split(\".\"); "
+                "const coll = db.getSiblingDB(base).getCollection(rest.join(\".\")); "
+                "docs += coll.find().hint({$natural: 1}).itcount(); "
+                "for (const index of coll.getIndexes()) { "
+                "const projection = Object.fromEntries(Object.keys(index.key).map(key => [key, 1])); "
+                "if (!(\"_id\" in index.key)) projection._id = 0; "
+                "try { coll.find({}, projection).hint(index.name).itcount(); } catch (e) {} } "
+                "try { const stats = coll.aggregate([{$collStats: {storageStats: {}}}]).next().storageStats; "
+                "bytes += stats.size + stats.totalIndexSize; } catch (e) {} } "
+                "print(docs + \" \" + bytes);"
             )
-        return ""
+            commands.extend([
+                f"loaded=$(docker exec {container} mongosh --quiet --eval {shlex.quote(script)}) || exit 1",
+                f"warmup_mark {container} documents $loaded"
+            ])
+        return commands
+    
+    def _if_changed(self, container: str, image: str, commands: List[str]) -> List[str]:
+        """Envuelve ``commands`` para que sólo se ejecuten si la imagen del contenedor cambió"""
+        if self.force_recreate:
+            return commands
+        return [
+            f"if {self._unchanged_check(container, image)}; then",
+            step_marker(f"Sin cambios: {container}", container),
+            "else",
+            *commands,
+            "fi"
+        ]
+    
+    def _build_container_cmd(
+        self,
+        container: str,
+        spec: Dict,
+        name: Optional[str] = None,
+        host_port: Optional[int] = None,
+        restart: bool = True
+    ) -> str:
+        """docker run de un contenedor según su manifiesto
+
+        ``name`` y ``host_port`` sustituyen al nombre y al primer puerto
+        publicado (contenedor lateral de la estrategia rolling).
+        """
+        parts = ["docker run -d", f"--name {name or container}"]
+        for index, (published, target) in enumerate(spec["ports"]):
+            parts.append(f"-p {host_port if index == 0 and host_port else published}:{target}")
+        parts.extend(f"-v {volume}" for volume in spec["volumes"])
+        parts.extend(f"-e {shlex.quote(f'{key}={value}')}" for key, value in spec["env"].items())
+        # limits son topes duros; requests, la reserva de memoria y el peso de CPU (1024 = 1 CPU) bajo contención
+        requests, limits = spec["resources"]["requests"], spec["resources"]["limits"]
+        if "cpus" in limits:
+            parts.append(f"--cpus {limits['cpus']}")
+        if "memory" in limits:
+            parts.append(f"--memory {limits['memory']}")
+        if "cpus" in requests:
+            parts.append(f"--cpu-shares {max(2, round(requests['cpus'] * 1024))}")
+        if "memory" in requests:
+            parts.append(f"--memory-reservation {requests['memory']}")
+        parts.extend(f"--ulimit {name}={value}" for name, value in spec["resources"]["ulimits"].items())
+        if restart:
+            parts.append(f"--restart {spec['restart']}")
+        parts.append(spec["image"])
+        return " ".join(parts)
     
-    def _build_monitoring_container_cmd(self, container: str, image: str, port: int, index: int, config: Dict) -> str:
-        """Construye comando para contenedores de monitoreo"""
-        volume = config.get("volumes", [])[index] if index < len(config.get("volumes", [])) else None
+    def _build_health_wait_cmd(self, port: int, health_path: str, on_failure: str) -> str:
+        """Bucle shell que espera a que /health responda 2xx; si no, ejecuta ``on_failure`` y aborta"""
+        return (
+            f"for i in $(seq 1 {HEALTH_CHECK_RETRIES}); do "
+            f"curl -fs -m 3 -o /dev/null http://127.0.0.1:{port}{health_path} && break; "
+            f"[ $i -eq {HEALTH_CHECK_RETRIES} ] && {{ {on_failure}; exit 1; }}; "
+            f"sleep {HEALTH_CHECK_INTERVAL}; done"
+        )
+    
+    def _build_rolling_commands(self, container: str, spec: Dict) -> List[str]:
+        """Reemplaza un contenedor validando antes la imagen nueva en un puerto lateral
+
+        1. El contenedor nuevo arranca como ``<container>-next`` en
+           ``port + ROLLING_SIDE_PORT_OFFSET`` y debe pasar /health; si no,
+           se elimina y el script aborta sin haber tocado el actual.
+        2. El actual se detiene y se renombra a ``<container>-prev``, y el
+           nuevo se arranca en el puerto público. Si no pasa /health se
+           restaura el anterior.
+
+        Docker no permite mover un puerto publicado entre contenedores, así
+        que el swap implica reiniciar en el puerto público, pero sólo una vez
+        validada la imagen y sólo un contenedor a la vez.
+        """
+        port = spec["ports"][0][0]
+        health_path = spec["healthcheck"]["path"]
+        side_port = port + ROLLING_SIDE_PORT_OFFSET
+        next_container = f"{container}-next"
+        prev_container = f"{container}-prev"
         
-        if container == "prometheus":
-            return (
-                f"docker run -d --name {container} -p {port}:9090 "
-                f"-v {volume}:/prometheus --restart always {image}"
+        return [
+            step_marker(f"Rolling {container}: validando en puerto {side_port}...", container),
+            f"docker rm -f {next_container} > /dev/null 2>&1 || true",
+            self._build_container_cmd(container, spec, name=next_container, host_port=side_port, restart=False),
+            step_marker(f"Esperando /health de {next_container}...", container),
+            self._build_health_wait_cmd(
+                side_port, health_path,
+                f"echo '{next_container} no pasó {health_path}'; docker logs --tail 20 {next_container}; "
+                f"docker rm -f {next_container}"
+            ),
+            f"docker rm -f {next_container}",
+            step_marker(f"Rolling {container}: swap al puerto {port}...", container),
+            f"docker rm -f {prev_container} > /dev/null 2>&1 || true",
+            f"docker stop {container} && docker rename {container} {prev_container} || docker rm -f {container} || true",
+            self._build_container_cmd(container, spec),
+            step_marker(f"Esperando /health de {container}...", container),
+            self._build_health_wait_cmd(
+                port, health_path,
+                f"echo '{container} no pasó {health_path}; restaurando versión anterior'; "
+                f"docker rm -f {container}; docker rename {prev_container} {container} && docker start {container}"
+            ),
+            f"docker rm -f {prev_container} > /dev/null 2>&1 || true",
+        ]
+    
+    def _build_canary_probe_commands(self, config: Dict) -> List[str]:
+        """Una línea ``SLO <puerto> <errores> <muestras> <p95>`` por contenedor HTTP, medida en la instancia"""
+        commands = []
+        for spec in config["manifest"]["containers"].values():
+            healthcheck = spec["healthcheck"] or {}
+            if healthcheck.get("type") != "http":
+                continue
+            port = spec["ports"][0][0]
+            commands.append(
+                f"for i in $(seq 1 {CANARY_SAMPLES}); do "
+                f"curl -s -o /dev/null -m 3 -w '%{{http_code}} %{{time_total}}\\n' "
+                f"http://127.0.0.1:{port}{healthcheck['path']}; done "
+                f"| sort -k2 -n "
+                f"| awk -v port={port} '{{ n++; if ($1 !~ /^2/) e++; t[n] = $2 }} "
+                f"END {{ i = int(n * 0.95 + 0.5); if (i < 1) i = 1; print \"SLO\", port, e + 0, n, t[i] + 0 }}'"
             )
-        elif container == "grafana":
-            return (
-                f"docker run -d --name {container} -p {port}:3000 "
-                f"-v {volume}:/var/lib/grafana --restart always {image}"
+        return commands
+    
+    def _unchanged_check(self, container: str, image: str) -> str:
+        """Condición shell: el contenedor está corriendo con el ID de la imagen local actual
+
+        Tras el pull, el ID local de ``image`` corresponde al digest del registro,
+        así que si coincide con el del contenedor no hay nada que desplegar.
+        """
+        return (
+            f"[ \"$(docker inspect --format '{{{{.State.Running}}}} {{{{.Image}}}}' {container} 2>/dev/null)\" "
+            f"= \"true $(docker image inspect --format '{{{{.Id}}}}' {image} 2>/dev/null)\" ]"
+        )
+    
+    def _build_plan_commands(self, config: Dict) -> List[str]:
+        """Construye los comandos del plan (dry-run): sólo docker inspect, sin pull ni tocar contenedores"""
+        commands = []
+        for container, spec in config["manifest"]["containers"].items():
+            image = spec["image"]
+            commands.append(
+                f"if ! docker image inspect {image} > /dev/null 2>&1; then echo 'PLAN {container} descargar'; "
+                f"elif {self._unchanged_check(container, image)}; then echo 'PLAN {container} sin-cambios'; "
+                f"elif docker inspect {container} > /dev/null 2>&1; then echo 'PLAN {container} actualizar'; "
+                f"else echo 'PLAN {container} crear'; fi"
             )
-        return ""
-    
-    def _get_internal_port(self, container: str) -> int:
-        """Obtiene el puerto interno del contenedor"""
-        default_ports = {
-            "bastion-host": 22,
-            "api-gateway": 8080,
-            "micro-": 3000,
-            "zookeeper": 2181,
-            "kafka": 9092,
-            "rabbitmq": 5672,
-            "frontend": 3000
-        }
-        
-        for key, port in default_ports.items():
-            if key in container:
-                return port
-        
-        return 3000  # Puerto por defecto
+        return commands
     
     def _wait_for_completion(self, command_id: str, instance_id: str, instance_tag: str) -> bool:
         """Espera a que se complete el comando"""
-        max_attempts = 60
-        attempt = 0
-        
-        while attempt < max_attempts:
-            status = self.get_command_status(command_id, instance_id)
-            if not status:
-                time.sleep(2)
-                attempt += 1
-                continue
-            
-            if status["status"] == "Success":
-                print(f"✅ {instance_tag} desplegado exitosamente")
-                if status["stdout"]:
-                    print(f"📋 Output:\n{status['stdout']}")
-                return True
-            elif status["status"] == "Failed":
-                print(f"❌ Error en despliegue de {instance_tag}")
-                if status["stderr"]:
-                    print(f"📋 Error:\n{status['stderr']}")
-                return False
-            elif status["status"] == "InProgress":
-                print(f"⏳ Desplegando {instance_tag}... ({attempt}s)")
-            
-            time.sleep(2)
-            attempt += 1
-        
-        print(f"⚠️  Timeout esperando despliegue de {instance_tag}")
-        return False
+        return self._wait_for_commands({command_id: {instance_id: instance_tag}}).get((command_id, instance_id), False)
     
-    def deploy_all(self, environment: str = "dev", sequential: bool = True):
-        """Despliega en todas las instancias"""
+    def _wait_for_commands(
+        self,
+        in_flight: Dict[str, Dict[str, str]],
+        timeout: Optional[float] = None,
+        outputs: Optional[Dict[str, str]] = None,
+        invoked_after: Optional[datetime] = None
+    ) -> Dict[Tuple[str, str], bool]:
+        """Sigue todos los comandos en curso con un único poller
+
+        ``in_flight`` mapea command_id -> {instance_id: instance_tag}. Cada
+        iteración hace una sola consulta list_command_invocations; el intervalo
+        vuelve al mínimo cuando alguna invocación termina y crece con backoff
+        mientras no hay cambios. Devuelve (command_id, instance_id) -> éxito y,
+        si se pasa ``outputs``, guarda ahí la salida completa de cada instancia.
+
+        ``invoked_after`` acota la consulta con varios comandos; por defecto
+        cubre los últimos INVOKED_AFTER_MARGIN, suficiente para comandos
+        recién enviados. Al reanudar hay que pasar el instante de envío
+        guardado en el journal.
+
+        Con ``log_sink`` la salida se imprime a medida que llega (el intervalo
+        no pasa de LOG_TAIL_MAX_INTERVAL). Al terminar cada invocación se
+        registran las duraciones de sus pasos en ``step_timings``, a partir del
+        sink o, sin él, de la salida final de SSM.
+        """
+        remaining = {
+            (command_id, instance_id): instance_tag
+            for command_id, targets in in_flight.items()
+            for instance_id, instance_tag in targets.items()
+        }
+        results = {}
+        invoked_after = (invoked_after or datetime.now(timezone.utc)) - INVOKED_AFTER_MARGIN
+        timeout = timeout or self.command_timeout
+        start_time = time.time()
+        delay = self.poll_min_interval
+        max_delay = min(self.poll_max_interval, LOG_TAIL_MAX_INTERVAL) if self.log_sink else self.poll_max_interval
+        tailer = LogTailer(self.log_sink) if self.log_sink else None
+
+        while remaining and time.time() - start_time < timeout:
+            statuses = self.list_command_statuses(sorted({command_id for command_id, _ in remaining}), invoked_after)
+            finished = False
+            if tailer:
+                tailer.poll(remaining)
+
+            for (command_id, instance_id), instance_tag in list(remaining.items()):
+                status = statuses.get((command_id, instance_id))
+                if not status or status["status"] not in SSM_TERMINAL_STATUSES:
+                    continue
+
+                finished = True
+                del remaining[(command_id, instance_id)]
+                results[(command_id, instance_id)] = status["status"] == "Success"
+
+                # La salida de list_command_invocations está truncada; se pide la completa al terminar
+                detail = self.get_command_status(command_id, instance_id) or status
+                if tailer:
+                    # La salida ya se mostró en vivo y el sink no tiene el límite de 24KB
+                    tailer.poll({(command_id, instance_id): instance_tag})
+                    detail = {**detail, "stdout": tailer.output(command_id, instance_id) or detail["stdout"]}
+                    self._record_steps(instance_tag, instance_id, tailer.step_spans(command_id, instance_id))
+                else:
+                    self._record_steps(instance_tag, instance_id, parse_steps(detail["stdout"].splitlines()))
+                if outputs is not None:
+                    outputs[instance_id] = detail["stdout"]
+                digests = parse_digests(detail["stdout"])
+                # Código de salida de cada paso (pull, contenedores, verify) según la línea RESULT del script
+                result = parse_result(detail["stdout"]) or {}
+                exit_codes = {step["step"]: step["exit_code"] for step in result.get("steps", [])}
+                readiness = self._record_readiness(instance_tag, result.get("readiness", []))
+                warmup = self._record_warmup(instance_tag, result.get("warmup", []))
+                self._journal(
+                    "invocation", command_id=command_id, instance_id=instance_id, instance=instance_tag,
+                    status=status["status"], **({"digests": digests} if digests else {}),
+                    **({"exit_codes": exit_codes} if exit_codes else {}),
+                    **({"readiness": readiness} if readiness else {}),
+                    **({"warmup": warmup} if warmup else {})
+                )
+                if results[(command_id, instance_id)]:
+                    print(f"✅ {instance_tag} desplegado exitosamente")
+                    if detail["stdout"] and not tailer:
+                        print(f"📋 Output:\n{detail['stdout']}")
+                else:
+                    print(f"❌ Error en despliegue de {instance_tag} ({status['status']})")
+                    failed_steps = [f"{step} (código {code})" for step, code in exit_codes.items() if code]
+                    if failed_steps:
+                        print(f"   Pasos fallidos: {', '.join(failed_steps)}")
+                    if detail["stderr"] or detail["stdout"]:
+                        print(f"📋 Error:\n{detail['stderr'] or detail['stdout']}")
+
+            if remaining:
+                elapsed = int(time.time() - start_time)
+                print(f"⏳ Desplegando {', '.join(sorted(set(remaining.values())))}... ({elapsed}s)")
+                delay = self.poll_min_interval if finished else min(delay * POLL_BACKOFF, max_delay)
+                time.sleep(delay)
+
+        for key, instance_tag in remaining.items():
+            print(f"⚠️  Timeout esperando despliegue de {instance_tag}")
+            results[key] = False
+
+        self.telemetry.add_span(
+            "ssm.wait", start_time, time.time(),
+            error=not all(results.values()), invocations=len(results)
+        )
+        return results
+    
+    def _record_readiness(self, instance_tag: str, readiness: List[Dict]) -> Dict[str, float]:
+        """Instrumenta e imprime cuánto tardó cada servicio en pasar su healthcheck de protocolo
+
+        Devuelve servicio -> latencia (segundos desde que se empezó a esperar).
+        """
+        latencies = {}
+        for entry in readiness:
+            latency = max(0.0, entry["end"] - entry["start"])
+            latencies[entry["service"]] = round(latency, 3)
+            self.readiness_latency.setdefault(instance_tag, {})[entry["service"]] = latency
+            self.telemetry.observe(
+                "deploy_readiness_seconds",
+                latency,
+                description="Tiempo hasta que cada servicio pasa su healthcheck de protocolo (ruok, metadata, amqp)",
+                instance=instance_tag,
+                service=entry["service"],
+                check=entry["check"]
+            )
+            print(
+                f"🔌 {instance_tag}: {entry['service']} listo ({entry['check']}) en {latency:.1f}s "
+                f"({entry['attempts']} intentos)"
+            )
+        return latencies
+    
+    def _record_warmup(self, instance_tag: str, warmup: List[Dict]) -> Dict[str, Dict]:
+        """Instrumenta e imprime cuánto tardó y cuánto cargó el calentamiento de cada contenedor"""
+        stats = {}
+        for entry in warmup:
+            seconds = max(0.0, entry["end"] - entry["start"])
+            stats[entry["service"]] = {
+                "unit": entry["unit"], "items": entry["items"], "bytes": entry["bytes"], "seconds": round(seconds, 3)
+            }
+            self.warmup_stats.setdefault(instance_tag, {})[entry["service"]] = stats[entry["service"]]
+            self.telemetry.observe(
+                "deploy_warmup_seconds",
+                seconds,
+                description="Duración del calentamiento de datos tras recrear un contenedor (redis, postgres, mongo)",
+                instance=instance_tag,
+                service=entry["service"]
+            )
+            self.telemetry.set_gauge(
+                "deploy_warmup_bytes",
+                entry["bytes"],
+                description="Bytes cargados en caché por el último calentamiento de cada contenedor",
+                instance=instance_tag,
+                service=entry["service"]
+            )
+            print(
+                f"🔥 {instance_tag}: {entry['service']} calentado en {seconds:.1f}s "
+                f"({entry['items']} {entry['unit']}, {entry['bytes'] / 1024 ** 2:.1f} MiB)"
+            )
+        return stats
+    
+    def _record_steps(self, instance_tag: str, instance_id: str, spans: List[Tuple[str, float, Optional[float]]]):
+        """Guarda, instrumenta e imprime la duración de cada paso del script de una instancia
+
+        Los spans de los pasos usan la hora de la instancia (marcadores STEP).
+        """
+        if not spans:
+            return
+        steps = []
+        for label, start, end in spans:
+            kind = step_kind(label)
+            steps.append((kind, label, end - start if end is not None else None))
+            self.telemetry.add_span(
+                f"step.{kind}", start, end if end is not None else start,
+                error=end is None, step=label, instance=instance_tag, instance_id=instance_id
+            )
+            if end is not None:
+                self.telemetry.observe(
+                    "deploy_step_duration_seconds",
+                    end - start,
+                    description="Duración de cada paso del script de despliegue (pull, stop, run, health, verify)",
+                    instance=instance_tag,
+                    phase=kind
+                )
+        # Prefetch y cutover se acumulan en la misma instancia
+        self.step_timings.setdefault(instance_tag, {}).setdefault(instance_id, []).extend(steps)
+        self._journal(
+            "steps", instance=instance_tag, instance_id=instance_id,
+            steps=[[label, round(seconds, 3)] for _, label, seconds in steps if seconds is not None]
+        )
+        totals: Dict[str, float] = {}
+        for kind, _, seconds in steps:
+            totals[kind] = totals.get(kind, 0.0) + (seconds or 0.0)
+        unfinished = [label for _, label, seconds in steps if seconds is None]
+        summary = ", ".join(f"{kind} {seconds:.1f}s" for kind, seconds in totals.items())
+        print(f"⏱️  {instance_tag}/{instance_id}: {summary}")
+        if unfinished:
+            print(f"   ⚠️  Sin terminar: {unfinished[-1]}")
+    
+    def step_summary(self) -> Dict[str, Dict[str, float]]:
+        """tipo de paso -> {total, max} en segundos sobre todas las instancias registradas"""
+        summary: Dict[str, Dict[str, float]] = {}
+        for instances in self.step_timings.values():
+            for steps in instances.values():
+                for kind, _, seconds in steps:
+                    if seconds is None:
+                        continue
+                    entry = summary.setdefault(kind, {"total": 0.0, "max": 0.0})
+                    entry["total"] += seconds
+                    entry["max"] = max(entry["max"], seconds)
+        return summary
+    
+    def _build_dependency_graph(self, instances: List[str]) -> Dict[str, List[str]]:
+        """Construye el grafo de dependencias a partir de instances_config"""
+        graph = {}
+        for instance_tag in instances:
+            depends_on = self.instances_config[instance_tag].get("depends_on", [])
+            unknown = [dep for dep in depends_on if dep not in self.instances_config]
+            if unknown:
+                raise ValueError(f"{instance_tag} depende de instancias desconocidas: {', '.join(unknown)}")
+            # Solo se consideran las dependencias que forman parte de este despliegue
+            graph[instance_tag] = [dep for dep in depends_on if dep in instances]
+        return graph
+
+    def _build_deploy_waves(self, graph: Dict[str, List[str]]) -> List[List[str]]:
+        """Agrupa las instancias en oleadas según su nivel en el grafo (orden topológico)"""
+        remaining = {tag: set(deps) for tag, deps in graph.items()}
+        waves = []
+
+        while remaining:
+            wave = [tag for tag, deps in remaining.items() if not deps]
+            if not wave:
+                raise ValueError(f"Dependencia circular entre: {', '.join(sorted(remaining))}")
+            waves.append(wave)
+            for tag in wave:
+                del remaining[tag]
+            for deps in remaining.values():
+                deps.difference_update(wave)
+
+        return waves
+
+    def _timed_deploy(self, instance_tag: str, prefetched: bool = False) -> Tuple[bool, float]:
+        """Despliega una instancia y devuelve (éxito, duración en segundos)"""
+        start_time = time.time()
+        try:
+            success = self.deploy_instance(instance_tag, wait=True, prefetched=prefetched)
+        except Exception as e:
+            print(f"❌ Error inesperado desplegando {instance_tag}: {str(e)}")
+            success = False
+        self._record_timing(instance_tag, start_time, time.time(), success)
+        return success, time.time() - start_time
+
+    def _record_timing(self, instance_tag: str, start_time: float, end_time: float, success: bool = True):
+        self.deploy_timings[instance_tag] = {
+            "start": start_time - self._rollout_started,
+            "end": end_time - self._rollout_started
+        }
+        self.telemetry.observe(
+            "deploy_instance_duration_seconds",
+            end_time - start_time,
+            description="Duración del cutover de cada instancia",
+            instance=instance_tag,
+            result="success" if success else "failure"
+        )
+    
+    def _record_rollout(
+        self,
+        environment: str,
+        duration: float,
+        succeeded: List[str],
+        failed: List[str],
+        skipped: List[str]
+    ):
+        """Gauges del último rollout, para seguir su evolución en Grafana"""
+        self.telemetry.set_gauge(
+            "deploy_rollout_duration_seconds", duration,
+            description="Duración total del último deploy_all", environment=environment
+        )
+        for result, instances in (("success", succeeded), ("failure", failed), ("skipped", skipped)):
+            self.telemetry.set_gauge(
+                "deploy_rollout_instances", len(instances),
+                description="Instancias del último deploy_all por resultado", environment=environment, result=result
+            )
+        self.telemetry.set_gauge(
+            "deploy_rollout_last_run_timestamp_seconds", time.time(),
+            description="Hora de fin del último deploy_all", environment=environment
+        )
+    
+    def _journal(self, event: str, **fields):
+        if self.journal:
+            self.journal.append(event, **fields)
+
+    def _api_timer(self, operation: str):
+        """Histograma de latencia de una llamada a AWS"""
+        return self.telemetry.timed(
+            "deploy_aws_api_latency_seconds",
+            API_BUCKETS,
+            description="Latencia de las llamadas a EC2 y SSM",
+            operation=operation
+        )
+
+    def deploy_all(
+        self,
+        environment: str = "dev",
+        sequential: bool = True,
+        max_parallel: int = 4,
+        fail_fast: bool = False,
+        batch: bool = False,
+        prefetch: bool = False
+    ) -> bool:
+        """Despliega en todas las instancias respetando el grafo de dependencias
+
+        Por defecto, como siempre, de una en una y con el pull dentro del
+        cutover. Con ``sequential=False`` cada instancia se lanza en cuanto
+        todas sus dependencias (``depends_on``) terminan con éxito, con como
+        máximo ``max_parallel`` despliegues simultáneos. Con ``batch`` cada
+        oleada se envía con deploy_batch y se sigue con un solo poller. Si una
+        instancia falla, sus dependientes se omiten; con ``fail_fast`` además
+        se deja de lanzar cualquier otro despliegue pendiente.
+
+        Con ``prefetch`` todas las imágenes se descargan primero en todas las
+        instancias a la vez, así el cutover de cada instancia sólo para y
+        arranca contenedores. Una instancia cuyo prefetch falla cuenta como
+        fallida y no se toca.
+        """
+        max_workers = 1 if sequential else max(1, max_parallel)
+
         print(f"\n🚀 Iniciando despliegue en TODAS las instancias (Environment: {environment})")
-        print(f"Modo: {'Secuencial' if sequential else 'Paralelo'}")
-        
-        instances = list(self.instances_config.keys())
-        failed = []
+        if batch:
+            print("Modo: Por lotes (una oleada por send_command)")
+        else:
+            print(f"Modo: {'Secuencial' if max_workers == 1 else f'Paralelo (máx. {max_workers})'}")
+        print(f"Política de errores: {'fail-fast' if fail_fast else 'continuar'}")
+        print(f"Prefetch de imágenes: {'sí' if prefetch else 'no'}")
+        print(f"Estrategia: {self.strategy}{' + canary' if self.canary else ''}")
+        if batch and self.canary:
+            print("⚠️  El canary no aplica en modo por lotes; las réplicas se despliegan a la vez")
+
+        graph = self._build_dependency_graph(list(self.instances_config.keys()))
+        waves = self._build_deploy_waves(graph)
+
+        self._print_waves(waves)
+        if self.journal:
+            self.journal.start(environment, [tag for wave in waves for tag in wave], prefetch=prefetch)
+            print(f"📓 Journal: {self.journal.path} (reanudar con la acción resume)")
+
+        return self._rollout(environment, graph, waves, max_workers, fail_fast, batch, prefetch)
+
+    def resume(
+        self,
+        sequential: bool = True,
+        max_parallel: int = 4,
+        fail_fast: bool = False,
+        batch: bool = False
+    ) -> bool:
+        """Reanuda el último deploy_all del journal
+
+        Primero sigue hasta el final los comandos SSM que quedaron en curso
+        (siguen ejecutándose en las instancias aunque el orquestador se haya
+        cortado). Luego da por desplegadas las instancias que terminaron con
+        éxito, o cuyo cutover terminó en todas sus réplicas actuales, y
+        despliega el resto respetando el grafo. Las réplicas con el prefetch
+        ya hecho no vuelven a descargar imágenes.
+        """
+        state = self.journal.load() if self.journal else None
+        if not state:
+            print("❌ No hay ningún despliegue en el journal para reanudar")
+            return False
+        if state.finished and state.success:
+            print(f"✅ El despliegue {state.rollout_id} terminó correctamente; no hay nada que reanudar")
+            return True
+
+        started = datetime.fromtimestamp(state.started_at).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"\n🔁 Reanudando despliegue {state.rollout_id} del {started} (Environment: {state.environment})")
+        self.journal.reopen(state)
+
+        in_flight = state.in_flight()
+        if in_flight:
+            tags = sorted({tag for targets in in_flight.values() for tag in targets.values()})
+            print(f"⏳ Siguiendo {len(in_flight)} comandos que quedaron en curso: {', '.join(tags)}")
+            # Los comandos pueden llevar horas enviados: la consulta se acota con su hora de envío del journal
+            sent = datetime.fromtimestamp(state.in_flight_since(), timezone.utc)
+            self._wait_for_commands(in_flight, invoked_after=sent)
+            state = self.journal.load()
+
+        done = []
+        remaining = []
+        prefetched = []
+        for instance_tag in state.order:
+            if instance_tag not in self.instances_config:
+                print(f"⚠️  {instance_tag} ya no está en instances_config; se ignora")
+                continue
+            instance_ids = set(self.get_instance_ids(instance_tag))
+            if state.instances.get(instance_tag) == SUCCEEDED:
+                done.append(instance_tag)
+            elif instance_ids and instance_ids <= state.completed_ids(instance_tag, "deploy"):
+                # El cutover terminó en todas las réplicas mientras el orquestador no estaba
+                self._journal("instance", instance=instance_tag, status=SUCCEEDED)
+                done.append(instance_tag)
+            else:
+                remaining.append(instance_tag)
+                if instance_ids and instance_ids <= state.completed_ids(instance_tag, "prefetch"):
+                    prefetched.append(instance_tag)
+
+        if done:
+            print(f"⏭️  Ya desplegadas ({len(done)}): {', '.join(done)}")
+        for instance_tag in remaining:
+            last_steps = [steps[-1][0] for steps in state.steps.get(instance_tag, {}).values() if steps]
+            status = state.instances.get(instance_tag, "pendiente")
+            print(f"   • {instance_tag}: {status}" + (f" (último paso terminado: {last_steps[-1]})" if last_steps else ""))
+        if prefetched:
+            print(f"📥 Con el prefetch hecho ({len(prefetched)}): {', '.join(prefetched)}")
+        if not remaining:
+            print("✅ No queda ninguna instancia por desplegar")
+            self._journal("end", success=True)
+            return True
+
+        max_workers = 1 if sequential else max(1, max_parallel)
+        graph = self._build_dependency_graph(remaining)
+        waves = self._build_deploy_waves(graph)
+        self._print_waves(waves)
+        return self._rollout(
+            state.environment, graph, waves, max_workers, fail_fast, batch, state.prefetch,
+            prefetched=prefetched, name="deploy_resume"
+        )
+
+    def _print_waves(self, waves: List[List[str]]):
+        print("\n🗺️  Plan de despliegue:")
+        for number, wave in enumerate(waves, start=1):
+            print(f"   Oleada {number}: {', '.join(wave)}")
+
+    def _rollout(
+        self,
+        environment: str,
+        graph: Dict[str, List[str]],
+        waves: List[List[str]],
+        max_workers: int,
+        fail_fast: bool,
+        batch: bool,
+        prefetch: bool,
+        prefetched: Optional[List[str]] = None,
+        name: str = "deploy_all"
+    ) -> bool:
+        """Prefetch, despliegue según el grafo y resumen (compartido por deploy_all y resume)"""
+        start_time = datetime.now()
+        self._rollout_started = time.time()
+        self.deploy_timings = {}
+        self.step_timings = {}
+
+        with self.telemetry.root(name, environment=environment, strategy=self.strategy) as span:
+            prefetch_failed = []
+            pending_prefetch = [tag for tag in graph if tag not in (prefetched or [])]
+            if prefetch and pending_prefetch:
+                results = self.prefetch(pending_prefetch)
+                prefetch_failed = [tag for tag in pending_prefetch if not results.get(tag, False)]
+                for instance_tag in prefetch_failed:
+                    self._journal("instance", instance=instance_tag, status=FAILED)
+
+            if batch:
+                succeeded, failed, skipped = self._deploy_batched(graph, waves, fail_fast, prefetch, prefetch_failed)
+            else:
+                succeeded, failed, skipped = self._deploy_scheduled(
+                    graph, waves, max_workers, fail_fast, prefetch, prefetch_failed
+                )
+            span["error"] = bool(failed or skipped)
+
+        total_duration = (datetime.now() - start_time).total_seconds()
+        self._record_rollout(environment, total_duration, succeeded, failed, skipped)
+        self._journal("end", success=not failed and not skipped)
+
+        # Resumen
+        self._print_summary(succeeded, failed, skipped)
+        if self.step_timings:
+            print("⏱️  Tiempo por tipo de paso (suma / máximo):")
+            for kind, entry in sorted(self.step_summary().items(), key=lambda item: -item[1]["total"]):
+                print(f"   {kind:<10} {entry['total']:>8.1f}s / {entry['max']:.1f}s")
+        print(f"⏱️  Tiempo total de despliegue: {total_duration:.1f}s\n")
+
+        return not failed and not skipped
+    
+    def _deploy_scheduled(
+        self,
+        graph: Dict[str, List[str]],
+        waves: List[List[str]],
+        max_workers: int,
+        fail_fast: bool,
+        prefetched: bool = False,
+        already_failed: Optional[List[str]] = None
+    ) -> Tuple[List[str], List[str], List[str]]:
+        """Lanza cada instancia en un hilo en cuanto sus dependencias terminan"""
+        failed = list(already_failed or [])
+        # Orden de prioridad: primero las oleadas más tempranas
+        pending = [tag for wave in waves for tag in wave if tag not in failed]
+        running = {}
         succeeded = []
-        
-        # Orden recomendado
-        deploy_order = [
-            "EC2-DB",
-            "EC2-Messaging",
-            "EC2-Bastion",
-            "EC2-CORE",
-            "EC2-API-Gateway",
-            "EC2-Reportes",
-            "EC2-Notificaciones",
-            "EC2-Analytics",
-            "EC2-Monitoring",
-            "EC2-Frontend"
-        ]
-        
-        for instance_tag in deploy_order:
-            if instance_tag in instances:
-                start_time = datetime.now()
-                success = self.deploy_instance(instance_tag, wait=True)
-                duration = (datetime.now() - start_time).total_seconds()
-                
-                if success:
+        skipped = []
+        aborted = fail_fast and bool(failed)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                if len(running) < max_workers and any(all(dep in succeeded for dep in graph[tag]) for tag in pending):
+                    self.refresh_instance_states()
+                for instance_tag in list(pending):
+                    deps = graph[instance_tag]
+                    if aborted or any(dep in failed or dep in skipped for dep in deps):
+                        pending.remove(instance_tag)
+                        skipped.append(instance_tag)
+                        self._journal("instance", instance=instance_tag, status=SKIPPED)
+                        print(f"⏭️  {instance_tag} omitido (dependencia fallida o despliegue abortado)")
+                    elif all(dep in succeeded for dep in deps) and len(running) < max_workers:
+                        pending.remove(instance_tag)
+                        self._journal("instance", instance=instance_tag, status=STARTED)
+                        running[executor.submit(self._timed_deploy, instance_tag, prefetched)] = instance_tag
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    instance_tag = running.pop(future)
+                    success, duration = future.result()
+                    self._journal("instance", instance=instance_tag, status=SUCCEEDED if success else FAILED)
+
+                    if success:
+                        succeeded.append(instance_tag)
+                        print(f"✅ {instance_tag} completado en {duration:.1f}s\n")
+                    else:
+                        failed.append(instance_tag)
+                        print(f"❌ {instance_tag} falló después de {duration:.1f}s\n")
+                        if fail_fast:
+                            aborted = True
+
+        return succeeded, failed, skipped
+    
+    def _deploy_batched(
+        self,
+        graph: Dict[str, List[str]],
+        waves: List[List[str]],
+        fail_fast: bool,
+        prefetched: bool = False,
+        already_failed: Optional[List[str]] = None
+    ) -> Tuple[List[str], List[str], List[str]]:
+        """Despliega oleada a oleada con deploy_batch"""
+        succeeded = []
+        failed = list(already_failed or [])
+        skipped = []
+
+        for wave in waves:
+            ready = []
+            for instance_tag in wave:
+                if instance_tag in failed:
+                    continue
+                if (fail_fast and failed) or any(dep in failed or dep in skipped for dep in graph[instance_tag]):
+                    skipped.append(instance_tag)
+                    self._journal("instance", instance=instance_tag, status=SKIPPED)
+                    print(f"⏭️  {instance_tag} omitido (dependencia fallida o despliegue abortado)")
+                else:
+                    ready.append(instance_tag)
+
+            if not ready:
+                continue
+
+            self.refresh_instance_states()
+            wave_start = time.time()
+            for instance_tag in ready:
+                self._journal("instance", instance=instance_tag, status=STARTED)
+            try:
+                results = self.deploy_batch(ready, wait=True, prefetched=prefetched)
+            except Exception as e:
+                print(f"❌ Error inesperado desplegando {', '.join(ready)}: {str(e)}")
+                results = {}
+            duration = time.time() - wave_start
+
+            for instance_tag in ready:
+                self._record_timing(instance_tag, wave_start, wave_start + duration, results.get(instance_tag, False))
+                self._journal(
+                    "instance", instance=instance_tag, status=SUCCEEDED if results.get(instance_tag, False) else FAILED
+                )
+                if results.get(instance_tag, False):
                     succeeded.append(instance_tag)
                     print(f"✅ {instance_tag} completado en {duration:.1f}s\n")
                 else:
                     failed.append(instance_tag)
                     print(f"❌ {instance_tag} falló después de {duration:.1f}s\n")
-        
-        # Resumen
-        self._print_summary(succeeded, failed)
+
+        return succeeded, failed, skipped
     
-    def _print_summary(self, succeeded: List[str], failed: List[str]):
+    def _print_summary(self, succeeded: List[str], failed: List[str], skipped: Optional[List[str]] = None):
         """Imprime resumen del despliegue"""
         print("\n" + "="*60)
         print("📊 RESUMEN DE DESPLIEGUE")
@@ -368,7 +1658,12 @@ class DeploymentOrchestrator:
             for instance in failed:
                 print(f"   • {instance}")
         
-        print(f"\n📈 Total: {len(succeeded)} exitosos, {len(failed)} fallidos")
+        if skipped:
+            print(f"\n⏭️  Omitidos ({len(skipped)}):")
+            for instance in skipped:
+                print(f"   • {instance}")
+        
+        print(f"\n📈 Total: {len(succeeded)} exitosos, {len(failed)} fallidos, {len(skipped or [])} omitidos")
         print("="*60 + "\n")
 
 
@@ -379,13 +1674,13 @@ def main():
     
     parser.add_argument(
         "action",
-        choices=["deploy-all", "deploy"],
+        choices=["deploy-all", "deploy", "plan", "resume"],
         help="Acción a realizar"
     )
     
     parser.add_argument(
         "--instance",
-        help="Etiqueta de instancia específica (para deploy)"
+        help="Etiqueta de instancia específica (para deploy o plan)"
     )
     
     parser.add_argument(
@@ -407,6 +1702,134 @@ def main():
         help="No esperar a que se complete el despliegue"
     )
     
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Desplegar en paralelo según depends_on en lugar de una instancia a la vez (para deploy-all y resume)"
+    )
+    
+    parser.add_argument(
+        "--max-parallel",
+        type=int,
+        default=4,
+        help="Máximo de instancias desplegándose a la vez con --parallel"
+    )
+    
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Enviar cada oleada de deploy-all como lote de send_command con un solo poller"
+    )
+    
+    parser.add_argument(
+        "--strategy",
+        choices=["recreate", "rolling"],
+        default="recreate",
+        help="rolling: reemplazar los contenedores HTTP uno a uno validando /health en un puerto lateral"
+    )
+    
+    parser.add_argument(
+        "--canary",
+        action="store_true",
+        help="Desplegar primero una réplica y seguir sólo si cumple el SLO de /health"
+    )
+    
+    parser.add_argument(
+        "--canary-max-error-rate",
+        type=float,
+        default=CANARY_MAX_ERROR_RATE,
+        help="Tasa de error máxima del canary (0.01 = 1%%)"
+    )
+    
+    parser.add_argument(
+        "--canary-max-p95",
+        type=float,
+        default=CANARY_MAX_P95,
+        help="Latencia p95 máxima de /health en el canary (segundos)"
+    )
+    
+    parser.add_argument(
+        "--canary-timeout",
+        type=int,
+        default=CANARY_TIMEOUT,
+        help="Segundos que se espera a que el canary cumpla el SLO"
+    )
+    
+    parser.add_argument(
+        "--readiness-timeout",
+        type=int,
+        default=READY_TIMEOUT,
+        help="Segundos que el script espera a que Kafka, RabbitMQ y ZooKeeper acepten clientes"
+    )
+    
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Recrear todos los contenedores aunque su imagen no haya cambiado"
+    )
+    
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Calentar los contenedores de datos con warmup en su manifiesto (EC2-DB) tras recrearlos"
+    )
+    
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Descargar las imágenes en todas las instancias antes de reiniciar contenedores (por defecto, el pull va en el cutover)"
+    )
+    
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Detener deploy-all al primer fallo en lugar de continuar con las ramas independientes"
+    )
+    
+    parser.add_argument(
+        "--log-group",
+        help="Log group de CloudWatch donde SSM publica la salida, para seguirla en vivo"
+    )
+    
+    parser.add_argument(
+        "--metrics-file",
+        help="Archivo donde escribir las métricas en formato de texto de Prometheus"
+    )
+    
+    parser.add_argument(
+        "--pushgateway",
+        help="URL del Prometheus Pushgateway al que enviar las métricas (ej: http://monitoring:9091)"
+    )
+    
+    parser.add_argument(
+        "--trace-file",
+        help="Archivo donde escribir la traza del despliegue en JSON de OpenTelemetry (OTLP)"
+    )
+    
+    parser.add_argument(
+        "--instance-cache",
+        help="Archivo JSON donde persistir la caché de IDs de instancias"
+    )
+    
+    parser.add_argument(
+        "--instance-cache-ttl",
+        type=int,
+        default=INSTANCE_CACHE_TTL,
+        help="Vigencia en segundos de la caché de IDs de instancias"
+    )
+    
+    parser.add_argument(
+        "--journal",
+        default=str(DEFAULT_JOURNAL),
+        help="Journal JSONL del progreso de deploy-all, usado por resume"
+    )
+    
+    parser.add_argument(
+        "--no-journal",
+        action="store_true",
+        help="No registrar el progreso de deploy-all (no se podrá reanudar)"
+    )
+    
     parser.add_argument(
         "--list",
         action="store_true",
@@ -416,7 +1839,28 @@ def main():
     args = parser.parse_args()
     
     # Crear orquestador
-    orchestrator = DeploymentOrchestrator(region=args.region)
+    try:
+        orchestrator = DeploymentOrchestrator(
+            region=args.region,
+            instance_cache_ttl=args.instance_cache_ttl,
+            instance_cache_file=args.instance_cache
+        )
+    except (manifests.ManifestError, topology.TopologyError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    orchestrator.plan_cache = manifests.PlanCache(manifests.PLAN_CACHE_FILE)
+    orchestrator.force_recreate = args.force
+    orchestrator.strategy = args.strategy
+    orchestrator.canary = args.canary
+    orchestrator.canary_max_error_rate = args.canary_max_error_rate
+    orchestrator.canary_max_p95 = args.canary_max_p95
+    orchestrator.canary_timeout = args.canary_timeout
+    orchestrator.readiness_timeout = args.readiness_timeout
+    orchestrator.warmup = args.warmup
+    if args.log_group:
+        orchestrator.log_sink = CloudWatchLogSink(orchestrator.logs, args.log_group)
+    if not args.no_journal:
+        orchestrator.journal = Journal(args.journal)
     
     # Listar instancias
     if args.list:
@@ -426,13 +1870,50 @@ def main():
             print(f"\n{instance_tag}")
             print(f"  Imágenes: {', '.join(config['images'])}")
             print(f"  Puertos: {', '.join(map(str, config['ports']))}")
+            if config.get("depends_on"):
+                print(f"  Depende de: {', '.join(config['depends_on'])}")
         print("="*60 + "\n")
         return
     
     # Ejecutar acción
+    try:
+        run_action(orchestrator, args, parser)
+    finally:
+        orchestrator.plan_cache.save({tag: config["manifest"] for tag, config in orchestrator.instances_config.items()})
+        export_telemetry(orchestrator, args)
+
+
+def export_telemetry(orchestrator: DeploymentOrchestrator, args):
+    """Exporta métricas y traza según --metrics-file, --pushgateway y --trace-file"""
+    telemetry = orchestrator.telemetry
+    try:
+        if args.metrics_file:
+            telemetry.write_prometheus(args.metrics_file)
+            print(f"📈 Métricas guardadas en {args.metrics_file}")
+        if args.pushgateway:
+            telemetry.push(args.pushgateway, "deployment_orchestrator", {"environment": args.environment})
+            print(f"📈 Métricas enviadas a {args.pushgateway}")
+        if args.trace_file:
+            with open(args.trace_file, "w") as f:
+                json.dump(telemetry.to_otlp_json(), f, indent=2)
+            print(f"🧵 Traza guardada en {args.trace_file}")
+    except Exception as e:
+        print(f"⚠️  Error exportando telemetría: {str(e)}")
+
+
+def run_action(orchestrator: DeploymentOrchestrator, args, parser: argparse.ArgumentParser):
+    """Ejecuta la acción pedida en la línea de comandos"""
     try:
         if args.action == "deploy-all":
-            orchestrator.deploy_all(environment=args.environment)
+            success = orchestrator.deploy_all(
+                environment=args.environment,
+                sequential=not args.parallel,
+                max_parallel=args.max_parallel,
+                fail_fast=args.fail_fast,
+                batch=args.batch,
+                prefetch=args.prefetch
+            )
+            sys.exit(0 if success else 1)
         elif args.action == "deploy":
             if not args.instance:
                 print("❌ --instance requerido para acción 'deploy'")
@@ -440,11 +1921,24 @@ def main():
                 sys.exit(1)
             
             wait = not args.no_wait
-            success = orchestrator.deploy_instance(args.instance, wait=wait)
+            success = orchestrator.deploy_instance(args.instance, wait=wait, prefetch=args.prefetch)
+            sys.exit(0 if success else 1)
+        elif args.action == "resume":
+            success = orchestrator.resume(
+                sequential=not args.parallel,
+                max_parallel=args.max_parallel,
+                fail_fast=args.fail_fast,
+                batch=args.batch
+            )
             sys.exit(0 if success else 1)
+        elif args.action == "plan":
+            instance_tags = [args.instance] if args.instance else list(orchestrator.instances_config.keys())
+            orchestrator._print_plan(orchestrator.plan(instance_tags))
     
     except KeyboardInterrupt:
         print("\n\n⚠️  Despliegue cancelado por el usuario")
+        if orchestrator.journal and orchestrator.journal.rollout_id:
+            print(f"🔁 Para continuar donde quedó: python3 {sys.argv[0]} resume")
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Planificador de ubicación de contenedores del Deployment Orchestrator
+Compara lo que cada contenedor necesita (lo mayor entre resources.requests
+de su manifiesto y, si se indica, el consumo medido: Prometheus/cAdvisor o
+un JSON local) con la capacidad de su instancia, informa del margen de CPU
+y memoria de cada host y propone con bin-packing qué contenedores mover
+para que ninguno quede sobresuscrito. El plan sólo se informa: mover un
+contenedor implica cambiar su manifiesto y su instancia en
+docker-compose.yml, así que sólo son destino los hosts con servicios en la
+topología
+"""
+
+import argparse
+import json
+import sys
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import manifests
+import topology
+
+# Perfil de ejemplo (valores ilustrativos, no medidos) para probar el planificador
+EXAMPLE_PROFILE = Path(__file__).resolve().parent / "resource-profile.example.json"
+# Instancias t3.small (terraform/variables.tf); un manifiesto puede fijar su propia "capacity"
+DEFAULT_CAPACITY = {"cpus": 2, "memory": "2g"}
+# Lo que se queda el sistema (SO, docker, agente SSM) en cada host
+SYSTEM_RESERVED = {"cpus": 0.1, "memory": "256m"}
+PROFILE_WINDOW = "7d"
+PROMETHEUS_TIMEOUT = 30
+# Métricas de cAdvisor por contenedor (label name = nombre del contenedor)
+CPU_QUERY = (
+    'max by (name) (quantile_over_time(0.95, '
+    'rate(container_cpu_usage_seconds_total{{name!=""}}[5m])[{window}:5m]))'
+)
+MEMORY_QUERY = 'max by (name) (max_over_time(container_memory_working_set_bytes{{name!=""}}[{window}]))'
+
+Profile = Dict[str, Dict[str, float]]
+
+
+def load_profile(path: Path = EXAMPLE_PROFILE) -> Profile:
+    """Consumo medido de un JSON: contenedor -> {"cpus", "memory" (bytes)}"""
+    with open(path) as f:
+        data = json.load(f)
+    return {
+        container: {"cpus": float(usage["cpus"]), "memory": manifests.parse_memory(usage["memory"])}
+        for container, usage in data["containers"].items()
+    }
+
+
+def query_prometheus(url: str, window: str = PROFILE_WINDOW) -> Profile:
+    """Consumo medido en Prometheus: p95 de CPU y máximo de memoria de cada contenedor en ``window``"""
+    profile: Profile = {}
+    for key, query in (("cpus", CPU_QUERY), ("memory", MEMORY_QUERY)):
+        request_url = f"{url.rstrip('/')}/api/v1/query?" + urllib.parse.urlencode({"query": query.format(window=window)})
+        with urllib.request.urlopen(request_url, timeout=PROMETHEUS_TIMEOUT) as response:
+            data = json.load(response)
+        if data.get("status") != "success":
+            raise RuntimeError(f"Prometheus respondió {data.get('status')}: {data.get('error', '')}")
+        for sample in data["data"]["result"]:
+            name = sample["metric"].get("name")
+            if name:
+                profile.setdefault(name, {})[key] = float(sample["value"][1])
+    return profile
+
+
+class Host:
+    """Capacidad asignable de una instancia y lo que ya tiene ubicado"""
+
+    def __init__(self, tag: str, capacity: Dict):
+        self.tag = tag
+        self.cpus = float(capacity.get("cpus", DEFAULT_CAPACITY["cpus"])) - SYSTEM_RESERVED["cpus"]
+        self.memory = (
+            manifests.parse_memory(capacity.get("memory", DEFAULT_CAPACITY["memory"]))
+            - manifests.parse_memory(SYSTEM_RESERVED["memory"])
+        )
+        self.containers: List[str] = []
+        self.used_cpus = 0.0
+        self.used_memory = 0
+        self.ports: set = set()
+
+    def fits(self, demand: "Demand") -> bool:
+        return (
+            self.used_cpus + demand.cpus <= self.cpus + 1e-9
+            and self.used_memory + demand.memory <= self.memory
+            and not self.ports & demand.ports
+        )
+
+    def add(self, demand: "Demand"):
+        self.containers.append(demand.container)
+        self.used_cpus += demand.cpus
+        self.used_memory += demand.memory
+        self.ports |= demand.ports
+
+    def free(self) -> float:
+        """Fracción libre del recurso más escaso"""
+        return min(1 - self.used_cpus / self.cpus, 1 - self.used_memory / self.memory)
+
+    def oversubscribed(self) -> bool:
+        return self.used_cpus > self.cpus + 1e-9 or self.used_memory > self.memory
+
+
+class Demand:
+    """Lo que necesita un contenedor: el mayor entre su request y su consumo medido"""
+
+    def __init__(self, container: str, instance: str, spec: Dict, measured: Optional[Dict[str, float]]):
+        self.container = container
+        self.instance = instance
+        requests = spec["resources"]["requests"]
+        measured = measured or {}
+        self.measured = bool(measured)
+        self.cpus = max(float(requests.get("cpus", 0)), measured.get("cpus", 0.0))
+        self.memory = max(manifests.parse_memory(requests.get("memory", 0)), int(measured.get("memory", 0)))
+        self.ports = {published for published, _ in spec["ports"]}
+        # Con volúmenes los datos viven en el host; "pinned" fija el resto (p. ej. el bastión)
+        self.pinned = spec["pinned"] or bool(spec["volumes"])
+
+
+def _place(hosts: Dict[str, Host], demands: List[Demand], excluded: set) -> Dict[str, str]:
+    """First-fit decreasing con preferencia por el host actual
+
+    Los fijos se quedan donde están. El resto, de mayor a menor, sigue en
+    su host mientras quepa; lo que no cabe se reubica después, ya con
+    todos los hosts llenos, en el que más margen libre tenga (worst-fit,
+    para repartir la carga) sin contar los hosts ``excluded``. Si no cabe
+    en ninguno se queda donde está.
+    """
+    placement = {}
+    for demand in demands:
+        if demand.pinned:
+            hosts[demand.instance].add(demand)
+            placement[demand.container] = demand.instance
+
+    movable = [demand for demand in demands if not demand.pinned]
+    movable.sort(
+        key=lambda d: max(d.cpus / hosts[d.instance].cpus, d.memory / hosts[d.instance].memory),
+        reverse=True
+    )
+    overflow = []
+    for demand in movable:
+        if hosts[demand.instance].fits(demand):
+            hosts[demand.instance].add(demand)
+            placement[demand.container] = demand.instance
+        else:
+            overflow.append(demand)
+
+    for demand in overflow:
+        candidates = [
+            host for host in hosts.values()
+            if host.tag != demand.instance and host.tag not in excluded and host.fits(demand)
+        ]
+        target = max(candidates, key=lambda host: host.free()).tag if candidates else demand.instance
+        hosts[target].add(demand)
+        placement[demand.container] = target
+    return placement
+
+
+def plan(
+    loaded: Dict[str, Dict],
+    profile: Profile,
+    topo: Optional[topology.Topology] = None
+) -> Tuple[Dict[str, Host], Dict[str, Host], List[Dict]]:
+    """(hosts con la ubicación actual, hosts con la propuesta, cambios [{container, from, to}])
+
+    No reciben contenedores los hosts ``"dedicated"`` ni los que no tienen
+    ningún servicio en la topología (bastión, frontend): no están en la red
+    de los microservicios.
+    """
+    topo = topo or topology.load()
+    demands = [
+        Demand(container, tag, spec, profile.get(container))
+        for tag, manifest in loaded.items()
+        for container, spec in manifest["containers"].items()
+    ]
+    current = {tag: Host(tag, manifest.get("capacity", {})) for tag, manifest in loaded.items()}
+    for demand in demands:
+        current[demand.instance].add(demand)
+    proposed = {tag: Host(tag, manifest.get("capacity", {})) for tag, manifest in loaded.items()}
+    excluded = {
+        tag for tag, manifest in loaded.items()
+        if manifest.get("dedicated") or not topo.instances.get(tag, {}).get("services")
+    }
+    placement = _place(proposed, demands, excluded)
+    changes = [
+        {"container": demand.container, "from": demand.instance, "to": placement[demand.container]}
+        for demand in demands if placement[demand.container] != demand.instance
+    ]
+    return current, proposed, changes
+
+
+def limits_overcommit(manifest: Dict, host: Host) -> Tuple[float, int]:
+    """Suma de los limits de CPU y memoria de la instancia (pueden superar la capacidad)"""
+    cpus, memory = 0.0, 0
+    for spec in manifest["containers"].values():
+        limits = spec["resources"]["limits"]
+        cpus += float(limits.get("cpus", host.cpus))
+        memory += manifests.parse_memory(limits.get("memory", host.memory))
+    return cpus, memory
+
+
+def host_report(hosts: Dict[str, Host]) -> List[Dict]:
+    return [
+        {
+            "instance": host.tag,
+            "containers": host.containers,
+            "cpus": round(host.used_cpus, 3),
+            "cpus_capacity": round(host.cpus, 3),
+            "cpus_headroom": round(host.cpus - host.used_cpus, 3),
+            "memory": host.used_memory,
+            "memory_capacity": host.memory,
+            "memory_headroom": host.memory - host.used_memory,
+            "oversubscribed": host.oversubscribed()
+        }
+        for host in hosts.values()
+    ]
+
+
+def print_hosts(title: str, hosts: Dict[str, Host], loaded: Optional[Dict[str, Dict]] = None):
+    print(f"\n{title}")
+    print(f"{'Instancia':<20} {'CPU':>13} {'Margen':>7} {'Memoria':>15} {'Margen':>7}  Estado")
+    for host in hosts.values():
+        memory = f"{manifests.format_memory(host.used_memory)}/{manifests.format_memory(host.memory)}"
+        status = "⚠️  sobresuscrito" if host.oversubscribed() else "✅"
+        if loaded and not host.oversubscribed():
+            limit_cpus, limit_memory = limits_overcommit(loaded[host.tag], host)
+            if limit_cpus > host.cpus or limit_memory > host.memory:
+                status += f" (limits {limit_cpus:g} CPU / {manifests.format_memory(limit_memory)})"
+        print(
+            f"{host.tag:<20} {host.used_cpus:>6.2f}/{host.cpus:<6.2f} {host.cpus - host.used_cpus:>7.2f} "
+            f"{memory:>15} {manifests.format_memory(host.memory - host.used_memory):>7}  {status}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Margen de CPU/memoria por host y reubicación de contenedores")
+    parser.add_argument(
+        "--profile",
+        help=f"JSON con el consumo medido por contenedor (formato de {EXAMPLE_PROFILE.name}); sin él sólo cuentan los requests"
+    )
+    parser.add_argument("--prometheus", help="URL de Prometheus (métricas de cAdvisor) en lugar de --profile")
+    parser.add_argument("--window", default=PROFILE_WINDOW, help="Ventana de las consultas a Prometheus (ej: 7d)")
+    parser.add_argument("--json", dest="json_file", help="Guardar margen por host y cambios propuestos en JSON")
+    args = parser.parse_args()
+
+    try:
+        topo = topology.load()
+        loaded = manifests.load_manifests(topo=topo)
+        if args.prometheus:
+            profile = query_prometheus(args.prometheus, args.window)
+        else:
+            profile = load_profile(Path(args.profile)) if args.profile else {}
+    except (manifests.ManifestError, topology.TopologyError, OSError, ValueError, KeyError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    unmeasured = [
+        container for manifest in loaded.values() for container in manifest["containers"] if container not in profile
+    ]
+    source = args.prometheus or args.profile
+    if not source:
+        print("📏 Sin consumo medido: se usan los requests de los manifiestos (--prometheus o --profile para medirlo)")
+    else:
+        print(f"📏 Consumo medido de {source}" + (f"; sin datos (se usan requests): {', '.join(unmeasured)}" if unmeasured else ""))
+        if Path(source).resolve() == EXAMPLE_PROFILE:
+            print("⚠️  Perfil de EJEMPLO: los valores son ilustrativos, no medidos")
+
+    current, proposed, changes = plan(loaded, profile, topo)
+    print_hosts("📊 Ubicación actual", current, loaded)
+    if changes:
+        print("\n🔀 Cambios propuestos:")
+        for change in changes:
+            print(f"   {change['container']}: {change['from']} → {change['to']}")
+        print_hosts("📊 Con los cambios", proposed)
+    else:
+        print("\n✅ No hace falta mover ningún contenedor")
+
+    unresolved = [host.tag for host in proposed.values() if host.oversubscribed()]
+    if unresolved:
+        print(f"\n⚠️  Sin sitio para liberar: {', '.join(unresolved)} (hace falta más capacidad)")
+
+    if args.json_file:
+        with open(args.json_file, "w") as f:
+            json.dump(
+                {"current": host_report(current), "proposed": host_report(proposed), "changes": changes},
+                f, indent=2
+            )
+        print(f"\n💾 Plan guardado en {args.json_file}")
+
+    oversubscribed = [host.tag for host in current.values() if host.oversubscribed()]
+    if oversubscribed:
+        print(f"\n❌ Hosts sobresuscritos: {', '.join(oversubscribed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Condiciones de disponibilidad compartidas por las herramientas de despliegue
+Sustituyen los sleeps fijos por esperas sobre señales reales: un puerto que
+acepta conexiones, una respuesta del propio protocolo (ruok de ZooKeeper,
+Metadata de Kafka con el broker ya registrado, connection.start de AMQP) o
+/health respondiendo 200 varias veces seguidas. Cada espera tiene un plazo y
+devuelve cuánto tardó realmente. Las condiciones de red también se generan
+como bucle de shell para los scripts que el orquestador ejecuta en la
+instancia vía SSM; standins.py las prueba contra servidores locales
+"""
+
+import re
+import socket
+import struct
+import subprocess
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+# Intervalo entre comprobaciones: empieza en MIN y crece con BACKOFF hasta MAX (segundos)
+READY_MIN_INTERVAL = 0.5
+READY_MAX_INTERVAL = 10.0
+READY_BACKOFF = 1.5
+READY_TIMEOUT = 120
+# Timeout de cada intento de conexión
+CHECK_TIMEOUT = 3
+# /health debe responder 200 este número de veces seguidas
+HEALTHY_STREAK = 3
+
+# Comando de cuatro letras de ZooKeeper (debe estar en 4lw.commands.whitelist); responde "imok"
+ZOOKEEPER_RUOK = b"ruok"
+# Metadata v0 (api_key 3) con correlation_id 1, client_id "ready" y sin topics (todos)
+KAFKA_METADATA_REQUEST = struct.pack(">ihhih5si", 19, 3, 0, 1, 5, b"ready", 0)
+# Cabecera de protocolo AMQP 0-9-1; el broker responde con connection.start (clase 10, método 10)
+AMQP_PROTOCOL_HEADER = b"AMQP\x00\x00\x09\x01"
+
+
+class Condition:
+    """Señal de disponibilidad
+
+    ``check`` devuelve True si está lista, False si no (se reintenta con
+    backoff) o None si avanza pero aún no basta (se reintenta enseguida, p.
+    ej. una racha de health checks a medias). ``detail`` explica el último
+    resultado.
+    """
+
+    name = ""
+    detail = ""
+    # Qué comprueba (se informa junto a la latencia)
+    protocol = ""
+
+    def check(self) -> Optional[bool]:
+        raise NotImplementedError
+
+    def shell(self) -> str:
+        """Expresión de shell que sale con 0 cuando la condición se cumple"""
+        raise NotImplementedError(f"{type(self).__name__} no tiene versión de shell")
+
+
+class PortOpen(Condition):
+    """El puerto acepta conexiones TCP"""
+
+    protocol = "tcp"
+
+    def __init__(self, host: str, port: int, name: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.name = name or f"{host}:{port}"
+
+    def check(self) -> Optional[bool]:
+        try:
+            with socket.create_connection((self.host, self.port), timeout=CHECK_TIMEOUT):
+                self.detail = "puerto abierto"
+                return True
+        except OSError as e:
+            self.detail = str(e)
+            return False
+
+    def shell(self) -> str:
+        return f"timeout {CHECK_TIMEOUT} bash -c '</dev/tcp/{self.host}/{self.port}' 2>/dev/null"
+
+
+class HandshakeCondition(PortOpen):
+    """Envía ``request`` y comprueba el inicio de la respuesta del protocolo"""
+
+    request = b""
+    # Bytes de la respuesta que se leen y expresión regular (grep -E) que debe cumplir su hex
+    response_length = 0
+    response_pattern = ""
+
+    def check(self) -> Optional[bool]:
+        try:
+            with socket.create_connection((self.host, self.port), timeout=CHECK_TIMEOUT) as sock:
+                sock.sendall(self.request)
+                response = b""
+                while len(response) < self.response_length:
+                    chunk = sock.recv(self.response_length - len(response))
+                    if not chunk:
+                        break
+                    response += chunk
+        except OSError as e:
+            self.detail = str(e)
+            return False
+        ready = _matches(response.hex(), self.response_pattern)
+        self.detail = "handshake correcto" if ready else f"respuesta inesperada: {response.hex() or 'vacía'}"
+        return ready
+
+    def shell(self) -> str:
+        request = "".join(f"\\x{byte:02x}" for byte in self.request)
+        return (
+            f"timeout {CHECK_TIMEOUT} bash -c 'exec 3<>/dev/tcp/{self.host}/{self.port}; "
+            f"printf \"{request}\" >&3; head -c {self.response_length} <&3' 2>/dev/null "
+            f"| od -An -tx1 | tr -d ' \\n' | grep -Eq '^{self.response_pattern}'"
+        )
+
+
+class ZookeeperReady(HandshakeCondition):
+    """El servidor contesta "imok" a ruok"""
+
+    protocol = "ruok"
+    request = ZOOKEEPER_RUOK
+    response_length = 4
+    # "imok"
+    response_pattern = "696d6f6b"
+
+
+class KafkaReady(HandshakeCondition):
+    """Metadata devuelve al menos un broker: ya se registró en ZooKeeper y acepta productores
+
+    El puerto abre y ApiVersions responde antes de que el broker esté
+    registrado; mientras tanto Metadata llega con la lista de brokers vacía.
+    """
+
+    protocol = "metadata"
+    request = KAFKA_METADATA_REQUEST
+    response_length = 12
+    # tamaño (4 bytes), correlation_id = 1, número de brokers entre 1 y 255
+    response_pattern = "." * 8 + "00000001" + "000000([1-9a-f].|0[1-9a-f])"
+
+
+class AmqpReady(HandshakeCondition):
+    """El broker contesta la cabecera AMQP con un frame connection.start en el canal 0"""
+
+    protocol = "amqp"
+    request = AMQP_PROTOCOL_HEADER
+    response_length = 11
+    # tipo 1 (método), canal 0, tamaño (4 bytes), clase 10, método 10
+    response_pattern = "010000" + "." * 8 + "000a000a"
+
+
+class CommandSucceeds(Condition):
+    """``command`` sale con 0 (p. ej. ``docker exec postgres pg_isready``)"""
+
+    protocol = "exec"
+
+    def __init__(self, command: str, name: Optional[str] = None):
+        self.command = command
+        self.name = name or command
+
+    def check(self) -> Optional[bool]:
+        try:
+            result = subprocess.run(self.command, shell=True, capture_output=True, text=True, timeout=CHECK_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.detail = f"sin respuesta en {CHECK_TIMEOUT}s"
+            return False
+        self.detail = (result.stdout or result.stderr).strip() or f"código {result.returncode}"
+        return result.returncode == 0
+
+    def shell(self) -> str:
+        return self.command
+
+
+class HttpHealthy(Condition):
+    """``url`` responde 200 ``streak`` veces seguidas"""
+
+    def __init__(self, url: str, streak: int = HEALTHY_STREAK, name: Optional[str] = None):
+        self.url = url
+        self.streak = streak
+        self.name = name or url
+        self.successes = 0
+
+    def check(self) -> Optional[bool]:
+        try:
+            with urllib.request.urlopen(self.url, timeout=CHECK_TIMEOUT) as response:
+                status = response.status
+        except Exception as e:
+            status, self.detail = None, str(e)
+        if status != 200:
+            self.successes = 0
+            if status:
+                self.detail = f"status {status}"
+            return False
+        self.successes += 1
+        self.detail = f"{self.successes}/{self.streak} respuestas 200 seguidas"
+        return True if self.successes >= self.streak else None
+
+
+class WaitResult:
+    def __init__(self, name: str, ready: bool, elapsed: float, attempts: int, detail: str):
+        self.name = name
+        self.ready = ready
+        self.elapsed = elapsed
+        self.attempts = attempts
+        self.detail = detail
+
+    def __repr__(self):
+        if self.ready:
+            return f"✅ {self.name} listo en {self.elapsed:.1f}s ({self.attempts} intentos)"
+        return f"⏱️  {self.name} no disponible tras {self.elapsed:.1f}s ({self.attempts} intentos): {self.detail}"
+
+
+def wait_for(
+    condition: Condition,
+    timeout: float = READY_TIMEOUT,
+    min_interval: float = READY_MIN_INTERVAL,
+    max_interval: float = READY_MAX_INTERVAL,
+    verbose: bool = True
+) -> WaitResult:
+    """Comprueba ``condition`` con backoff hasta que se cumple o vence ``timeout``"""
+    start = time.monotonic()
+    delay = min_interval
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            ready = condition.check()
+        except Exception as e:
+            ready, condition.detail = False, str(e)
+        elapsed = time.monotonic() - start
+        if ready or elapsed + delay > timeout:
+            break
+        time.sleep(delay)
+        delay = min_interval if ready is None else min(delay * READY_BACKOFF, max_interval)
+
+    result = WaitResult(condition.name, bool(ready), time.monotonic() - start, attempts, condition.detail)
+    if verbose:
+        print(result)
+    return result
+
+
+def wait_all(
+    conditions: List[Condition],
+    timeout: float = READY_TIMEOUT,
+    verbose: bool = True,
+    **kwargs
+) -> List[WaitResult]:
+    """Espera todas las condiciones a la vez; el plazo es común"""
+    if not conditions:
+        return []
+    with ThreadPoolExecutor(max_workers=len(conditions)) as executor:
+        results = list(executor.map(
+            lambda condition: wait_for(condition, timeout, verbose=False, **kwargs), conditions
+        ))
+    if verbose:
+        for result in results:
+            print(result)
+    return results
+
+
+def shell_wait(
+    condition: Condition,
+    timeout: float = READY_TIMEOUT,
+    interval: float = 1,
+    on_ready: Optional[str] = None
+) -> str:
+    """Bucle de shell de una línea que espera ``condition`` y aborta el script si vence el plazo
+
+    Deja en ``$ready_start`` la hora a la que empezó a esperar y en
+    ``$attempts`` los intentos; ``on_ready`` se ejecuta al cumplirse.
+    """
+    return (
+        f"ready_start=$(date +%s.%N); attempts=1; deadline=$(($(date +%s) + {int(timeout)})); "
+        f"until {condition.shell()}; do "
+        f"if [ $(date +%s) -ge $deadline ]; then "
+        f"echo \"❌ {condition.name} no disponible tras {int(timeout)}s ($attempts intentos)\"; exit 1; fi; "
+        f"attempts=$((attempts + 1)); sleep {interval:g}; done"
+        + (f"; {on_ready}" if on_ready else "")
+    )
+
+
+def _matches(value: str, pattern: str) -> bool:
+    return re.match(pattern, value) is not None
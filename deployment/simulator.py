@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Simulador de rollouts del Deployment Orchestrator
+Reproduce deploy_all contra FakeBackend (sin cuenta de AWS) y proyecta el
+tiempo total, la ruta crítica y el speedup de cada política de planificación
+"""
+
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from backends import FakeBackend, DEFAULT_PULL_LATENCY, DEFAULT_START_LATENCY
+from logstream import FileLogSink
+from orchestrator import DeploymentOrchestrator, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, COMMAND_TIMEOUT
+
+DEFAULT_PROFILE = Path(__file__).parent / "simulator-profile.json"
+
+Timeline = Dict[str, Tuple[float, float]]
+
+
+def load_profile(path: Optional[str]) -> Dict:
+    profile_path = Path(path) if path else DEFAULT_PROFILE
+    if not profile_path.exists():
+        return {}
+    with open(profile_path) as f:
+        return json.load(f)
+
+
+def build_backend(orchestrator: DeploymentOrchestrator, profile: Dict, failures: List[str], speedup: float) -> FakeBackend:
+    replicas = profile.get("replicas", {})
+    return FakeBackend(
+        instances={tag: replicas.get(tag, 1) for tag in orchestrator.instances_config},
+        pull_latency=profile.get("pull_latency"),
+        start_latency=profile.get("start_latency"),
+        ready_latency=profile.get("ready_latency"),
+        warmup=profile.get("warmup"),
+        default_pull_latency=profile.get("default_pull_latency", DEFAULT_PULL_LATENCY),
+        default_start_latency=profile.get("default_start_latency", DEFAULT_START_LATENCY),
+        failures=set(profile.get("failures", [])) | set(failures),
+        speedup=speedup
+    )
+
+
+def instance_durations(
+    orchestrator: DeploymentOrchestrator,
+    backend: FakeBackend,
+    prefetched: bool = False
+) -> Dict[str, float]:
+    """Duración modelada del script de despliegue (cutover) de cada instancia"""
+    return {
+        tag: backend.estimate_duration(orchestrator._build_deploy_commands(tag, config, prefetched=prefetched))
+        for tag, config in orchestrator.instances_config.items()
+    }
+
+
+def prefetch_durations(orchestrator: DeploymentOrchestrator, backend: FakeBackend) -> Dict[str, float]:
+    """Duración modelada del prefetch de cada instancia"""
+    return {
+        tag: backend.estimate_duration(orchestrator._build_prefetch_commands(config))
+        for tag, config in orchestrator.instances_config.items()
+    }
+
+
+def shift(timeline: Timeline, offset: float) -> Timeline:
+    return {tag: (start + offset, end + offset) for tag, (start, end) in timeline.items()}
+
+
+def critical_path(graph: Dict[str, List[str]], order: List[str], durations: Dict[str, float]) -> Tuple[float, List[str]]:
+    """Camino más largo del grafo de dependencias (límite inferior de cualquier política)"""
+    finish = {}
+    previous = {}
+    for tag in order:
+        start = max((finish[dep] for dep in graph[tag]), default=0.0)
+        previous[tag] = max(graph[tag], key=lambda dep: finish[dep], default=None)
+        finish[tag] = start + durations[tag]
+
+    tag = max(finish, key=finish.get)
+    path = []
+    while tag:
+        path.append(tag)
+        tag = previous[tag]
+    return max(finish.values()), list(reversed(path))
+
+
+def project_scheduled(
+    graph: Dict[str, List[str]],
+    order: List[str],
+    durations: Dict[str, float],
+    max_parallel: int
+) -> Timeline:
+    """Simulación de eventos discretos de DeploymentOrchestrator._deploy_scheduled"""
+    timeline = {}
+    pending = list(order)
+    running: List[Tuple[float, str]] = []
+    done = set()
+    now = 0.0
+
+    while pending or running:
+        for tag in list(pending):
+            if len(running) < max_parallel and all(dep in done for dep in graph[tag]):
+                pending.remove(tag)
+                timeline[tag] = (now, now + durations[tag])
+                heapq.heappush(running, (now + durations[tag], tag))
+        now, tag = heapq.heappop(running)
+        done.add(tag)
+
+    return timeline
+
+
+def project_batched(waves: List[List[str]], durations: Dict[str, float]) -> Timeline:
+    """Cada oleada arranca cuando termina la instancia más lenta de la anterior"""
+    timeline = {}
+    now = 0.0
+    for wave in waves:
+        for tag in wave:
+            timeline[tag] = (now, now + durations[tag])
+        now += max(durations[tag] for tag in wave)
+    return timeline
+
+
+def replay(
+    orchestrator: DeploymentOrchestrator,
+    backend: FakeBackend,
+    policy: str,
+    max_parallel: int,
+    prefetch: bool,
+    verbose: bool,
+    log_dir: Optional[str] = None
+) -> Tuple[bool, Timeline, Dict[str, int]]:
+    """Ejecuta deploy_all de verdad contra el backend simulado
+
+    Con ``log_dir`` la salida de cada comando se sigue en vivo a través de
+    FileLogSink. ``orchestrator.step_timings`` queda en segundos reales.
+    """
+    speedup = backend.speedup
+    orchestrator.poll_min_interval = POLL_MIN_INTERVAL / speedup
+    orchestrator.poll_max_interval = POLL_MAX_INTERVAL / speedup
+    orchestrator.command_timeout = COMMAND_TIMEOUT * 10 / speedup
+    if log_dir:
+        orchestrator.log_sink = FileLogSink(log_dir)
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        success = orchestrator.deploy_all(
+            environment="sim",
+            sequential=policy == "sequential",
+            max_parallel=max_parallel,
+            batch=policy == "batch",
+            prefetch=prefetch
+        )
+
+    timeline = {
+        tag: (timing["start"] * speedup, timing["end"] * speedup)
+        for tag, timing in orchestrator.deploy_timings.items()
+    }
+    return success, timeline, dict(backend.ssm.api_calls)
+
+
+def print_timeline(title: str, timeline: Timeline, makespan: float):
+    print(f"\n{title}")
+    scale = 40 / makespan if makespan else 0
+    for tag, (start, end) in sorted(timeline.items(), key=lambda item: item[1]):
+        bar = " " * int(start * scale) + "█" * max(1, int((end - start) * scale))
+        print(f"   {tag:<20} {start:>7.1f}s → {end:>7.1f}s ({end - start:>6.1f}s) |{bar}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de rollouts del orquestador (sin AWS)")
+    parser.add_argument("--profile", help=f"Perfil JSON de latencias (por defecto {DEFAULT_PROFILE.name})")
+    parser.add_argument(
+        "--policy",
+        choices=["parallel", "sequential", "batch"],
+        default="parallel",
+        help="Política usada en el replay"
+    )
+    parser.add_argument("--max-parallel", type=int, default=4, help="Paralelismo máximo de la política parallel")
+    parser.add_argument("--fail", action="append", default=[], help="Tag de instancia cuyo despliegue falla")
+    parser.add_argument("--speedup", type=float, default=120, help="Factor de aceleración del tiempo en el replay")
+    parser.add_argument("--no-prefetch", action="store_true", help="Simular el pull dentro del cutover")
+    parser.add_argument("--warmup", action="store_true", help="Incluir el calentamiento de EC2-DB (--warmup del orquestador)")
+    parser.add_argument("--no-replay", action="store_true", help="Sólo proyecciones analíticas")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida del orquestador durante el replay")
+    parser.add_argument("--stream-logs", metavar="DIR", help="Seguir la salida en vivo con un sink local en DIR")
+    parser.add_argument("--json", help="Guardar el resultado en un archivo JSON")
+    args = parser.parse_args()
+
+    profile = load_profile(args.profile)
+    # Sólo para leer instances_config y construir el grafo; el replay usa su propio orquestador
+    planner = DeploymentOrchestrator(backend=FakeBackend({}))
+    planner.warmup = args.warmup
+    backend = build_backend(planner, profile, args.fail, args.speedup)
+
+    graph = planner._build_dependency_graph(list(planner.instances_config))
+    waves = planner._build_deploy_waves(graph)
+    order = [tag for wave in waves for tag in wave]
+    prefetch = not args.no_prefetch
+    durations = instance_durations(planner, backend, prefetched=prefetch)
+    full_durations = instance_durations(planner, backend)
+    # El prefetch corre en todas las instancias a la vez antes del primer cutover
+    prefetch_stage = max(prefetch_durations(planner, backend).values()) if prefetch else 0.0
+    path_length, path = critical_path(graph, order, durations)
+    path_length += prefetch_stage
+
+    policies = {
+        "sequential": project_scheduled(graph, order, durations, 1),
+        f"parallel (máx. {args.max_parallel})": project_scheduled(graph, order, durations, args.max_parallel),
+        "parallel (sin límite)": project_scheduled(graph, order, durations, len(order)),
+        "batch (por oleadas)": project_batched(waves, durations),
+    }
+    policies = {name: shift(timeline, prefetch_stage) for name, timeline in policies.items()}
+    makespans = {name: max(end for _, end in timeline.values()) for name, timeline in policies.items()}
+    sequential_time = makespans["sequential"]
+
+    print("\n" + "=" * 60)
+    print("🧪 SIMULACIÓN DE ROLLOUT")
+    print("=" * 60)
+    if prefetch:
+        print(f"\n📥 Prefetch (todas las instancias en paralelo): {prefetch_stage:.1f}s")
+    print(f"\n🛤️  Ruta crítica ({path_length:.1f}s): {' → '.join(path)}")
+    print("\n⏸️  Downtime por instancia (cutover):")
+    for tag in order:
+        print(f"   {tag:<20} {durations[tag]:>7.1f}s   (con pull en el cutover: {full_durations[tag]:.1f}s)")
+    print("\n📈 Proyección por política:")
+    for name, makespan in makespans.items():
+        print(f"   {name:<24} {makespan:>8.1f}s   speedup x{sequential_time / makespan:.2f}")
+
+    result = {
+        "prefetch_seconds": prefetch_stage,
+        "durations": durations,
+        "critical_path": {"seconds": path_length, "instances": path},
+        "projections": {
+            name: {"makespan": makespans[name], "speedup": sequential_time / makespans[name], "timeline": timeline}
+            for name, timeline in policies.items()
+        },
+    }
+
+    if not args.no_replay:
+        orchestrator = DeploymentOrchestrator(backend=backend)
+        orchestrator.warmup = args.warmup
+        success, timeline, api_calls = replay(
+            orchestrator, backend, args.policy, args.max_parallel, prefetch, args.verbose, args.stream_logs
+        )
+        makespan = max((end for _, end in timeline.values()), default=0.0)
+        print_timeline(f"🎬 Replay ({args.policy}): {makespan:.1f}s simulados", timeline, makespan)
+        print(f"\n📞 Llamadas SSM: {', '.join(f'{op}={n}' for op, n in sorted(api_calls.items()))}")
+        print(f"{'✅' if success else '❌'} Resultado del replay: {'éxito' if success else 'con fallos'}")
+        result["replay"] = {
+            "policy": args.policy,
+            "success": success,
+            "makespan": makespan,
+            "timeline": timeline,
+            "ssm_api_calls": api_calls,
+        }
+        if orchestrator.step_timings:
+            steps = {
+                kind: {name: seconds * backend.speedup for name, seconds in entry.items()}
+                for kind, entry in orchestrator.step_summary().items()
+            }
+            print("\n⏱️  Tiempo por tipo de paso en el replay (suma / máximo):")
+            for kind, entry in sorted(steps.items(), key=lambda item: -item[1]["total"]):
+                print(f"   {kind:<10} {entry['total']:>8.1f}s / {entry['max']:.1f}s")
+            result["replay"]["steps"] = steps
+        if orchestrator.readiness_latency:
+            readiness = {
+                tag: {service: seconds * backend.speedup for service, seconds in services.items()}
+                for tag, services in orchestrator.readiness_latency.items()
+            }
+            print("\n🔌 Readiness de protocolo en el replay:")
+            for tag, services in readiness.items():
+                print(f"   {tag:<20} " + ", ".join(f"{service} {seconds:.1f}s" for service, seconds in services.items()))
+            result["replay"]["readiness"] = readiness
+        if orchestrator.warmup_stats:
+            warmup = {
+                tag: {service: {**stats, "seconds": stats["seconds"] * backend.speedup} for service, stats in services.items()}
+                for tag, services in orchestrator.warmup_stats.items()
+            }
+            print("\n🔥 Calentamiento de datos en el replay:")
+            for tag, services in warmup.items():
+                for service, stats in services.items():
+                    print(
+                        f"   {tag:<20} {service:<10} {stats['seconds']:>6.1f}s  "
+                        f"{stats['items']} {stats['unit']}, {stats['bytes'] / 1024 ** 2:.1f} MiB"
+                    )
+            result["replay"]["warmup"] = warmup
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\n💾 Resultado guardado en {args.json}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Sustitutos locales de ZooKeeper, Kafka y RabbitMQ para probar readiness.py
+Cada stand-in reserva su puerto pero no acepta conexiones hasta
+``listen_after`` segundos (como el contenedor mientras arranca la JVM o
+Erlang) y sólo responde como un servicio listo desde ``ready_after``; antes
+contesta como durante el arranque: ZooKeeper cierra sin "imok", Kafka
+devuelve Metadata sin brokers y RabbitMQ corta la conexión. Con
+``depends_on`` el plazo cuenta desde que la dependencia está lista (Kafka no
+se registra hasta que ZooKeeper responde). El CLI arranca los tres y espera
+las condiciones que usa el orquestador, en Python o con los bucles de shell
+que se ejecutan en la instancia, e informa de la latencia de cada una
+"""
+
+import argparse
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from readiness import (
+    AMQP_PROTOCOL_HEADER, ZOOKEEPER_RUOK, AmqpReady, Condition, KafkaReady, ZookeeperReady, shell_wait, wait_all
+)
+
+HOST = "127.0.0.1"
+# Plazo de las esperas del CLI (segundos)
+STANDIN_TIMEOUT = 30
+# Frame end de AMQP 0-9-1
+AMQP_FRAME_END = b"\xce"
+
+
+class StandIn:
+    """Servidor TCP local que imita un servicio mientras arranca; con ``port`` 0 usa uno libre"""
+
+    name = ""
+    condition = Condition
+
+    def __init__(
+        self,
+        listen_after: float = 0.0,
+        ready_after: float = 0.0,
+        depends_on: Optional["StandIn"] = None,
+        port: int = 0
+    ):
+        self.listen_after = listen_after
+        self.ready_after = ready_after
+        self.depends_on = depends_on
+        self.started = 0.0
+        standin = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                try:
+                    standin.reply(self.request, standin.ready())
+                except OSError:
+                    pass
+
+        # El puerto queda reservado sin listen(): conectar da "connection refused" hasta activarlo
+        self.server = socketserver.ThreadingTCPServer((HOST, port), Handler, bind_and_activate=False)
+        self.server.daemon_threads = True
+        self.server.allow_reuse_address = True
+        self.server.server_bind()
+        self.port = self.server.server_address[1]
+        self._serving = threading.Event()
+        self._stopped = threading.Event()
+
+    def start(self):
+        self.started = time.monotonic()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        if self._stopped.wait(self.listen_after):
+            return
+        self.server.server_activate()
+        self._serving.set()
+        self.server.serve_forever(poll_interval=0.1)
+
+    def stop(self):
+        self._stopped.set()
+        if self._serving.is_set():
+            self.server.shutdown()
+        self.server.server_close()
+
+    def ready_at(self) -> float:
+        base = self.depends_on.ready_at() if self.depends_on else self.started
+        return max(self.started + self.listen_after, base + self.ready_after)
+
+    def ready(self) -> bool:
+        return time.monotonic() >= self.ready_at()
+
+    def reply(self, sock, ready: bool):
+        raise NotImplementedError
+
+    def check(self) -> Condition:
+        """Condición de readiness.py que el orquestador usa para este servicio"""
+        return self.condition(HOST, self.port, self.name)
+
+
+def _recv_exactly(sock, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _kafka_string(value: str) -> bytes:
+    return struct.pack(">h", len(value)) + value.encode()
+
+
+class ZookeeperStandIn(StandIn):
+    name = "zookeeper"
+    condition = ZookeeperReady
+
+    def reply(self, sock, ready: bool):
+        if _recv_exactly(sock, len(ZOOKEEPER_RUOK)) == ZOOKEEPER_RUOK and ready:
+            sock.sendall(b"imok")
+
+
+class KafkaStandIn(StandIn):
+    name = "kafka"
+    condition = KafkaReady
+    broker_id = 1
+
+    def reply(self, sock, ready: bool):
+        size = _recv_exactly(sock, 4)
+        if len(size) < 4:
+            return
+        request = _recv_exactly(sock, struct.unpack(">i", size)[0])
+        correlation_id = struct.unpack(">i", request[4:8])[0]
+        # Metadata v0: brokers [node_id, host, port] y topics (ninguno)
+        brokers = [struct.pack(">i", self.broker_id) + _kafka_string(HOST) + struct.pack(">i", self.port)] if ready else []
+        body = struct.pack(">ii", correlation_id, len(brokers)) + b"".join(brokers) + struct.pack(">i", 0)
+        sock.sendall(struct.pack(">i", len(body)) + body)
+
+
+class AmqpStandIn(StandIn):
+    name = "rabbitmq"
+    condition = AmqpReady
+
+    def reply(self, sock, ready: bool):
+        if _recv_exactly(sock, len(AMQP_PROTOCOL_HEADER)) != AMQP_PROTOCOL_HEADER or not ready:
+            return
+        # connection.start: versión 0-9, server_properties vacías, mecanismos y locales
+        payload = (
+            struct.pack(">hhbbi", 10, 10, 0, 9, 0)
+            + struct.pack(">i", 5) + b"PLAIN"
+            + struct.pack(">i", 5) + b"en_US"
+        )
+        sock.sendall(struct.pack(">bhi", 1, 0, len(payload)) + payload + AMQP_FRAME_END)
+
+
+def shell_wait_all(conditions: List[Condition], timeout: float = STANDIN_TIMEOUT) -> List[Optional[float]]:
+    """Ejecuta a la vez el bucle de shell de cada condición; latencia de cada una o None si no llegó a cumplirse"""
+    def run(condition: Condition) -> Optional[float]:
+        start = time.monotonic()
+        script = shell_wait(condition, timeout, interval=0.2)
+        code = subprocess.run(["bash", "-c", script], stdout=subprocess.DEVNULL).returncode
+        return time.monotonic() - start if code == 0 else None
+
+    with ThreadPoolExecutor(max_workers=len(conditions)) as executor:
+        return list(executor.map(run, conditions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba las condiciones de readiness contra stand-ins locales")
+    parser.add_argument("--zookeeper", type=float, default=2.0, help="Segundos hasta que ZooKeeper responde imok")
+    parser.add_argument("--kafka", type=float, default=3.0, help="Segundos desde ZooKeeper hasta que Kafka registra el broker")
+    parser.add_argument("--rabbitmq", type=float, default=4.0, help="Segundos hasta que RabbitMQ envía connection.start")
+    parser.add_argument("--listen", type=float, default=1.0, help="Segundos hasta que cada puerto acepta conexiones")
+    parser.add_argument("--shell", action="store_true", help="Usar los bucles de shell de la instancia en lugar de Python")
+    parser.add_argument("--timeout", type=float, default=STANDIN_TIMEOUT, help="Plazo de cada espera")
+    args = parser.parse_args()
+
+    zookeeper = ZookeeperStandIn(args.listen, args.zookeeper)
+    standins = [
+        zookeeper,
+        KafkaStandIn(args.listen, args.kafka, depends_on=zookeeper),
+        AmqpStandIn(args.listen, args.rabbitmq),
+    ]
+    for standin in standins:
+        standin.start()
+    print(f"🧪 Stand-ins en {', '.join(f'{s.name}:{s.port}' for s in standins)}")
+
+    try:
+        conditions = [standin.check() for standin in standins]
+        if args.shell:
+            latencies = shell_wait_all(conditions, args.timeout)
+        else:
+            latencies = [result.elapsed if result.ready else None for result in wait_all(conditions, args.timeout, verbose=False)]
+    finally:
+        for standin in standins:
+            standin.stop()
+
+    for standin, condition, latency in zip(standins, conditions, latencies):
+        expected = standin.ready_at() - standin.started
+        if latency is None:
+            print(f"⏱️  {standin.name} ({condition.protocol}) no disponible tras {args.timeout:g}s")
+        else:
+            print(f"✅ {standin.name} ({condition.protocol}) listo en {latency:.1f}s (disponible a los {expected:.1f}s)")
+    return 0 if all(latency is not None for latency in latencies) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
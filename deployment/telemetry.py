@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Instrumentación de los despliegues del Deployment Orchestrator
+Registra spans (llamadas a AWS, despliegue por instancia, pasos del script)
+e histogramas por fase, y los exporta como texto de Prometheus (archivo para
+el textfile collector o push al Pushgateway) y como traza JSON con el
+formato OTLP de OpenTelemetry
+"""
+
+import os
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Buckets (segundos) para llamadas a la API y para fases del despliegue
+API_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PHASE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+SERVICE_NAME = "deployment-orchestrator"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos, como el de los clientes de Prometheus"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class Telemetry:
+    """Spans e histogramas de un rollout; seguro para usar desde varios hilos"""
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Dict] = []
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self.help: Dict[str, str] = {}
+        self.root_span_id: Optional[str] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Dict]:
+        """Span con padre implícito: el span abierto en este hilo, o la raíz del rollout"""
+        stack = self._stack()
+        span = {
+            "span_id": os.urandom(8).hex(),
+            "parent_id": stack[-1]["span_id"] if stack else self.root_span_id,
+            "name": name,
+            "start": time.time(),
+            "end": None,
+            "attributes": dict(attributes),
+            "error": False
+        }
+        stack.append(span)
+        try:
+            yield span
+        except Exception:
+            span["error"] = True
+            raise
+        finally:
+            stack.pop()
+            span["end"] = time.time()
+            with self._lock:
+                self.spans.append(span)
+
+    @contextmanager
+    def root(self, name: str, **attributes) -> Iterator[Dict]:
+        """Span raíz: una traza nueva de la que cuelgan los spans de todos los hilos"""
+        self.trace_id = os.urandom(16).hex()
+        self.root_span_id = None
+        with self.span(name, **attributes) as span:
+            self.root_span_id = span["span_id"]
+            try:
+                yield span
+            finally:
+                self.root_span_id = None
+
+    def add_span(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        parent_id: Optional[str] = None,
+        error: bool = False,
+        **attributes
+    ):
+        """Span medido fuera del proceso (por ejemplo, un paso del script en la instancia)"""
+        with self._lock:
+            self.spans.append({
+                "span_id": os.urandom(8).hex(),
+                "parent_id": parent_id or self.current_span_id(),
+                "name": name,
+                "start": start,
+                "end": end,
+                "attributes": dict(attributes),
+                "error": error
+            })
+
+    def current_span_id(self) -> Optional[str]:
+        stack = self._stack()
+        return stack[-1]["span_id"] if stack else self.root_span_id
+
+    def observe(
+        self,
+        metric: str,
+        value: float,
+        buckets: Tuple[float, ...] = PHASE_BUCKETS,
+        description: str = "",
+        **labels
+    ):
+        key = tuple(sorted((name, str(label)) for name, label in labels.items()))
+        with self._lock:
+            self.help.setdefault(metric, description)
+            series = self.histograms.setdefault(metric, {})
+            series.setdefault(key, Histogram(buckets)).observe(value)
+
+    def set_gauge(self, metric: str, value: float, description: str = "", **labels):
+        key = tuple(sorted((name, str(label)) for name, label in labels.items()))
+        with self._lock:
+            self.help.setdefault(metric, description)
+            self.gauges.setdefault(metric, {})[key] = value
+
+    @contextmanager
+    def timed(
+        self,
+        metric: str,
+        buckets: Tuple[float, ...] = API_BUCKETS,
+        description: str = "",
+        **labels
+    ) -> Iterator[None]:
+        """Observa la duración del bloque en el histograma ``metric``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(metric, time.perf_counter() - start, buckets, description, **labels)
+
+    def to_prometheus(self) -> str:
+        """Formato de exposición de texto de Prometheus (válido para el Pushgateway)"""
+        lines = []
+        with self._lock:
+            for metric, series in sorted(self.histograms.items()):
+                lines.append(f"# HELP {metric} {self.help.get(metric) or metric}")
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in sorted(series.items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{metric}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+            for metric, series in sorted(self.gauges.items()):
+                lines.append(f"# HELP {metric} {self.help.get(metric) or metric}")
+                lines.append(f"# TYPE {metric} gauge")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(labels)} {value:.17g}")
+        return "\n".join(lines) + "\n"
+
+    def to_otlp_json(self) -> Dict:
+        """Traza en el formato JSON de OTLP (resourceSpans/scopeSpans/spans)"""
+        with self._lock:
+            spans = [
+                {
+                    "traceId": self.trace_id,
+                    "spanId": span["span_id"],
+                    "parentSpanId": span["parent_id"] or "",
+                    "name": span["name"],
+                    "kind": 1,
+                    "startTimeUnixNano": str(int(span["start"] * 1e9)),
+                    "endTimeUnixNano": str(int((span["end"] or span["start"]) * 1e9)),
+                    "attributes": [
+                        {"key": key, "value": _otlp_value(value)} for key, value in span["attributes"].items()
+                    ],
+                    "status": {"code": 2 if span["error"] else 1}
+                }
+                for span in sorted(self.spans, key=lambda span: span["start"])
+            ]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": "deployment.orchestrator"}, "spans": spans}]
+            }]
+        }
+
+    def write_prometheus(self, path: str):
+        """Escritura atómica, para el textfile collector de node_exporter"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def push(self, gateway_url: str, job: str, grouping: Optional[Dict[str, str]] = None, timeout: float = 10):
+        """PUT al Pushgateway: reemplaza todas las métricas del grupo ``job`` (+ ``grouping``)"""
+        path = f"/metrics/job/{job}" + "".join(f"/{key}/{value}" for key, value in (grouping or {}).items())
+        request = urllib.request.Request(
+            f"{gateway_url.rstrip('/')}{path}",
+            data=self.to_prometheus().encode(),
+            method="PUT",
+            headers={"Content-Type": "text/plain; version=0.0.4"}
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+    def _stack(self) -> List[Dict]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Topología de despliegue del Proyecto Acompañamiento
+Compila un único registro (servicio -> contenedor, imagen, instancia EC2,
+puerto) a partir de docker-compose.yml, .env.aws y .env.generated, lo valida
+y lo guarda en un JSON precompilado que se reutiliza mientras no cambie la
+fecha de modificación de ninguna fuente. Lo importan el orquestador, el
+monitor de despliegue, los tests de integración y los scripts de CI
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+COMPOSE_FILE = "docker-compose.yml"
+# Puertos de los servicios en AWS (<CONTENEDOR>_PORT) e IPs de las instancias (<ALIAS>_IP)
+PORTS_ENV_FILE = ".env.aws"
+IPS_ENV_FILE = ".env.generated"
+CACHE_FILE = REPO_ROOT / ".topology-cache.json"
+# Subir al cambiar el formato del registro para invalidar los caches existentes
+CACHE_VERSION = 2
+
+LABEL_INSTANCE = "acompanamiento.instance"
+LABEL_HEALTH = "acompanamiento.health"
+LABEL_PORT = "acompanamiento.port"
+
+
+class TopologyError(ValueError):
+    """La topología declarada es inconsistente (o no se pudo compilar)"""
+
+
+def service_name(compose_name: str) -> str:
+    """Nombre corto de un servicio: micro-reportes-estudiantes -> reportes_estudiantes"""
+    if compose_name.startswith("micro-"):
+        compose_name = compose_name[len("micro-"):]
+    return compose_name.replace("-", "_")
+
+
+def port_variable(container: str) -> str:
+    """Variable de .env.aws con el puerto de un contenedor: micro-auth -> MICRO_AUTH_PORT"""
+    return container.upper().replace("-", "_") + "_PORT"
+
+
+def ip_variable(alias: str) -> str:
+    """Variable de .env.generated con la IP de una instancia: core -> CORE_IP"""
+    return f"{alias.upper()}_IP"
+
+
+def read_env_file(path: Path) -> Dict[str, str]:
+    values = {}
+    if not path.exists():
+        return values
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, _, value = line.partition("=")
+            values[key.strip()] = value.strip().strip("'\"")
+    return values
+
+
+def _as_dict(value, separator: str = "=") -> Dict[str, str]:
+    """labels/environment de compose admiten mapa o lista "CLAVE=valor" """
+    if isinstance(value, dict):
+        return {str(key): "" if item is None else str(item) for key, item in value.items()}
+    result = {}
+    for item in value or []:
+        key, _, item_value = str(item).partition(separator)
+        result[key] = item_value
+    return result
+
+
+def _depends_on(spec: Dict) -> List[str]:
+    """depends_on de compose admite lista o mapa servicio -> condición"""
+    value = spec.get("depends_on") or []
+    return [service_name(name) for name in value]
+
+
+def _parse_port(value) -> Optional[int]:
+    try:
+        return int(str(value).split("/")[0])
+    except ValueError:
+        return None
+
+
+def _port_mappings(spec: Dict) -> List[Tuple[Optional[int], Optional[int]]]:
+    """(puerto publicado, puerto del contenedor) de cada entrada de ``ports``"""
+    mappings = []
+    for entry in spec.get("ports", []):
+        if isinstance(entry, dict):
+            mappings.append((_parse_port(entry.get("published")), _parse_port(entry.get("target"))))
+            continue
+        parts = str(entry).split(":")
+        container_port = _parse_port(parts[-1])
+        mappings.append((_parse_port(parts[-2]) if len(parts) > 1 else None, container_port))
+    return mappings
+
+
+def compile_registry(root: Path = REPO_ROOT) -> Dict:
+    """Lee las fuentes, resuelve puertos e IPs y valida el resultado"""
+    try:
+        import yaml
+    except ImportError:
+        raise TopologyError(
+            f"PyYAML no está instalado y {CACHE_FILE.name} no existe o está desactualizado respecto a "
+            f"{COMPOSE_FILE}, {PORTS_ENV_FILE} o {IPS_ENV_FILE}: pip install -r deployment/requirements.txt"
+        )
+
+    with open(root / COMPOSE_FILE) as f:
+        compose = yaml.safe_load(f) or {}
+    ports_env = read_env_file(root / PORTS_ENV_FILE)
+    ips_env = read_env_file(root / IPS_ENV_FILE)
+    errors = []
+
+    instances = {}
+    aliases = {}
+    for tag, spec in (compose.get("x-instances") or {}).items():
+        alias = spec.get("alias") or service_name(tag.lower().replace("ec2-", ""))
+        if alias in aliases:
+            errors.append(f"alias '{alias}' repetido en {aliases[alias]} y {tag}")
+        aliases[alias] = tag
+        instances[tag] = {
+            "alias": alias,
+            "ip": ips_env.get(ip_variable(alias)),
+            "compose_file": spec.get("compose_file"),
+            "services": []
+        }
+    if not instances:
+        errors.append(f"{COMPOSE_FILE} no declara x-instances")
+
+    services = {}
+    containers = {}
+    bound_ports = {}
+    for compose_name, spec in (compose.get("services") or {}).items():
+        spec = spec or {}
+        name = service_name(compose_name)
+        container = spec.get("container_name", compose_name)
+        labels = _as_dict(spec.get("labels"))
+        environment = _as_dict(spec.get("environment"))
+        mappings = _port_mappings(spec)
+
+        instance = labels.get(LABEL_INSTANCE)
+        if not instance:
+            errors.append(f"{compose_name}: falta la etiqueta {LABEL_INSTANCE}")
+            continue
+        if instance not in instances:
+            errors.append(f"{compose_name}: instancia desconocida '{instance}'")
+            continue
+        if container in containers:
+            errors.append(f"{compose_name}: contenedor '{container}' repetido (también en {containers[container]})")
+            continue
+        containers[container] = compose_name
+
+        # Puerto dentro del contenedor: PORT del servicio, el destino de ``ports`` o ``expose``
+        container_port = (
+            _parse_port(environment.get("PORT", ""))
+            or next((target for _, target in mappings if target), None)
+            or next((_parse_port(port) for port in spec.get("expose", [])), None)
+        )
+        # Puerto en la instancia: etiqueta explícita, .env.aws, lo publicado en local o el del contenedor
+        port_source = labels.get(LABEL_PORT) or ports_env.get(port_variable(container))
+        port = (
+            _parse_port(port_source) if port_source
+            else next((published for published, _ in mappings if published), None) or container_port
+        )
+        if port is None:
+            errors.append(f"{compose_name}: no se pudo determinar el puerto")
+            continue
+        if (instance, port) in bound_ports:
+            errors.append(f"{compose_name}: el puerto {port} de {instance} ya lo usa {bound_ports[(instance, port)]}")
+            continue
+        bound_ports[(instance, port)] = compose_name
+
+        services[name] = {
+            "container": container,
+            "image": spec.get("image"),
+            "instance": instance,
+            "port": port,
+            "container_port": container_port or port,
+            "health_path": labels.get(LABEL_HEALTH),
+            "depends_on": _depends_on(spec)
+        }
+        instances[instance]["services"].append(name)
+
+    for name, entry in services.items():
+        unknown = [dep for dep in entry["depends_on"] if dep not in services]
+        if unknown:
+            errors.append(f"{entry['container']}: depends_on de servicios sin desplegar: {', '.join(unknown)}")
+
+    if errors:
+        raise TopologyError("Topología inválida:\n" + "\n".join(f"  - {error}" for error in errors))
+    return {"instances": instances, "services": services}
+
+
+def source_key(root: Path = REPO_ROOT) -> Dict:
+    """Clave del cache: versión del formato y (mtime, tamaño) de cada fuente"""
+    sources = {}
+    for name in (COMPOSE_FILE, PORTS_ENV_FILE, IPS_ENV_FILE):
+        try:
+            stat = (root / name).stat()
+            sources[name] = [stat.st_mtime_ns, stat.st_size]
+        except FileNotFoundError:
+            sources[name] = None
+    return {"version": CACHE_VERSION, "sources": sources}
+
+
+class Topology:
+    """Registro compilado con índices por servicio, contenedor, instancia y puerto"""
+
+    def __init__(self, registry: Dict):
+        self.registry = registry
+        self.services: Dict[str, Dict] = registry["services"]
+        self.instances: Dict[str, Dict] = registry["instances"]
+        self._containers = {entry["container"]: name for name, entry in self.services.items()}
+        self._aliases = {entry["alias"]: tag for tag, entry in self.instances.items()}
+        self._compose_files = {entry["compose_file"]: tag for tag, entry in self.instances.items()}
+        self._ports = {(entry["instance"], entry["port"]): name for name, entry in self.services.items()}
+
+    def service(self, name: str) -> Dict:
+        return self.services[name]
+
+    def by_container(self, container: str) -> Optional[Dict]:
+        name = self._containers.get(container)
+        return self.services[name] if name else None
+
+    def instance(self, key: str) -> Dict:
+        """Instancia por tag (EC2-CORE) o por alias (core)"""
+        return self.instances[self._aliases.get(key, key)]
+
+    def instance_tag(self, key: str) -> Optional[str]:
+        """Tag de una instancia dada por tag, alias o docker-compose (docker-compose.ec2-core.yml)"""
+        tag = self._aliases.get(key) or self._compose_files.get(Path(key).name) or key
+        return tag if tag in self.instances else None
+
+    def service_at(self, instance: str, port: int) -> Optional[str]:
+        """Servicio que escucha en ``port`` de la instancia (tag o alias)"""
+        return self._ports.get((self._aliases.get(instance, instance), port))
+
+    def endpoint(self, name: str) -> Tuple[Optional[str], int]:
+        """(IP de la instancia, puerto) de un servicio"""
+        entry = self.services[name]
+        return self.instances[entry["instance"]]["ip"], entry["port"]
+
+    def http_services(self) -> Dict[str, Tuple[Optional[str], int]]:
+        """Servicios con health check HTTP -> (IP, puerto)"""
+        return {name: self.endpoint(name) for name, entry in self.services.items() if entry["health_path"]}
+
+    def alias(self, name: str) -> str:
+        """Alias de la instancia que aloja un servicio"""
+        return self.instances[self.services[name]["instance"]]["alias"]
+
+    def dependents(self, names) -> set:
+        """``names`` y los servicios que dependen de ellos, directa o transitivamente"""
+        affected = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for name, entry in self.services.items():
+                if name not in affected and affected.intersection(entry["depends_on"]):
+                    affected.add(name)
+                    changed = True
+        return affected
+
+    def impacted_services(self, instances) -> set:
+        """Servicios afectados al redesplegar ``instances`` (tags): los suyos y sus dependientes"""
+        return self.dependents(
+            name for tag in instances for name in self.instances[tag]["services"]
+        )
+
+    def missing_ips(self, names) -> Dict[str, str]:
+        """Servicios de ``names`` cuya instancia no tiene IP -> variable que falta en .env.generated"""
+        return {name: ip_variable(self.alias(name)) for name in names if not self.endpoint(name)[0]}
+
+    def instance_ips(self) -> Dict[str, str]:
+        """Alias -> IP de las instancias con IP conocida"""
+        return {entry["alias"]: entry["ip"] for entry in self.instances.values() if entry["ip"]}
+
+
+_loaded: Dict[Tuple[str, str], Topology] = {}
+
+
+def load(root: Path = REPO_ROOT, cache_file: Optional[Path] = CACHE_FILE) -> Topology:
+    """Topología desde el cache si sigue vigente; si no, la compila y reescribe el cache"""
+    root = Path(root)
+    key = (str(root), str(cache_file))
+    if key in _loaded:
+        return _loaded[key]
+
+    sources = source_key(root)
+    registry = None
+    if cache_file:
+        try:
+            with open(cache_file) as f:
+                cached = json.load(f)
+            if cached.get("key") == sources:
+                registry = cached["registry"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    if registry is None:
+        registry = compile_registry(root)
+        if cache_file:
+            try:
+                tmp_path = f"{cache_file}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump({"key": sources, "registry": registry}, f, indent=2)
+                os.replace(tmp_path, cache_file)
+            except OSError:
+                # Sin permisos de escritura se compila en cada ejecución
+                pass
+
+    _loaded[key] = Topology(registry)
+    return _loaded[key]
+
+
+def print_topology(topology: Topology):
+    for tag, instance in topology.instances.items():
+        print(f"\n🖥️  {tag} ({instance['alias']}, {instance['ip'] or 'sin IP'})")
+        for name in instance["services"]:
+            entry = topology.services[name]
+            health = f"  health {entry['health_path']}" if entry["health_path"] else ""
+            print(f"   {name:<22} {entry['container']:<28} {entry['port']:>5} -> {entry['container_port']:<5}{health}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila y valida la topología de despliegue")
+    parser.add_argument("--json", action="store_true", help="Imprimir el registro compilado en JSON")
+    parser.add_argument("--no-cache", action="store_true", help="Compilar ignorando el cache")
+    args = parser.parse_args()
+
+    try:
+        topology = Topology(compile_registry()) if args.no_cache else load()
+    except TopologyError as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.json:
+        print(json.dumps(topology.registry, indent=2))
+    else:
+        print_topology(topology)
+        print(f"\n✅ Topología válida: {len(topology.services)} servicios en {len(topology.instances)} instancias")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,87 +1,282 @@
 #!/usr/bin/env python3
 """
 Monitor y ejecutar tests - Auto-trigger cuando workflow complete
+Sigue a la vez todos los workflows de despliegue por instancia
+(.github/workflows/deploy-ec2-*.yml) con una sola consulta a GitHub por
+ciclo, y en cuanto terminan bien los workflows de un host ejecuta sólo los
+tests de integración afectados por sus servicios (--changed-instances)
 """
 
-import subprocess
-import time
+import argparse
 import json
+import re
+import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "deployment"))
+import readiness
+import topology
+
+WORKFLOWS_DIR = REPO_ROOT / ".github" / "workflows"
+WORKFLOW_PATTERN = "deploy-ec2-*.yml"
+TESTS_SCRIPT = REPO_ROOT / "tests" / "integration" / "service_flow_tests.py"
+WORKFLOW_TIMEOUT = 900  # 15 minutos
+# Una consulta a GitHub por ciclo para todos los workflows
+POLL_INTERVAL = 15
+# Ejecuciones recientes pedidas en cada consulta (de todos los workflows del repo)
+RUN_LIMIT = 50
+# Se siguen las ejecuciones creadas en los últimos LOOKBACK segundos
+LOOKBACK = 1800
+TESTS_TIMEOUT = 600  # 10 minutos
+# Plazo para que cada servicio encadene readiness.HEALTHY_STREAK health checks
+STABILIZE_TIMEOUT = 60
 
-def check_workflow_status():
-    """Verifica el estado del último workflow"""
+
+def discover_workflows() -> Dict[str, str]:
+    """Nombre de cada workflow de despliegue -> instancia (INSTANCE_NAME por defecto)"""
+    workflows = {}
+    for path in sorted(WORKFLOWS_DIR.glob(WORKFLOW_PATTERN)):
+        text = path.read_text()
+        name = re.search(r"^name:\s*(.+?)\s*$", text, re.MULTILINE)
+        instance = re.search(r"^\s*INSTANCE_NAME:.*'(EC2-[^']+)'", text, re.MULTILINE)
+        if name and instance:
+            workflows[name.group(1).strip("'\"")] = instance.group(1)
+        else:
+            print(f"⚠️  {path.name}: no se pudo leer el nombre o la instancia; se ignora")
+    return workflows
+
+
+def fetch_runs() -> Optional[List[Dict]]:
+    """Últimas ejecuciones de todos los workflows en una sola llamada a la API"""
     try:
         result = subprocess.run(
-            ["gh", "run", "list", "--workflow=deploy-docker-compose.yml", "--limit", "1", "--json", "status,conclusion"],
+            [
+                "gh", "run", "list", "--limit", str(RUN_LIMIT),
+                "--json", "databaseId,workflowName,status,conclusion,createdAt"
+            ],
             capture_output=True,
             text=True,
-            timeout=10
+            timeout=30
         )
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            if data:
-                return data[0].get("status"), data[0].get("conclusion")
-    except Exception as e:
-        print(f"Error: {e}")
-    
-    return None, None
-
-def wait_for_workflow():
-    """Espera a que el workflow complete"""
-    print("⏳ Esperando a que workflow complete...")
-    max_wait = 900  # 15 minutos
-    elapsed = 0
-    
-    while elapsed < max_wait:
-        status, conclusion = check_workflow_status()
-        
-        print(f"  Status: {status} | Conclusion: {conclusion} | Tiempo: {elapsed}s")
-        
-        if status == "completed":
-            print(f"\n✅ Workflow completado con conclusion: {conclusion}")
-            return conclusion == "success"
-        
-        time.sleep(30)
-        elapsed += 30
-    
-    print(f"\n⏱️ Timeout después de {max_wait}s")
-    return False
-
-def run_tests():
-    """Ejecuta los tests de flujos"""
-    print("\n" + "="*80)
-    print("🧪 EJECUTANDO TESTS DE FLUJOS")
-    print("="*80 + "\n")
-    
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"⚠️  Error consultando GitHub: {e}")
+        return None
+    if result.returncode != 0:
+        print(f"⚠️  gh run list falló: {result.stderr.strip()}")
+        return None
     try:
-        result = subprocess.run(
-            ["python", "tests/integration/service_flow_tests.py"],
-            timeout=600  # 10 minutos
-        )
-        return result.returncode == 0
-    except Exception as e:
-        print(f"❌ Error ejecutando tests: {e}")
-        return False
+        return json.loads(result.stdout)
+    except ValueError as e:
+        print(f"⚠️  Respuesta inválida de gh run list: {e}")
+        return None
+
+
+def parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class Host:
+    """Una IP con sus workflows de despliegue y los servicios HTTP afectados al redesplegarla"""
+
+    def __init__(self, ip: str, instances: List[str], services: List[str]):
+        self.ip = ip
+        self.instances = instances
+        self.services = services
+        # Última ejecución de cada workflow que despliega en este host
+        self.runs: Dict[str, Dict] = {}
+        # Ejecuciones ya evaluadas (para no repetir los tests con el mismo despliegue)
+        self.handled: Optional[frozenset] = None
+
+    @property
+    def label(self) -> str:
+        return f"{', '.join(self.instances)} ({self.ip})"
+
+    def completed(self) -> bool:
+        return bool(self.runs) and all(run["status"] == "completed" for run in self.runs.values())
+
+    def failed_workflows(self) -> List[str]:
+        return [name for name, run in self.runs.items() if run["conclusion"] != "success"]
+
+
+class Watcher:
+    """Sigue los workflows por host y lanza los tests de cada host en paralelo"""
+
+    def __init__(self, workflows: Dict[str, str], since: datetime):
+        self.workflows = workflows
+        self.since = since
+        topo = topology.load()
+
+        self.hosts: Dict[str, Host] = {}
+        self.workflow_hosts: Dict[str, Host] = {}
+        # Sin IP no se pueden probar los servicios del host: es un error, no un workflow que se ignora
+        missing = [
+            f"'{name}': {tag} sin IP (falta {topology.ip_variable(topo.instance(tag)['alias'])} en {topology.IPS_ENV_FILE})"
+            for name, tag in workflows.items() if not topo.instance(tag)["ip"]
+        ]
+        if missing:
+            raise topology.TopologyError(
+                "Workflows sin host al que lanzar los tests (scripts/sync-ips-to-config.py):\n"
+                + "\n".join(f"  - {entry}" for entry in missing)
+            )
+
+        http_services = topo.http_services()
+        for name, tag in workflows.items():
+            ip = topo.instance(tag)["ip"]
+            if ip not in self.hosts:
+                instances = [t for t, entry in topo.instances.items() if entry["ip"] == ip]
+                impacted = topo.impacted_services(instances)
+                services = [service for service in http_services if service in impacted]
+                self.hosts[ip] = Host(ip, instances, services)
+            self.workflow_hosts[name] = self.hosts[ip]
+
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.hosts)))
+        self.pending: List[Future] = []
+        self.failures: List[str] = []
+        self._print_lock = threading.Lock()
+
+    def update(self, runs: List[Dict]):
+        """Se queda con la ejecución más reciente de cada workflow dentro de la ventana"""
+        for run in runs:
+            host = self.workflow_hosts.get(run.get("workflowName"))
+            if not host or parse_time(run["createdAt"]) < self.since:
+                continue
+            current = host.runs.get(run["workflowName"])
+            if not current or run["createdAt"] > current["createdAt"]:
+                host.runs[run["workflowName"]] = run
+
+    def evaluate(self):
+        """Lanza los tests de los hosts cuyos workflows ya terminaron"""
+        for host in self.hosts.values():
+            if not host.completed():
+                continue
+            key = frozenset(run["databaseId"] for run in host.runs.values())
+            if key == host.handled:
+                continue
+            host.handled = key
+
+            failed = host.failed_workflows()
+            if failed:
+                print(f"❌ {host.label}: falló {', '.join(failed)}; no se ejecutan sus tests")
+                self.failures.append(f"workflow {', '.join(failed)}")
+            elif not host.services:
+                print(f"✅ {host.label}: desplegado (no afecta a ningún flujo con tests de integración)")
+            else:
+                print(f"✅ {host.label}: desplegado → tests de {', '.join(host.services)}")
+                self.pending.append(self.executor.submit(self.test_host, host, host.services))
+
+    def test_host(self, host: Host, services: List[str]) -> bool:
+        """Espera a que los servicios afectados estén estables y ejecuta sólo sus tests"""
+        topo = topology.load()
+        results = readiness.wait_all([
+            readiness.HttpHealthy("http://{}:{}/health".format(*topo.endpoint(service)), name=service)
+            for service in services
+        ], timeout=STABILIZE_TIMEOUT, verbose=False)
+
+        try:
+            result = subprocess.run(
+                [sys.executable, str(TESTS_SCRIPT), "--changed-instances", ",".join(host.instances)],
+                capture_output=True,
+                text=True,
+                timeout=TESTS_TIMEOUT
+            )
+            output, success = result.stdout + result.stderr, result.returncode == 0
+        except Exception as e:
+            output, success = f"❌ Error ejecutando tests: {e}\n", False
+
+        # La salida de cada host se imprime entera para no mezclarla con la de los demás
+        with self._print_lock:
+            print("\n" + "=" * 80)
+            print(f"🧪 TESTS DE {host.label}: {', '.join(services)}")
+            print("=" * 80)
+            for wait_result in results:
+                print(wait_result)
+            print(output)
+            print(f"{'✅' if success else '❌'} Tests de {host.label}: {'OK' if success else 'con fallos'}")
+        if not success:
+            self.failures.append(f"tests de {host.label}")
+        return success
+
+    def in_progress(self) -> List[str]:
+        return [
+            name for host in self.hosts.values()
+            for name, run in host.runs.items() if run["status"] != "completed"
+        ]
+
+    def done(self) -> bool:
+        """Hay ejecuciones en la ventana, todas terminaron y sus tests también"""
+        tracked = any(host.runs for host in self.hosts.values())
+        return tracked and not self.in_progress() and all(future.done() for future in self.pending)
+
+
+def watch(watcher: Watcher, timeout: float, interval: float) -> bool:
+    start = time.monotonic()
+    while True:
+        runs = fetch_runs()
+        if runs is not None:
+            watcher.update(runs)
+            watcher.evaluate()
+        if watcher.done():
+            return True
+
+        elapsed = time.monotonic() - start
+        if elapsed + interval > timeout:
+            print(f"\n⏱️ Timeout después de {elapsed:.0f}s")
+            running = watcher.in_progress()
+            if running:
+                print(f"   Workflows sin terminar: {', '.join(running)}")
+            if not any(host.runs for host in watcher.hosts.values()):
+                print(f"   Ninguna ejecución de {WORKFLOW_PATTERN} en la ventana")
+            return False
+        time.sleep(interval)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sigue los workflows de despliegue y ejecuta los tests de cada host")
+    parser.add_argument("--timeout", type=float, default=WORKFLOW_TIMEOUT, help="Plazo total en segundos")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Segundos entre consultas a GitHub")
+    parser.add_argument(
+        "--lookback",
+        type=float,
+        default=LOOKBACK,
+        help="Seguir las ejecuciones creadas en los últimos N segundos"
+    )
+    return parser.parse_args()
+
 
 def main():
-    print("🎯 AUTO-MONITOR: Esperando workflow + Tests automáticos\n")
-    
-    # Esperar a que workflow complete
-    success = wait_for_workflow()
-    
-    if not success:
-        print("\n❌ Workflow no completó exitosamente. Abortando tests.")
+    args = parse_args()
+    print("🎯 AUTO-MONITOR: Esperando workflows + Tests automáticos por host\n")
+
+    workflows = discover_workflows()
+    if not workflows:
+        print(f"❌ No hay workflows {WORKFLOW_PATTERN} en {WORKFLOWS_DIR}")
         return 1
-    
-    # Esperar un poco para que servicios estabilicen
-    print("\n⏳ Esperando 15 segundos para que servicios estabilicen...")
-    time.sleep(15)
-    
-    # Ejecutar tests
-    test_success = run_tests()
-    
-    return 0 if test_success else 1
+    since = datetime.now(timezone.utc) - timedelta(seconds=args.lookback)
+    try:
+        watcher = Watcher(workflows, since)
+    except topology.TopologyError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"⏳ Siguiendo {len(watcher.workflow_hosts)} workflows en {len(watcher.hosts)} hosts...\n")
+
+    finished = watch(watcher, args.timeout, args.interval)
+    # Los tests ya lanzados terminan aunque haya vencido el plazo de los workflows
+    watcher.executor.shutdown(wait=True)
+
+    if not finished or watcher.failures:
+        for failure in watcher.failures:
+            print(f"❌ {failure}")
+        return 1
+    print("\n✅ Todos los despliegues y sus tests terminaron correctamente")
+    return 0
+
 
 if __name__ == "__main__":
     sys.exit(main())
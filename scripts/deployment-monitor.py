@@ -2,37 +2,62 @@
 """
 Monitor y validador de despliegue - Proyecto Acompañamiento
 Espera a que los servicios estén disponibles y ejecuta tests
+Con --daemon queda sondeando /health de forma continua y expone las
+latencias en /metrics para Prometheus
 """
 
+import argparse
+import asyncio
+import random
+import statistics
 import subprocess
 import sys
+import threading
 import time
-import requests
 import json
+from collections import deque
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
 
 # Configuración
 REPO_ROOT = Path(__file__).parent.parent
 TESTS_DIR = REPO_ROOT / "tests" / "integration"
 SCRIPTS_DIR = REPO_ROOT / "scripts"
 
-INSTANCES = {
-    'core': '3.236.99.88',
-    'api_gateway': '98.86.94.92',
-    'notifications': '98.92.17.165',
-}
-
-SERVICES = {
-    'api_gateway': ('98.86.94.92', 8080),
-    'auth': ('3.236.99.88', 5005),
-    'estudiantes': ('3.236.99.88', 5002),
-    'maestros': ('3.236.99.88', 5001),
-    'notificaciones': ('98.92.17.165', 5006),
-    'reportes_estudiantes': ('3.236.99.88', 5003),
-    'reportes_maestros': ('3.236.99.88', 5004),
-    'analytics': ('3.236.99.88', 5007),
-}
+# Topología compartida con el orquestador y los tests (deployment/topology.py)
+sys.path.insert(0, str(REPO_ROOT / "deployment"))
+import readiness
+import topology
+
+TOPOLOGY = topology.load()
+INSTANCES = TOPOLOGY.instance_ips()
+# Servicios con health check HTTP -> (IP, puerto)
+SERVICES = TOPOLOGY.http_services()
+# Servicios cuya instancia no tiene IP -> variable que falta; el monitor no arranca sin ellas
+MISSING_IPS = TOPOLOGY.missing_ips(SERVICES)
+
+# Sondeo asíncrono: backoff exponencial por servicio con jitter (segundos)
+PROBE_TIMEOUT = 3
+PROBE_BASE_DELAY = 0.5
+PROBE_MAX_DELAY = 10
+PROBE_MAX_CONNECTIONS_PER_HOST = 4
+
+# Plazo para que cada servicio encadene readiness.HEALTHY_STREAK health checks
+STABILIZE_TIMEOUT = 60
+
+# Modo daemon: intervalo entre sondeos, tamaño de la ventana rodante por
+# servicio (muestras) y detección de degradación: la mediana de las últimas
+# DAEMON_RECENT muestras supera DEGRADATION_FACTOR veces la del resto de la
+# ventana y al menos DEGRADATION_MIN_DELTA segundos
+DAEMON_INTERVAL = 15
+DAEMON_WINDOW = 240
+DAEMON_RECENT = 8
+DEGRADATION_FACTOR = 2.0
+DEGRADATION_MIN_DELTA = 0.05
+METRICS_PORT = 9108
+QUANTILES = (0.5, 0.9, 0.99)
 
 class ColorText:
     HEADER = '\033[95m'
@@ -68,50 +93,433 @@ def print_header(text):
     print(f"{ColorText.BOLD}{ColorText.BLUE}{'='*80}{ColorText.ENDC}\n")
 
 
-def check_service_availability(service_name: str, ip: str, port: int, timeout: int = 5, retries: int = 3) -> bool:
-    """Verifica que un servicio esté disponible"""
+class AsyncHTTPPool:
+    """Pool mínimo de conexiones HTTP/1.1 keep-alive sobre asyncio streams
+
+    Reutiliza las conexiones por (host, puerto) y limita cuántas hay abiertas
+    a la vez contra cada host, de modo que sondear muchos servicios del mismo
+    EC2 no abre una conexión TCP nueva por intento.
+    """
+
+    def __init__(self, max_per_host: int = PROBE_MAX_CONNECTIONS_PER_HOST):
+        self.max_per_host = max_per_host
+        self._idle: Dict[Tuple[str, int], List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def get(self, host: str, port: int, path: str, timeout: float) -> Tuple[int, bytes]:
+        """GET con timeout total; reintenta si la conexión reutilizada estaba cerrada
+
+        El reintento (y la conexión nueva) se descuentan del mismo plazo: la
+        llamada nunca tarda más de ``timeout`` en total.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        def remaining() -> float:
+            left = deadline - loop.time()
+            if left <= 0:
+                raise asyncio.TimeoutError()
+            return left
+
+        limit = self._limits.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        async with limit:
+            idle = self._idle.setdefault((host, port), [])
+            while True:
+                reused = bool(idle)
+                reader, writer = idle.pop() if reused else await asyncio.wait_for(
+                    asyncio.open_connection(host, port), remaining()
+                )
+                try:
+                    status, body, keep_alive = await asyncio.wait_for(
+                        self._request(reader, writer, host, port, path), remaining()
+                    )
+                except (OSError, EOFError, ValueError, asyncio.TimeoutError):
+                    writer.close()
+                    if reused:
+                        continue
+                    raise
+
+                if keep_alive:
+                    idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, body
+
+    async def close(self):
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+    @staticmethod
+    async def _request(reader, writer, host: str, port: int, path: str) -> Tuple[int, bytes, bool]:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+            f"User-Agent: deployment-monitor\r\nConnection: keep-alive\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise EOFError("conexión cerrada por el servidor")
+        parts = status_line.split()
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/") or not (parts[1].isdigit() and len(parts[1]) == 3):
+            raise ValueError(f"línea de estado HTTP inválida: {status_line[:80]!r}")
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        keep_alive = headers.get("connection") != "close"
+        if "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            body = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+        else:
+            body = await reader.read()
+            keep_alive = False
+
+        return status, body, keep_alive
+
+
+async def probe_service(pool: AsyncHTTPPool, ip: str, port: int, timeout: float = PROBE_TIMEOUT) -> Tuple[bool, str]:
+    """Sondea /health una vez; devuelve (disponible, detalle)"""
+    try:
+        status, _ = await pool.get(ip, port, "/health", timeout)
+    except asyncio.TimeoutError:
+        return False, f"timeout tras {timeout}s"
+    except (OSError, EOFError, ValueError) as e:
+        return False, str(e) or type(e).__name__
+    return status == 200, f"HTTP {status}"
+
+
+async def check_service_availability_async(
+    pool: AsyncHTTPPool,
+    service_name: str,
+    ip: str,
+    port: int,
+    timeout: float = PROBE_TIMEOUT,
+    retries: int = 3,
+    retry_delay: float = 2,
+    verbose: bool = True
+) -> Tuple[bool, str]:
+    """Verifica que un servicio esté disponible; devuelve (disponible, detalle)
+
+    Es la comprobación común a todos los modos del monitor: la espera
+    post-deploy, el modo demonio y ``check_service_availability`` deciden
+    el estado de un servicio con el mismo sondeo de /health.
+    """
     for attempt in range(retries):
-        try:
-            response = requests.get(f"http://{ip}:{port}/health", timeout=timeout)
-            if response.status_code == 200:
+        available, detail = await probe_service(pool, ip, port, timeout)
+        if available:
+            if verbose:
                 print(ColorText.success(f"{service_name} ({ip}:{port}) - disponible"))
-                return True
-        except Exception as e:
-            if attempt < retries - 1:
+            return True, detail
+        if attempt < retries - 1:
+            if verbose:
                 print(ColorText.warning(f"{service_name} - intento {attempt + 1}/{retries} falló, reintentando..."))
-                time.sleep(2)
+            await asyncio.sleep(retry_delay)
+    if verbose:
+        print(ColorText.error(f"{service_name} ({ip}:{port}) - NO disponible: {detail}"))
+    return False, detail
+
+
+def check_service_availability(service_name: str, ip: str, port: int, timeout: int = 5, retries: int = 3) -> bool:
+    """Verifica que un servicio esté disponible"""
+    async def check() -> bool:
+        pool = AsyncHTTPPool()
+        try:
+            available, _ = await check_service_availability_async(pool, service_name, ip, port, timeout, retries)
+        finally:
+            await pool.close()
+        return available
+
+    return asyncio.run(check())
+
+
+async def wait_for_services_async(
+    services: Dict[str, Tuple[str, int]],
+    timeout_total: float = 300,
+    probe_timeout: float = PROBE_TIMEOUT,
+    base_delay: float = PROBE_BASE_DELAY,
+    max_delay: float = PROBE_MAX_DELAY
+) -> Tuple[bool, Dict[str, Optional[float]]]:
+    """Sondea todos los servicios concurrentemente hasta que estén disponibles
+
+    Cada servicio tiene su propia tarea: sólo los que siguen fallando se
+    vuelven a sondear, con backoff exponencial y jitter, y la espera termina
+    en cuanto el último responde. Devuelve (todos_listos, segundos hasta que
+    cada servicio estuvo listo o None si no llegó a estarlo).
+    """
+    pool = AsyncHTTPPool()
+    start_time = time.monotonic()
+    ready_at: Dict[str, Optional[float]] = {name: None for name in services}
+
+    async def watch(service_name: str, ip: str, port: int):
+        attempt = 0
+        while True:
+            available, detail = await check_service_availability_async(
+                pool, service_name, ip, port, probe_timeout, retries=1, verbose=False
+            )
+            if available:
+                ready_at[service_name] = time.monotonic() - start_time
+                ready_count = sum(1 for elapsed in ready_at.values() if elapsed is not None)
+                print(ColorText.success(
+                    f"{service_name} ({ip}:{port}) - disponible en {ready_at[service_name]:.1f}s "
+                    f"[{ready_count}/{len(services)}]"
+                ))
+                return
+
+            attempt += 1
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            if attempt == 1 or attempt % 5 == 0:
+                print(ColorText.warning(
+                    f"{service_name} ({ip}:{port}) - intento {attempt} falló ({detail}), reintento en {delay:.1f}s"
+                ))
+            await asyncio.sleep(delay)
+
+    tasks = [asyncio.create_task(watch(name, ip, port)) for name, (ip, port) in services.items()]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=timeout_total)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    finally:
+        await pool.close()
+
+    return all(elapsed is not None for elapsed in ready_at.values()), ready_at
+
+
+class LatencyWindow:
+    """Ventana rodante acotada (ring buffer) con los últimos sondeos de un servicio"""
+
+    def __init__(self, size: int = DAEMON_WINDOW, recent: int = DAEMON_RECENT):
+        self.samples: Deque[Tuple[float, float, bool]] = deque(maxlen=size)
+        self.recent = recent
+        self.up: Optional[bool] = None
+        self.degraded = False
+        self.detail = ""
+        # Acumulados desde el arranque, para los _count/_sum de Prometheus
+        self.count = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+
+    def record(self, latency: float, ok: bool, detail: str):
+        self.samples.append((time.time(), latency, ok))
+        self.detail = detail
+        self.count += 1
+        self.latency_sum += latency
+        if not ok:
+            self.errors += 1
+
+    def latencies(self) -> List[float]:
+        """Latencias de los sondeos exitosos (los timeouts distorsionarían los cuantiles)"""
+        return [latency for _, latency, ok in self.samples if ok]
+
+    def quantile(self, q: float) -> Optional[float]:
+        ordered = sorted(self.latencies())
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def error_ratio(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    def baseline(self) -> Tuple[Optional[float], Optional[float]]:
+        """(mediana de referencia, mediana reciente); None si aún no hay muestras suficientes"""
+        latencies = self.latencies()
+        if len(latencies) < self.recent * 3:
+            return None, None
+        return statistics.median(latencies[:-self.recent]), statistics.median(latencies[-self.recent:])
+
+    def check_degradation(self, factor: float, min_delta: float) -> bool:
+        """Actualiza ``degraded``; devuelve True si el estado cambió"""
+        reference, current = self.baseline()
+        if reference is None:
+            return False
+        degraded = current > reference * factor and current - reference > min_delta
+        changed = degraded != self.degraded
+        self.degraded = degraded
+        return changed
+
+
+class ProbeDaemon:
+    """Estado compartido entre las tareas de sondeo y el servidor de /metrics"""
+
+    def __init__(
+        self,
+        services: Dict[str, Tuple[str, int]],
+        window: int = DAEMON_WINDOW,
+        recent: int = DAEMON_RECENT,
+        degradation_factor: float = DEGRADATION_FACTOR,
+        degradation_min_delta: float = DEGRADATION_MIN_DELTA
+    ):
+        self.services = services
+        self.windows = {name: LatencyWindow(window, recent) for name in services}
+        self.degradation_factor = degradation_factor
+        self.degradation_min_delta = degradation_min_delta
+        self._lock = threading.Lock()
+
+    def record(self, service_name: str, latency: float, ok: bool, detail: str):
+        ip, port = self.services[service_name]
+        with self._lock:
+            window = self.windows[service_name]
+            window.record(latency, ok, detail)
+            was_up, window.up = window.up, ok
+            degradation_changed = ok and window.check_degradation(
+                self.degradation_factor, self.degradation_min_delta
+            )
+            reference, current = window.baseline()
+
+        if was_up is not ok:
+            if ok:
+                print(ColorText.success(f"{service_name} ({ip}:{port}) - disponible ({latency * 1000:.0f}ms)"))
+            else:
+                print(ColorText.error(f"{service_name} ({ip}:{port}) - NO disponible: {detail}"))
+        if degradation_changed:
+            if window.degraded:
+                print(ColorText.warning(
+                    f"{service_name} ({ip}:{port}) - latencia degradada: mediana reciente "
+                    f"{current * 1000:.0f}ms vs {reference * 1000:.0f}ms de referencia"
+                ))
             else:
-                print(ColorText.error(f"{service_name} ({ip}:{port}) - NO disponible: {e}"))
-                return False
-    return False
+                print(ColorText.success(f"{service_name} ({ip}:{port}) - latencia recuperada ({current * 1000:.0f}ms)"))
+
+    def to_prometheus(self) -> str:
+        """Formato de exposición de texto de Prometheus"""
+        metrics = {
+            "probe_up": ("gauge", "1 si el último sondeo de /health respondió 200"),
+            "probe_latency_seconds": ("summary", "Latencia de /health en la ventana rodante"),
+            "probe_window_error_ratio": ("gauge", "Proporción de sondeos fallidos en la ventana rodante"),
+            "probe_latency_baseline_seconds": ("gauge", "Mediana de referencia usada para detectar degradación"),
+            "probe_latency_degraded": ("gauge", "1 si la latencia reciente está degradada respecto a la referencia"),
+            "probe_errors_total": ("counter", "Sondeos fallidos desde el arranque"),
+        }
+        lines = []
+        with self._lock:
+            for metric, (kind, description) in metrics.items():
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} {kind}")
+                for name, window in self.windows.items():
+                    ip, port = self.services[name]
+                    labels = f'service="{name}",target="{ip}:{port}"'
+                    if metric == "probe_up":
+                        if window.up is not None:
+                            lines.append(f"{metric}{{{labels}}} {int(window.up)}")
+                    elif metric == "probe_latency_seconds":
+                        for q in QUANTILES:
+                            value = window.quantile(q)
+                            if value is not None:
+                                lines.append(f'{metric}{{{labels},quantile="{q:g}"}} {value:.6f}')
+                        lines.append(f"{metric}_sum{{{labels}}} {window.latency_sum:.6f}")
+                        lines.append(f"{metric}_count{{{labels}}} {window.count}")
+                    elif metric == "probe_window_error_ratio":
+                        lines.append(f"{metric}{{{labels}}} {window.error_ratio():.6f}")
+                    elif metric == "probe_latency_baseline_seconds":
+                        reference, _ = window.baseline()
+                        if reference is not None:
+                            lines.append(f"{metric}{{{labels}}} {reference:.6f}")
+                    elif metric == "probe_latency_degraded":
+                        lines.append(f"{metric}{{{labels}}} {int(window.degraded)}")
+                    elif metric == "probe_errors_total":
+                        lines.append(f"{metric}{{{labels}}} {window.errors}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Sirve /metrics (Prometheus) y /health"""
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body = self.server.probe_daemon.to_prometheus().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/health":
+            body = b'{"status":"ok"}'
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(probe_daemon: ProbeDaemon, port: int = METRICS_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    server.daemon_threads = True
+    server.probe_daemon = probe_daemon
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_probe_daemon(
+    probe_daemon: ProbeDaemon,
+    interval: float = DAEMON_INTERVAL,
+    probe_timeout: float = PROBE_TIMEOUT
+):
+    """Sondea cada servicio cada ``interval`` segundos, concurrentemente y sin fin
+
+    Los arranques se reparten al azar dentro del primer intervalo para no
+    sondear todos los servicios del mismo EC2 en el mismo instante.
+    """
+    pool = AsyncHTTPPool()
+
+    async def probe_loop(service_name: str, ip: str, port: int):
+        await asyncio.sleep(random.uniform(0, interval))
+        while True:
+            start = time.perf_counter()
+            # Un único intento por tick y sin imprimir: ProbeDaemon.record
+            # sólo informa de los cambios de estado
+            ok, detail = await check_service_availability_async(
+                pool, service_name, ip, port, probe_timeout, retries=1, verbose=False
+            )
+            latency = time.perf_counter() - start
+            probe_daemon.record(service_name, latency, ok, detail)
+            await asyncio.sleep(max(0.0, interval - latency))
+
+    try:
+        await asyncio.gather(*(
+            probe_loop(name, ip, port) for name, (ip, port) in probe_daemon.services.items()
+        ))
+    finally:
+        await pool.close()
 
 
 def wait_for_all_services(timeout_total: int = 300) -> bool:
     """Espera a que todos los servicios estén disponibles"""
     print_header("ESPERANDO DISPONIBILIDAD DE SERVICIOS")
 
-    start_time = time.time()
-    all_services_ready = False
-
-    while time.time() - start_time < timeout_total:
-        ready_count = 0
-        total_count = len(SERVICES)
-
-        for service_name, (ip, port) in SERVICES.items():
-            if check_service_availability(service_name, ip, port, timeout=3, retries=1):
-                ready_count += 1
+    all_services_ready, ready_at = asyncio.run(wait_for_services_async(SERVICES, timeout_total))
+    ready_count = sum(1 for elapsed in ready_at.values() if elapsed is not None)
 
-        print(f"\n📊 Servicios listos: {ready_count}/{total_count}")
+    print(f"\n📊 Servicios listos: {ready_count}/{len(SERVICES)}")
 
-        if ready_count == total_count:
-            all_services_ready = True
-            print(ColorText.success(f"¡Todos los servicios están disponibles!"))
-            break
-        else:
-            remaining_time = timeout_total - (time.time() - start_time)
-            if remaining_time > 0:
-                print(ColorText.info(f"Esperando... ({int(remaining_time)}s restantes)"))
-                time.sleep(10)
+    if all_services_ready:
+        print(ColorText.success(f"¡Todos los servicios están disponibles en {max(ready_at.values()):.1f}s!"))
+    else:
+        missing = [name for name, elapsed in ready_at.items() if elapsed is None]
+        print(ColorText.error(f"Servicios no disponibles tras {timeout_total}s: {', '.join(missing)}"))
 
     return all_services_ready
 
@@ -241,7 +649,53 @@ def generate_report(test_results: dict):
         return False
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Monitor y validador de despliegue")
+    parser.add_argument("--daemon", action="store_true", help="Sondeo continuo de /health con métricas en /metrics")
+    parser.add_argument("--interval", type=float, default=DAEMON_INTERVAL, help="Segundos entre sondeos (daemon)")
+    parser.add_argument("--window", type=int, default=DAEMON_WINDOW, help="Muestras por servicio en la ventana rodante")
+    parser.add_argument("--recent", type=int, default=DAEMON_RECENT, help="Muestras recientes comparadas con la referencia")
+    parser.add_argument(
+        "--degradation-factor",
+        type=float,
+        default=DEGRADATION_FACTOR,
+        help="Cuántas veces la mediana de referencia se considera degradación"
+    )
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Puerto del endpoint /metrics")
+    return parser.parse_args()
+
+
+def run_daemon(args) -> int:
+    print_header("SONDEO CONTINUO DE SERVICIOS")
+    probe_daemon = ProbeDaemon(
+        SERVICES,
+        window=args.window,
+        recent=args.recent,
+        degradation_factor=args.degradation_factor
+    )
+    server = start_metrics_server(probe_daemon, args.metrics_port)
+    print(ColorText.info(
+        f"{len(SERVICES)} servicios cada {args.interval:g}s; métricas en http://0.0.0.0:{args.metrics_port}/metrics"
+    ))
+    try:
+        asyncio.run(run_probe_daemon(probe_daemon, args.interval))
+    except KeyboardInterrupt:
+        print(ColorText.info("Sondeo detenido"))
+    finally:
+        server.shutdown()
+    return 0
+
+
 def main():
+    args = parse_args()
+    if MISSING_IPS:
+        for service, variable in MISSING_IPS.items():
+            print(ColorText.error(f"{service} sin IP: falta {variable} en {topology.IPS_ENV_FILE}"))
+        print(ColorText.info("Generarlas con scripts/sync-ips-to-config.py"))
+        return 1
+    if args.daemon:
+        return run_daemon(args)
+
     print(f"\n{ColorText.BOLD}{ColorText.CYAN}🎯 INICIANDO VALIDACIÓN DE DESPLIEGUE{ColorText.ENDC}")
     print(f"Timestamp: {datetime.now().isoformat()}\n")
 
@@ -257,9 +711,13 @@ def main():
         generate_report(results)
         return 1
 
-    # 2. Esperar un poco más para que los servicios estabilicen
-    print(ColorText.info("Esperando 10 segundos para que servicios estabilicen..."))
-    time.sleep(10)
+    # 2. Estables: /health responde 200 varias veces seguidas en todos los servicios
+    print(ColorText.info(f"Esperando {readiness.HEALTHY_STREAK} health checks seguidos por servicio..."))
+    stable = readiness.wait_all([
+        readiness.HttpHealthy(f"http://{ip}:{port}/health", name=service)
+        for service, (ip, port) in SERVICES.items()
+    ], timeout=STABILIZE_TIMEOUT)
+    results['services_stable'] = all(result.ready for result in stable)
 
     # 3. Ejecutar tests
     print_header("FASE 2: EJECUCIÓN DE TESTS")
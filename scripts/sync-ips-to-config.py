@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Generador de .env.generated - Proyecto Acompañamiento
+Resuelve con un único describe_instances paginado la IP pública de las
+instancias running de todas las x-instances de docker-compose.yml y
+escribe <ALIAS>_IP para cada una, más las URLs del API Gateway y del
+frontend. Una instancia sin ninguna running no se escribe: la topología
+(deployment/topology.py) la deja sin IP y el monitor y auto-run-tests.py
+se niegan a arrancar hasta que la tenga
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(REPO_ROOT / "deployment"))
+import topology
+from backends import AwsBackend
+
+OUTPUT_FILE = REPO_ROOT / topology.IPS_ENV_FILE
+# Puerto del frontend estático (no es un servicio de la topología)
+FRONTEND_PORT = 5500
+
+
+def resolve_public_ips(ec2, tags: List[str]) -> Dict[str, str]:
+    """Tag Name -> IP pública de su instancia running más antigua"""
+    found: Dict[str, List] = {}
+    pages = ec2.get_paginator("describe_instances").paginate(
+        Filters=[
+            {"Name": "tag:Name", "Values": tags},
+            {"Name": "instance-state-name", "Values": ["running"]}
+        ]
+    )
+    for page in pages:
+        for reservation in page["Reservations"]:
+            for instance in reservation["Instances"]:
+                name = next((tag["Value"] for tag in instance.get("Tags", []) if tag["Key"] == "Name"), None)
+                if name in tags and instance.get("PublicIpAddress"):
+                    found.setdefault(name, []).append((str(instance.get("LaunchTime", "")), instance["PublicIpAddress"]))
+    return {tag: sorted(instances)[0][1] for tag, instances in found.items()}
+
+
+def render_env(topo: topology.Topology, ips: Dict[str, str]) -> str:
+    """Contenido de .env.generated para las IPs por tag de ``ips``"""
+    lines = [
+        "# Auto-generated by scripts/sync-ips-to-config.py (describe_instances)",
+        f"# Generated: {datetime.now().isoformat()}",
+        "# DO NOT EDIT MANUALLY - run scripts/sync-ips-to-config.py to update",
+        ""
+    ]
+    aliases = {entry["alias"]: tag for tag, entry in topo.instances.items()}
+
+    gateway_ip = ips.get(aliases.get("api_gateway"))
+    if gateway_ip:
+        gateway_port = topo.service("api_gateway")["port"]
+        lines += [
+            f"API_GATEWAY_IP={gateway_ip}",
+            f"API_GATEWAY_URL=http://{gateway_ip}:{gateway_port}",
+            f"API_GATEWAY_HOST={gateway_ip}",
+            ""
+        ]
+    frontend_ip = ips.get(aliases.get("frontend"))
+    if frontend_ip:
+        lines += [f"FRONTEND_IP={frontend_ip}", f"FRONTEND_URL=http://{frontend_ip}:{FRONTEND_PORT}", ""]
+
+    missing = []
+    for alias, tag in aliases.items():
+        if alias in ("api_gateway", "frontend"):
+            continue
+        if ips.get(tag):
+            lines.append(f"{topology.ip_variable(alias)}={ips[tag]}")
+        else:
+            missing.append(tag)
+    missing += [aliases[alias] for alias in ("api_gateway", "frontend") if alias in aliases and not ips.get(aliases[alias])]
+
+    lines += ["", "NODE_ENV=production"]
+    if missing:
+        lines += ["", f"# Sin IP pública resuelta: {', '.join(missing)}"]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera .env.generated con las IPs públicas de las instancias EC2")
+    parser.add_argument("--region", default="us-east-1", help="Región de AWS")
+    parser.add_argument("--output", default=str(OUTPUT_FILE), help="Archivo a escribir")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar el resultado sin escribirlo")
+    args = parser.parse_args()
+
+    try:
+        topo = topology.load()
+    except topology.TopologyError as e:
+        print(f"❌ {e}")
+        return 1
+    tags = list(topo.instances)
+
+    try:
+        ips = resolve_public_ips(AwsBackend(args.region).ec2, tags)
+    except Exception as e:
+        print(f"❌ Error consultando EC2: {str(e)}")
+        return 1
+
+    for tag in tags:
+        print(f"{'✅' if tag in ips else '⚠️ '} {tag:<20} {ips.get(tag, 'sin instancia running')}")
+
+    content = render_env(topo, ips)
+    if args.dry_run:
+        print(f"\n{content}")
+        return 0
+
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, args.output)
+    print(f"\n💾 {args.output} actualizado ({len(ips)}/{len(tags)} instancias)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
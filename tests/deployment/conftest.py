@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "deployment"))
+import topology
+
+
+def make_topology(instances: Dict[str, List[Tuple[str, int]]], ips: Optional[Dict[str, str]] = None) -> topology.Topology:
+    """Topología en memoria: tag -> [(contenedor, puerto)]"""
+    registry = {"instances": {}, "services": {}}
+    for tag, containers in instances.items():
+        alias = topology.service_name(tag.lower().replace("ec2-", ""))
+        registry["instances"][tag] = {
+            "alias": alias,
+            "ip": (ips or {}).get(tag),
+            "compose_file": f"docker-compose.{alias}.yml",
+            "services": []
+        }
+        for container, port in containers:
+            name = topology.service_name(container)
+            registry["services"][name] = {
+                "container": container,
+                "image": f"{container}:latest",
+                "instance": tag,
+                "port": port,
+                "container_port": port,
+                "health_path": "/health",
+                "depends_on": []
+            }
+            registry["instances"][tag]["services"].append(name)
+    return topology.Topology(registry)
+
+
+@pytest.fixture
+def topo() -> topology.Topology:
+    return make_topology({
+        "EC2-Bastion": [],
+        "EC2-CORE": [("micro-auth", 5005), ("micro-estudiantes", 5002)],
+        "EC2-DB": [("mongo", 27017)],
+        "EC2-Reportes": [("micro-reportes", 5003)],
+    })
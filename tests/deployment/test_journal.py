@@ -0,0 +1,104 @@
+import contextlib
+import io
+
+import journal
+from backends import FakeBackend
+from orchestrator import DeploymentOrchestrator
+
+
+def test_rollout_state_tracks_commands_and_invocations(tmp_path):
+    log = journal.Journal(tmp_path / "journal.jsonl")
+    rollout_id = log.start("dev", ["EC2-DB", "EC2-CORE"], prefetch=False)
+    log.append("instance", instance="EC2-DB", status=journal.SUCCEEDED)
+    log.append("command", command_id="c1", phase="deploy", targets={"i-db": "EC2-DB"})
+    log.append("invocation", command_id="c1", instance_id="i-db", status="Success")
+    log.append("command", command_id="c2", phase="deploy", targets={"i-core1": "EC2-CORE", "i-core2": "EC2-CORE"})
+    log.append("invocation", command_id="c2", instance_id="i-core1", status="Success")
+
+    state = log.load()
+    assert (state.rollout_id, state.environment, state.prefetch) == (rollout_id, "dev", False)
+    assert state.order == ["EC2-DB", "EC2-CORE"]
+    assert state.succeeded() == ["EC2-DB"]
+    assert state.in_flight() == {"c2": {"i-core2": "EC2-CORE"}}
+    assert state.in_flight_since() == state.commands["c2"]["ts"]
+    assert state.completed_ids("EC2-CORE", "deploy") == {"i-core1"}
+    assert state.completed_ids("EC2-CORE", "prefetch") == set()
+    assert state.completed_ids("EC2-DB", "deploy") == {"i-db"}
+    assert not state.finished
+
+
+def test_in_flight_since_is_none_without_pending_commands(tmp_path):
+    log = journal.Journal(tmp_path / "journal.jsonl")
+    log.start("dev", ["EC2-DB"])
+    log.append("command", command_id="c1", phase="prefetch", targets={"i-db": "EC2-DB"})
+    log.append("invocation", command_id="c1", instance_id="i-db", status="Failed")
+    state = log.load()
+    assert state.in_flight() == {}
+    assert state.in_flight_since() is None
+    assert state.completed_ids("EC2-DB", "prefetch") == set()
+
+
+def test_load_ignores_truncated_line_and_other_rollouts(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    log = journal.Journal(path)
+    log.start("prod", ["EC2-DB"])
+    log.append("end", success=True)
+    with open(path, "a") as f:
+        f.write('{"ts":1,"rollout":"otro","event":"end","success":false}\n{"ts":2,"rollout":')
+    state = log.load()
+    assert state.environment == "prod"
+    assert (state.finished, state.success) == (True, True)
+
+
+def test_start_replaces_previous_rollout_and_reopen_continues_it(tmp_path):
+    log = journal.Journal(tmp_path / "journal.jsonl")
+    log.start("dev", ["EC2-DB"])
+    log.append("end", success=False)
+    second = log.start("dev", ["EC2-CORE"])
+    assert log.load().rollout_id == second
+    assert not log.load().finished
+
+    resumed = journal.Journal(log.path)
+    resumed.reopen(log.load())
+    resumed.append("instance", instance="EC2-CORE", status=journal.SUCCEEDED)
+    assert resumed.load().succeeded() == ["EC2-CORE"]
+
+
+def test_parse_digests():
+    output = "Pulling...\nDigest mongo:latest: sha256:abc\nDigest redis:7 : sha256:def\nDone"
+    assert journal.parse_digests(output) == {"mongo:latest": "sha256:abc", "redis:7": "sha256:def"}
+
+
+def orchestrator(backend, path):
+    orchestrator = DeploymentOrchestrator(backend=backend)
+    orchestrator.poll_min_interval = 0.01
+    orchestrator.poll_max_interval = 0.05
+    orchestrator.journal = journal.Journal(path)
+    return orchestrator
+
+
+def test_resume_follows_in_flight_deploy_commands(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    planner = DeploymentOrchestrator(backend=FakeBackend({}))
+    backend = FakeBackend({tag: 1 for tag in planner.instances_config}, speedup=400)
+
+    # El orquestador se corta con el deploy de EC2-DB enviado y sin resultado
+    first = orchestrator(backend, path)
+    first.journal.start("sim", ["EC2-DB"], prefetch=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        first._run_batch(["EC2-DB"], first._build_deploy_commands, wait=False, phase="deploy")
+    state = first.journal.load()
+    (command_id, targets), = state.in_flight().items()
+    assert list(targets.values()) == ["EC2-DB"]
+    assert state.commands[command_id]["phase"] == "deploy"
+
+    sent = backend.ssm.api_calls["send_command"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert orchestrator(backend, path).resume()
+    # El cutover terminó en la instancia: se da por desplegada sin reenviar nada
+    assert backend.ssm.api_calls.get("send_command", 0) == sent
+    state = journal.Journal(path).load()
+    assert state.in_flight() == {}
+    assert state.completed_ids("EC2-DB", "deploy") == set(targets)
+    assert state.succeeded() == ["EC2-DB"]
+    assert (state.finished, state.success) == (True, True)
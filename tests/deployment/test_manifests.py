@@ -0,0 +1,144 @@
+import json
+
+import pytest
+
+import manifests
+import topology
+
+pytest.importorskip("yaml")
+
+
+def write_manifest(directory, name, manifest):
+    (directory / f"{name}.json").write_text(json.dumps(manifest))
+
+
+def core_manifest(**containers):
+    return {
+        "instance": "EC2-CORE",
+        "depends_on": ["EC2-DB"],
+        "containers": containers or {
+            "micro-auth": {"image": "micro-auth:latest", "resources": {"requests": {"cpus": 0.25, "memory": "128m"}}},
+            "micro-estudiantes": {"image": "micro-estudiantes:latest", "depends_on": ["micro-auth"]}
+        }
+    }
+
+
+DB_MANIFEST = {"instance": "EC2-DB", "containers": {"mongo": {"image": "mongo:latest", "volumes": ["mongo_data:/data/db"]}}}
+
+
+def test_parse_helpers():
+    assert manifests.parse_port_mapping("80:5500") == (80, 5500)
+    assert manifests.parse_port_mapping(22) == (22, 22)
+    assert manifests.parse_memory("512m") == 512 * 1024 ** 2
+    assert manifests.parse_memory("1.5g") == int(1.5 * 1024 ** 3)
+    assert manifests.format_memory(256 * 1024 ** 2) == "256m"
+    with pytest.raises(ValueError):
+        manifests.parse_memory("mucha")
+
+
+def test_load_manifests_takes_ports_from_topology(tmp_path, topo):
+    write_manifest(tmp_path, "core", core_manifest())
+    write_manifest(tmp_path, "db", DB_MANIFEST)
+    loaded = manifests.load_manifests(tmp_path, topo)
+    assert list(loaded) == ["EC2-CORE", "EC2-DB"]
+    auth = loaded["EC2-CORE"]["containers"]["micro-auth"]
+    assert auth["ports"] == [[5005, 5005]]
+    assert auth["restart"] == "always"
+    assert auth["resources"]["limits"] == {}
+    assert loaded["EC2-DB"]["containers"]["mongo"]["volumes"] == ["mongo_data:/data/db"]
+
+
+def test_load_manifests_reports_every_error(tmp_path, topo):
+    write_manifest(tmp_path, "core", core_manifest(**{
+        "micro-auth": {
+            "image": "micro-auth:latest",
+            "ports": ["6000:5005"],
+            "resources": {"requests": {"cpus": 1}, "limits": {"cpus": 0.5}}
+        },
+        "micro-estudiantes": {"image": "micro-estudiantes:latest", "depends_on": ["redis"]}
+    }))
+    write_manifest(tmp_path, "ghost", {"instance": "EC2-Ghost", "containers": {}})
+    with pytest.raises(manifests.ManifestError) as error:
+        manifests.load_manifests(tmp_path, topo)
+    message = str(error.value)
+    assert "EC2-CORE/micro-auth: puerto 6000:5005 distinto del de la topología 5005:5005" in message
+    assert "resources.requests.cpus supera resources.limits.cpus" in message
+    assert "depends_on fuera de la instancia: redis" in message
+    assert "ghost.json: instancia desconocida 'EC2-Ghost'" in message
+    assert "EC2-CORE: depende de instancias sin manifiesto: EC2-DB" in message
+
+
+def test_load_manifests_rejects_cycles(tmp_path, topo):
+    write_manifest(tmp_path, "core", core_manifest(**{
+        "micro-auth": {"image": "micro-auth:latest", "depends_on": ["micro-estudiantes"]},
+        "micro-estudiantes": {"image": "micro-estudiantes:latest", "depends_on": ["micro-auth"]}
+    }))
+    write_manifest(tmp_path, "db", DB_MANIFEST)
+    with pytest.raises(manifests.ManifestError, match="dependencias circulares"):
+        manifests.load_manifests(tmp_path, topo)
+
+
+def test_start_order_groups_by_dependency_level():
+    manifest = {"containers": {
+        "app": {"depends_on": ["db", "cache"]},
+        "db": {"depends_on": []},
+        "cache": {"depends_on": []},
+        "proxy": {"depends_on": ["app"]}
+    }}
+    assert manifests.start_order(manifest) == [["db", "cache"], ["app"], ["proxy"]]
+
+
+def test_repository_manifests_are_valid():
+    loaded = manifests.load_manifests(manifests.MANIFESTS_DIR, topology.load())
+    for manifest in loaded.values():
+        manifests.start_order(manifest)
+
+
+@pytest.fixture
+def manifest(tmp_path, topo):
+    write_manifest(tmp_path, "core", core_manifest())
+    write_manifest(tmp_path, "db", DB_MANIFEST)
+    return manifests.load_manifests(tmp_path, topo)
+
+
+def test_plan_cache_compiles_once_per_manifest_and_options(manifest):
+    cache = manifests.PlanCache()
+    compiled = []
+
+    def compile():
+        compiled.append(1)
+        return ["echo core"]
+
+    core = manifest["EC2-CORE"]
+    assert cache.get_or_compile(core, {"prefetched": False}, compile) == ["echo core"]
+    assert cache.get_or_compile(core, {"prefetched": False}, compile) == ["echo core"]
+    cache.get_or_compile(core, {"prefetched": True}, compile)
+    assert (len(compiled), cache.hits, cache.misses) == (2, 1, 2)
+
+
+def test_plan_cache_persists_and_prunes_stale_entries(tmp_path, manifest):
+    path = tmp_path / "plan-cache.json"
+    cache = manifests.PlanCache(path)
+    cache.get_or_compile(manifest["EC2-CORE"], {}, lambda: ["echo core"])
+    cache.get_or_compile(manifest["EC2-DB"], {}, lambda: ["echo db"])
+    cache.save(manifest)
+
+    reloaded = manifests.PlanCache(path)
+    assert reloaded.get_or_compile(manifest["EC2-CORE"], {}, lambda: pytest.fail("no debería compilar")) == ["echo core"]
+
+    changed = json.loads(json.dumps(manifest))
+    changed["EC2-DB"]["containers"]["mongo"]["image"] = "mongo:7"
+    reloaded.save(changed)
+    entries = json.loads(path.read_text())["entries"].values()
+    assert [entry["instance"] for entry in entries] == ["EC2-CORE"]
+
+
+def test_plan_cache_discards_other_compiler_versions(tmp_path, manifest, monkeypatch):
+    path = tmp_path / "plan-cache.json"
+    cache = manifests.PlanCache(path)
+    cache.get_or_compile(manifest["EC2-CORE"], {}, lambda: ["echo core"])
+    cache.save(manifest)
+    assert json.loads(path.read_text())["version"] == manifests.compiler_version()
+
+    monkeypatch.setattr(manifests, "_compiler_hash", "otro")
+    assert manifests.PlanCache(path).entries == {}
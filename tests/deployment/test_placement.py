@@ -0,0 +1,76 @@
+import placement
+from conftest import make_topology
+
+
+def container(cpus, memory, port, **extra):
+    spec = {"resources": {"requests": {"cpus": cpus, "memory": memory}}, "ports": [[port, port]], "pinned": False, "volumes": []}
+    spec.update(extra)
+    return spec
+
+
+def loaded_hosts():
+    return {
+        "EC2-Bastion": {"dedicated": True, "capacity": {"cpus": 2, "memory": "2g"}, "containers": {
+            "bastion-host": container(0.1, "64m", 22, pinned=True)
+        }},
+        "EC2-Frontend": {"capacity": {"cpus": 2, "memory": "2g"}, "containers": {
+            "frontend": container(0.1, "64m", 80)
+        }},
+        "EC2-CORE": {"capacity": {"cpus": 1, "memory": "1g"}, "containers": {
+            "micro-auth": container(0.5, "256m", 5005),
+            "micro-estudiantes": container(0.25, "128m", 5002),
+            "micro-core": container(0.4, "256m", 5001)
+        }},
+        "EC2-DB": {"capacity": {"cpus": 1, "memory": "2g"}, "containers": {
+            "mongo": container(0.8, "512m", 27017, volumes=["mongo_data:/data/db"])
+        }},
+        "EC2-Reportes": {"capacity": {"cpus": 2, "memory": "2g"}, "containers": {
+            "micro-reportes": container(0.25, "128m", 5003)
+        }},
+    }
+
+
+def topo():
+    return make_topology({
+        "EC2-Bastion": [],
+        "EC2-Frontend": [],
+        "EC2-CORE": [("micro-auth", 5005), ("micro-estudiantes", 5002), ("micro-core", 5001)],
+        "EC2-DB": [("mongo", 27017)],
+        "EC2-Reportes": [("micro-reportes", 5003)],
+    })
+
+
+def test_plan_moves_overflow_only_to_service_hosts():
+    current, proposed, changes = placement.plan(loaded_hosts(), {}, topo())
+    assert current["EC2-CORE"].oversubscribed()
+    assert changes == [{"container": "micro-estudiantes", "from": "EC2-CORE", "to": "EC2-Reportes"}]
+    assert not any(host.oversubscribed() for host in proposed.values())
+    assert proposed["EC2-Bastion"].containers == ["bastion-host"]
+    assert proposed["EC2-Frontend"].containers == ["frontend"]
+
+
+def test_plan_uses_measured_usage_over_requests():
+    profile = {"micro-reportes": {"cpus": 1.8, "memory": 0}}
+    _, proposed, changes = placement.plan(loaded_hosts(), profile, topo())
+    # Reportes ya no tiene margen: lo que no cabe en CORE se queda donde está
+    assert changes == []
+    assert proposed["EC2-CORE"].oversubscribed()
+
+
+def test_plan_keeps_pinned_and_volume_containers():
+    loaded = loaded_hosts()
+    loaded["EC2-DB"]["capacity"] = {"cpus": 0.5, "memory": "2g"}
+    loaded["EC2-CORE"]["containers"]["micro-auth"]["pinned"] = True
+    _, proposed, changes = placement.plan(loaded, {}, topo())
+    assert "mongo" in proposed["EC2-DB"].containers
+    assert "micro-auth" in proposed["EC2-CORE"].containers
+    assert all(change["container"] not in ("mongo", "micro-auth") for change in changes)
+
+
+def test_plan_never_binds_the_same_port_twice():
+    loaded = loaded_hosts()
+    loaded["EC2-Reportes"]["containers"]["micro-reportes"]["ports"] = [[5002, 5002]]
+    _, proposed, changes = placement.plan(loaded, {}, topo())
+    assert {"container": "micro-estudiantes", "from": "EC2-CORE", "to": "EC2-Reportes"} not in changes
+    for host in proposed.values():
+        assert len(host.ports) == len(host.containers)
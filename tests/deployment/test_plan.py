@@ -0,0 +1,67 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from backends import FakeBackend
+from orchestrator import DeploymentOrchestrator
+
+# docker de mentira: imágenes en el host (tag -> ID) y contenedores (nombre -> ID de su imagen)
+FAKE_DOCKER = """#!/bin/sh
+echo "$*" >> "$DOCKER_LOG"
+case "$1 $2" in
+  "image inspect")
+    shift 2; [ "$1" = "--format" ] && shift 2
+    id=$(grep "^$1 " "$DOCKER_IMAGES" | cut -d' ' -f2); [ -n "$id" ] && echo "$id" ;;
+  "inspect --format") id=$(grep "^$4 " "$DOCKER_CONTAINERS" | cut -d' ' -f2); [ -n "$id" ] && echo "true $id" ;;
+  "inspect "*) grep -q "^$2 " "$DOCKER_CONTAINERS" ;;
+  *) exit 1 ;;
+esac
+"""
+
+
+@pytest.fixture
+def orchestrator():
+    return DeploymentOrchestrator(backend=FakeBackend({}))
+
+
+@pytest.mark.skipif(not shutil.which("bash"), reason="requiere bash")
+def test_plan_commands_only_inspect(tmp_path, orchestrator):
+    docker = tmp_path / "docker"
+    docker.write_text(FAKE_DOCKER)
+    docker.chmod(0o755)
+    (tmp_path / "images").write_text("mongo:latest sha256:new\npostgres:latest sha256:pg\nredis:latest sha256:redis\n")
+    (tmp_path / "containers").write_text("mongo sha256:old\npostgres sha256:pg\n")
+    env = dict(
+        os.environ,
+        PATH=f"{tmp_path}:{os.environ['PATH']}",
+        DOCKER_LOG=str(tmp_path / "log"),
+        DOCKER_IMAGES=str(tmp_path / "images"),
+        DOCKER_CONTAINERS=str(tmp_path / "containers"),
+    )
+
+    config = dict(orchestrator.instances_config["EC2-DB"])
+    config["manifest"] = {"containers": {
+        **config["manifest"]["containers"],
+        "cache": {"image": "cache:7"}
+    }}
+    output = "".join(
+        subprocess.run(["bash", "-c", command], env=env, capture_output=True, text=True).stdout
+        for command in orchestrator._build_plan_commands(config)
+    )
+    assert output.splitlines() == [
+        "PLAN mongo actualizar",
+        "PLAN postgres sin-cambios",
+        "PLAN redis crear",
+        "PLAN cache descargar",
+    ]
+    calls = (tmp_path / "log").read_text().splitlines()
+    assert calls and all(call.startswith(("inspect", "image inspect")) for call in calls)
+
+
+def test_plan_never_pulls_or_touches_containers(orchestrator):
+    for config in orchestrator.instances_config.values():
+        script = "\n".join(orchestrator._build_plan_commands(config))
+        for verb in ("pull", "run", "rm", "stop", "start", "create"):
+            assert f"docker {verb} " not in script
@@ -0,0 +1,82 @@
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+import readiness
+from standins import AmqpStandIn, KafkaStandIn, ZookeeperStandIn
+
+
+def kafka_response(brokers):
+    return struct.pack(">iii", 40, 1, brokers).hex()
+
+
+@pytest.mark.parametrize("brokers, ready", [(0, False), (1, True), (15, True), (16, True), (255, True)])
+def test_kafka_pattern_requires_a_broker(brokers, ready):
+    assert readiness._matches(kafka_response(brokers), readiness.KafkaReady.response_pattern) is ready
+
+
+def test_kafka_pattern_checks_correlation_id():
+    assert not readiness._matches(struct.pack(">iii", 40, 2, 1).hex(), readiness.KafkaReady.response_pattern)
+
+
+def test_amqp_and_zookeeper_patterns():
+    connection_start = struct.pack(">bhihh", 1, 0, 30, 10, 10).hex()
+    assert readiness._matches(connection_start, readiness.AmqpReady.response_pattern)
+    # Frame de canal 1 o método distinto de connection.start
+    assert not readiness._matches(struct.pack(">bhihh", 1, 1, 30, 10, 10).hex(), readiness.AmqpReady.response_pattern)
+    assert not readiness._matches(struct.pack(">bhihh", 1, 0, 30, 10, 11).hex(), readiness.AmqpReady.response_pattern)
+    assert readiness._matches(b"imok".hex(), readiness.ZookeeperReady.response_pattern)
+    assert not readiness._matches(b"".hex(), readiness.ZookeeperReady.response_pattern)
+
+
+def test_kafka_metadata_request_is_well_formed():
+    size, api_key, api_version, correlation_id = struct.unpack(">ihhi", readiness.KAFKA_METADATA_REQUEST[:12])
+    assert size == len(readiness.KAFKA_METADATA_REQUEST) - 4
+    assert (api_key, api_version, correlation_id) == (3, 0, 1)
+
+
+@pytest.fixture
+def standin(request):
+    standin = request.param[0](ready_after=request.param[1])
+    standin.start()
+    yield standin
+    standin.stop()
+
+
+ALL_STANDINS = [ZookeeperStandIn, KafkaStandIn, AmqpStandIn]
+
+
+@pytest.mark.parametrize("standin", [(kind, 0) for kind in ALL_STANDINS], indirect=True, ids=lambda p: p[0].name)
+def test_handshake_ready(standin):
+    result = readiness.wait_for(standin.check(), timeout=5, min_interval=0.05, verbose=False)
+    assert result.ready, result.detail
+
+
+@pytest.mark.parametrize("standin", [(kind, 60) for kind in ALL_STANDINS], indirect=True, ids=lambda p: p[0].name)
+def test_handshake_not_ready_while_starting(standin):
+    condition = standin.check()
+    assert readiness.wait_for(condition, timeout=0.2, min_interval=0.05, verbose=False).ready is False
+    assert condition.detail.startswith("respuesta inesperada")
+
+
+def test_port_closed_is_not_ready():
+    standin = ZookeeperStandIn(listen_after=60)
+    standin.start()
+    try:
+        condition = standin.check()
+        assert condition.check() is False
+        assert not condition.detail.startswith("respuesta inesperada")
+    finally:
+        standin.stop()
+
+
+@pytest.mark.skipif(not shutil.which("bash") or not shutil.which("od"), reason="requiere bash y od")
+@pytest.mark.parametrize("standin", [(kind, 0) for kind in ALL_STANDINS], indirect=True, ids=lambda p: p[0].name)
+def test_shell_check_matches_python_check(standin):
+    condition = standin.check()
+    assert subprocess.run(["bash", "-c", condition.shell()]).returncode == 0
+    script = readiness.shell_wait(condition, timeout=5, interval=0.1, on_ready="echo listo")
+    result = subprocess.run(["bash", "-c", script], capture_output=True, text=True)
+    assert (result.returncode, result.stdout.strip()) == (0, "listo")
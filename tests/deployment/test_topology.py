@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+import topology
+
+pytest.importorskip("yaml")
+
+COMPOSE = """
+x-instances:
+  EC2-CORE: {alias: core, compose_file: docker-compose.ec2-core.yml}
+  EC2-DB: {alias: db, compose_file: docker-compose.ec2-db.yml}
+
+services:
+  mongo:
+    image: mongo:latest
+    labels:
+      acompanamiento.instance: EC2-DB
+    ports:
+      - "27017:27017"
+  micro-auth:
+    image: micro-auth:latest
+    labels:
+      acompanamiento.instance: EC2-CORE
+      acompanamiento.health: /health
+    environment:
+      PORT: "3000"
+    depends_on:
+      - mongo
+  micro-estudiantes:
+    image: micro-estudiantes:latest
+    labels:
+      - acompanamiento.instance=EC2-CORE
+    ports:
+      - "3001:3001"
+"""
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / topology.COMPOSE_FILE).write_text(COMPOSE)
+    (tmp_path / topology.PORTS_ENV_FILE).write_text("MICRO_AUTH_PORT=5005\n")
+    (tmp_path / topology.IPS_ENV_FILE).write_text("# generado\nCORE_IP=10.0.0.1\nDB_IP='10.0.0.2'\n")
+    return tmp_path
+
+
+def test_compile_registry_resolves_ports_ips_and_aliases(root):
+    registry = topology.compile_registry(root)
+    auth = registry["services"]["auth"]
+    assert auth["instance"] == "EC2-CORE"
+    # .env.aws manda sobre el PORT del contenedor
+    assert (auth["port"], auth["container_port"]) == (5005, 3000)
+    assert auth["health_path"] == "/health"
+    assert auth["depends_on"] == ["mongo"]
+    assert registry["services"]["estudiantes"]["port"] == 3001
+    assert registry["instances"]["EC2-DB"]["ip"] == "10.0.0.2"
+    assert registry["instances"]["EC2-CORE"]["services"] == ["auth", "estudiantes"]
+
+
+def test_compile_registry_reports_every_error(root):
+    compose = COMPOSE.replace('"3001:3001"', '"5005:3001"').replace("EC2-DB\n    ports", "EC2-X\n    ports")
+    (root / topology.COMPOSE_FILE).write_text(compose)
+    with pytest.raises(topology.TopologyError) as error:
+        topology.compile_registry(root)
+    message = str(error.value)
+    assert "el puerto 5005 de EC2-CORE ya lo usa micro-auth" in message
+    assert "instancia desconocida 'EC2-X'" in message
+    assert "depends_on de servicios sin desplegar: mongo" in message
+
+
+def test_topology_indexes(root):
+    topo = topology.Topology(topology.compile_registry(root))
+    assert topo.instance_tag("core") == "EC2-CORE"
+    assert topo.instance_tag("docker-compose.ec2-db.yml") == "EC2-DB"
+    assert topo.service_at("core", 3001) == "estudiantes"
+    assert topo.endpoint("auth") == ("10.0.0.1", 5005)
+    assert topo.http_services() == {"auth": ("10.0.0.1", 5005)}
+    assert topo.impacted_services(["EC2-DB"]) == {"mongo", "auth"}
+
+
+def test_load_reuses_cache_until_a_source_changes(root, monkeypatch):
+    cache_file = root / "cache.json"
+    monkeypatch.setattr(topology, "_loaded", {})
+    first = topology.load(root, cache_file)
+    assert cache_file.exists()
+
+    compiled = []
+    monkeypatch.setattr(topology, "_loaded", {})
+    monkeypatch.setattr(topology, "compile_registry", lambda root: compiled.append(root) or first.registry)
+    topology.load(root, cache_file)
+    assert compiled == []
+
+    ips = root / topology.IPS_ENV_FILE
+    ips.write_text("CORE_IP=10.0.0.9\n")
+    os.utime(ips, ns=(0, 0))
+    monkeypatch.setattr(topology, "_loaded", {})
+    topology.load(root, cache_file)
+    assert compiled == [root]
+
+
+def test_missing_ips_names_the_env_variable(root):
+    (root / topology.IPS_ENV_FILE).write_text("CORE_IP=10.0.0.1\n")
+    topo = topology.Topology(topology.compile_registry(root))
+    assert topo.missing_ips(topo.services) == {"mongo": "DB_IP"}
+    assert topo.missing_ips(topo.http_services()) == {}
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Benchmark de regresión de la Suite de Flujos de Microservicios
+Proyecto Acompañamiento - Sistema de Gestión Educativa
+
+Ejecuta cada flujo de service_flow_tests N veces, calcula estadísticas
+robustas (mediana, MAD e intervalo de confianza de la mediana) por flujo y
+por endpoint, y las compara con la línea base guardada en
+benchmarks/baseline-<entorno>.json. Sale con código 1 si alguna latencia
+empeora más allá del umbral configurado. Con --stub se ejecuta contra el
+servidor stub local para obtener resultados deterministas en CI. El
+informe JSON se escribe en benchmarks/reports/ (ignorado por git) salvo que
+se indique otro con --output.
+"""
+
+import argparse
+import json
+import math
+import statistics
+import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import service_flow_tests
+from service_flow_load import FLOWS, TimedSession, prime_suite
+from service_flow_tests import TestSuite
+
+BASELINE_DIR = Path(__file__).parent / "benchmarks"
+REPORTS_DIR = BASELINE_DIR / "reports"
+DEFAULT_THRESHOLD = 0.2
+# z para un intervalo de confianza del 95%
+CONFIDENCE_Z = 1.96
+
+
+class SampleRecorder:
+    """Guarda todas las muestras por clave; con N pequeño interesa la distribución exacta"""
+
+    def __init__(self):
+        self.recording = False
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, key: str, seconds: float, error: bool):
+        if not self.recording:
+            return
+        key = stable_endpoint_key(key)
+        self.samples.setdefault(key, []).append(seconds)
+        if error:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+
+def stable_endpoint_key(key: str) -> str:
+    """Sustituye host:puerto por el nombre del servicio para que la clave no cambie entre entornos"""
+    method, _, target = key.partition(" ")
+    netloc, slash, path = target.partition("/")
+    port = netloc.rpartition(":")[2]
+    services = {str(p): name for name, p in service_flow_tests.PORTS.items()}
+    return f"{method} {services.get(port, netloc)}{slash}{path}"
+
+
+def robust_stats(samples: List[float]) -> Dict:
+    """Mediana, MAD e intervalo de confianza de la mediana por estadísticos de orden"""
+    ordered = sorted(samples)
+    n = len(ordered)
+    median = statistics.median(ordered)
+    mad = statistics.median(abs(x - median) for x in ordered)
+    spread = CONFIDENCE_Z * math.sqrt(n) / 2
+    low = max(0, math.floor(n / 2 - spread))
+    high = min(n - 1, math.ceil(n / 2 + spread) - 1)
+    return {
+        "n": n,
+        "median": median,
+        "mad": mad,
+        "ci_low": ordered[low],
+        "ci_high": ordered[high],
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def compare(
+    current: Dict[str, Dict],
+    baseline: Dict[str, Dict],
+    threshold: float,
+    report_missing: bool = True
+) -> Dict[str, Dict]:
+    """Clasifica cada clave frente a la línea base
+
+    Una clave es "regression" sólo si la mediana supera la de la línea base
+    en más de ``threshold`` y además el intervalo de confianza actual queda
+    por encima del de la línea base, para no fallar por ruido. Es "errors"
+    si el número o la tasa de errores supera los de la línea base: un
+    endpoint que falla rápido no debe pasar como una mejora.
+    """
+    verdicts = {}
+    for key, stats in current.items():
+        base = baseline.get(key)
+        if not base:
+            verdicts[key] = {"status": "new", "median": stats["median"]}
+            continue
+        ratio = stats["median"] / base["median"] if base["median"] else math.inf
+        errors, base_errors = stats.get("errors", 0), base.get("errors", 0)
+        if errors > base_errors or errors / stats["n"] > base_errors / base["n"]:
+            status = "errors"
+        elif ratio > 1 + threshold and stats["ci_low"] > base["ci_high"]:
+            status = "regression"
+        elif ratio < 1 - threshold and stats["ci_high"] < base["ci_low"]:
+            status = "improvement"
+        else:
+            status = "ok"
+        verdicts[key] = {
+            "status": status,
+            "median": stats["median"],
+            "baseline_median": base["median"],
+            "ratio": ratio,
+            "errors": errors,
+            "baseline_errors": base_errors,
+        }
+    for key in baseline:
+        if report_missing and key not in current:
+            verdicts[key] = {"status": "missing", "baseline_median": baseline[key]["median"]}
+    return verdicts
+
+
+def run_benchmark(flows: List[str], iterations: int, warmup: int) -> Dict:
+    """Ejecuta cada flujo ``warmup`` veces sin medir y luego ``iterations`` veces"""
+    recorder = SampleRecorder()
+    session = TestSuite.build_session(2, session_cls=TimedSession)
+    session.recorder = recorder
+    suite = prime_suite(TestSuite(max_workers=1, session=session, verbose=False, fail_fast=False))
+
+    flow_samples: Dict[str, List[float]] = {flow: [] for flow in flows}
+    flow_errors: Dict[str, int] = {flow: 0 for flow in flows}
+
+    try:
+        for flow in flows:
+            method = getattr(suite, FLOWS[flow])
+            recorder.recording = False
+            for _ in range(warmup):
+                method()
+            # Los fallos del calentamiento no cuentan como errores del flujo
+            suite.results = []
+            recorder.recording = True
+            for _ in range(iterations):
+                start = time.perf_counter()
+                method()
+                flow_samples[flow].append(time.perf_counter() - start)
+            flow_errors[flow] = sum(1 for result in suite.results if not result.status)
+            suite.results = []
+    finally:
+        session.close()
+
+    return {
+        "flows": {
+            flow: {**robust_stats(samples), "errors": flow_errors[flow]}
+            for flow, samples in flow_samples.items() if samples
+        },
+        "endpoints": {
+            key: {**robust_stats(samples), "errors": recorder.errors.get(key, 0)}
+            for key, samples in sorted(recorder.samples.items())
+        },
+    }
+
+
+def baseline_path(environment: str) -> Path:
+    return BASELINE_DIR / f"baseline-{environment}.json"
+
+
+def report_path(environment: str) -> Path:
+    return REPORTS_DIR / f"benchmark-report-{environment}.json"
+
+
+def write_report(report: Dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Reporte: {path}")
+
+
+def load_baseline(environment: str) -> Optional[Dict]:
+    path = baseline_path(environment)
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def print_verdicts(title: str, verdicts: Dict[str, Dict]):
+    icons = {"ok": "✅", "regression": "❌", "errors": "💥", "improvement": "🚀", "new": "🆕", "missing": "⚠️ "}
+    print(f"\n{title}:")
+    for key, verdict in verdicts.items():
+        line = f"  {icons[verdict['status']]} {key:<60}"
+        if "median" in verdict:
+            line += f" {verdict['median'] * 1000:>8.2f}ms"
+        if "baseline_median" in verdict:
+            line += f"  (base {verdict['baseline_median'] * 1000:.2f}ms"
+            line += f", x{verdict['ratio']:.2f})" if "ratio" in verdict else ")"
+        if verdict["status"] == "errors":
+            line += f"  errores {verdict['errors']} (base {verdict['baseline_errors']})"
+        print(line)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de regresión de los flujos de integración")
+    parser.add_argument("--stub", action="store_true", help="Ejecutar contra el servidor stub local")
+    parser.add_argument("--stub-latency-ms", type=float, default=20, help="Latencia del stub por respuesta")
+    parser.add_argument("--environment", help="Entorno de la línea base (por defecto 'stub' con --stub, si no 'dev')")
+    parser.add_argument("--flows", default=",".join(FLOWS), help="Flujos separados por coma")
+    parser.add_argument("--iterations", type=int, default=20, help="Repeticiones medidas por flujo")
+    parser.add_argument("--warmup", type=int, default=3, help="Repeticiones sin medir por flujo")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Empeoramiento relativo de la mediana tolerado (0.2 = 20%%)"
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="Guardar el resultado como nueva línea base")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Archivo JSON con el resultado (por defecto benchmarks/reports/benchmark-report-<entorno>.json)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    environment = args.environment or ("stub" if args.stub else "dev")
+    output = args.output or report_path(environment)
+    flows = [flow.strip() for flow in args.flows.split(",") if flow.strip()]
+    unknown = [flow for flow in flows if flow not in FLOWS]
+    if unknown:
+        print(f"❌ Flujos desconocidos: {', '.join(unknown)}")
+        return 2
+
+    print(f"🧪 Benchmark '{environment}': {len(flows)} flujos x {args.iterations} repeticiones")
+
+    stub = None
+    if args.stub:
+        from stub_server import stubbed_topology
+        stub = stubbed_topology(latency=args.stub_latency_ms / 1000)
+
+    with stub or nullcontext():
+        result = run_benchmark(flows, args.iterations, args.warmup)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "environment": environment,
+        "iterations": args.iterations,
+        "threshold": args.threshold,
+        **result,
+    }
+
+    if args.update_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        with open(baseline_path(environment), "w") as f:
+            json.dump({key: report[key] for key in ("environment", "iterations", "flows", "endpoints")}, f, indent=2)
+        print(f"💾 Línea base actualizada: {baseline_path(environment)}")
+        return 0
+
+    baseline = load_baseline(environment)
+    if not baseline:
+        print(f"⚠️  No hay línea base en {baseline_path(environment)}; ejecutar con --update-baseline")
+        write_report(report, output)
+        return 0
+
+    # Con un subconjunto de flujos, las claves ausentes no indican nada
+    all_flows = set(flows) == set(FLOWS)
+    report["comparison"] = {
+        "flows": compare(result["flows"], baseline["flows"], args.threshold, report_missing=all_flows),
+        "endpoints": compare(result["endpoints"], baseline["endpoints"], args.threshold, report_missing=all_flows),
+    }
+    print_verdicts("Flujos", report["comparison"]["flows"])
+    print_verdicts("Endpoints", report["comparison"]["endpoints"])
+
+    write_report(report, output)
+
+    regressions = [
+        key for kind in report["comparison"].values()
+        for key, verdict in kind.items() if verdict["status"] == "regression"
+    ]
+    failing = [
+        key for kind in report["comparison"].values()
+        for key, verdict in kind.items() if verdict["status"] == "errors"
+    ]
+    if failing:
+        print(f"\n💥 Más errores que en la línea base: {', '.join(failing)}")
+    if regressions:
+        print(f"\n❌ Regresiones por encima del {args.threshold:.0%}: {', '.join(regressions)}")
+    if regressions or failing:
+        return 1
+
+    print(f"\n✅ Sin regresiones (umbral {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
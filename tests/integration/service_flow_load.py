@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Modo de carga para la Suite de Flujos de Microservicios
+Proyecto Acompañamiento - Sistema de Gestión Educativa
+
+Reutiliza los flujos de service_flow_tests.TestSuite (test_create_student,
+test_list_students, test_auth_login, ...) desde un pool de workers, con
+concurrencia fija o un objetivo de RPS, y registra latencias p50/p95/p99/p999
+por endpoint y por flujo. Exporta el resultado como JSON y como archivo de
+texto Prometheus.
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from service_flow_tests import TestSuite
+
+# Flujos disponibles: nombre -> método test_* de TestSuite
+FLOWS = {
+    "auth_login": "test_auth_login",
+    "auth_validate": "test_auth_token_validation",
+    "auth_rbac": "test_auth_rbac",
+    "create_student": "test_create_student",
+    "read_student": "test_read_student",
+    "update_student": "test_update_student",
+    "list_students": "test_list_students",
+    "create_teacher": "test_create_teacher",
+    "read_teacher": "test_read_teacher",
+    "list_teachers": "test_list_teachers",
+    "send_notification": "test_send_notification",
+    "get_notifications": "test_get_notifications",
+    "generate_report": "test_generate_report",
+    "query_report": "test_query_report",
+    "analytics_metrics": "test_analytics_metrics",
+}
+
+DEFAULT_FLOWS = ["auth_login", "list_students", "create_student"]
+PERCENTILES = [50, 95, 99, 99.9]
+
+# Segmentos de ruta que se agrupan como :id (ObjectId de Mongo, UUID o numérico)
+ID_SEGMENT = re.compile(r"^([0-9a-fA-F]{24}|[0-9a-fA-F-]{36}|\d+)$")
+
+
+class LatencyHistogram:
+    """Histograma log-lineal al estilo HdrHistogram
+
+    Los valores se guardan en microsegundos en cubetas cuya anchura crece
+    con la magnitud, con un error relativo acotado por 1/2**(SUB_BUCKET_BITS-1)
+    (<2% con 7 bits) y memoria constante sin importar cuántas muestras haya.
+    """
+
+    SUB_BUCKET_BITS = 7
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _bucket(self, micros: int) -> int:
+        shift = max(0, micros.bit_length() - self.SUB_BUCKET_BITS)
+        # El límite superior de la cubeta identifica la cubeta y ordena por valor
+        return (((micros >> shift) + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        micros = max(1, int(seconds * 1_000_000))
+        bucket = self._bucket(micros)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other: "LatencyHistogram"):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percentile: float) -> float:
+        """Valor (segundos) bajo el que cae el ``percentile`` % de las muestras"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(percentile / 100 * self.count))
+        cumulative = 0
+        for bucket in sorted(self.counts):
+            cumulative += self.counts[bucket]
+            if cumulative >= target:
+                return min(bucket / 1_000_000, self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min or 0.0,
+            "max": self.max or 0.0,
+            **{f"p{str(p).replace('.', '')}": self.percentile(p) for p in PERCENTILES},
+        }
+
+
+class LoadRecorder:
+    """Acumula latencias y errores por clave (endpoint o flujo) de forma thread-safe"""
+
+    def __init__(self):
+        self.recording = False
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float, error: bool):
+        if not self.recording:
+            return
+        with self._lock:
+            self.histograms.setdefault(key, LatencyHistogram()).record(seconds)
+            if error:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def stats(self, window: float) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                key: {
+                    **histogram.summary(),
+                    "errors": self.errors.get(key, 0),
+                    "error_rate": self.errors.get(key, 0) / histogram.count if histogram.count else 0.0,
+                    "throughput_rps": histogram.count / window if window > 0 else 0.0,
+                }
+                for key, histogram in sorted(self.histograms.items())
+            }
+
+
+class TimedSession(requests.Session):
+    """Sesión que mide cada petición y la agrupa por método + ruta normalizada"""
+
+    recorder: Optional[LoadRecorder] = None
+
+    def request(self, method, url, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except Exception:
+            self._record(method, url, time.perf_counter() - start, error=True)
+            raise
+        self._record(method, url, time.perf_counter() - start, error=response.status_code >= 400)
+        return response
+
+    def _record(self, method: str, url: str, seconds: float, error: bool):
+        if self.recorder:
+            self.recorder.record(endpoint_key(method, url), seconds, error)
+
+
+def endpoint_key(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    path = "/".join(":id" if ID_SEGMENT.match(segment) else segment for segment in parts.path.split("/"))
+    return f"{method.upper()} {parts.netloc}{path}"
+
+
+def prime_suite(suite: TestSuite) -> TestSuite:
+    """Obtiene token e IDs que necesitan los flujos de lectura/actualización"""
+    suite.test_auth_login()
+    suite.test_create_student()
+    suite.test_create_teacher()
+    suite.test_generate_report()
+    for result in suite.results:
+        if not result.status:
+            print(f"⚠️  Preparación: {result.name} falló - {result.message}")
+    suite.results = []
+    return suite
+
+
+class LoadRunner:
+    """Ejecuta flujos de TestSuite bajo carga durante un tiempo fijo"""
+
+    def __init__(
+        self,
+        flows: List[str],
+        concurrency: int = 8,
+        duration: float = 30,
+        warmup: float = 5,
+        rps: Optional[float] = None
+    ):
+        unknown = [flow for flow in flows if flow not in FLOWS]
+        if unknown:
+            raise ValueError(f"Flujos desconocidos: {', '.join(unknown)} (disponibles: {', '.join(FLOWS)})")
+
+        self.flows = flows
+        self.concurrency = max(1, concurrency)
+        self.duration = duration
+        self.warmup = warmup
+        self.rps = rps
+        self.endpoints = LoadRecorder()
+        self.flow_stats = LoadRecorder()
+        self.session = TestSuite.build_session(self.concurrency, session_cls=TimedSession)
+        self.session.recorder = self.endpoints
+        self._next_slot = 0.0
+        self._slot_lock = threading.Lock()
+
+    def _new_suite(self, primed: Optional[TestSuite] = None) -> TestSuite:
+        suite = TestSuite(max_workers=1, session=self.session, verbose=False, fail_fast=False)
+        if primed:
+            suite.auth_token = primed.auth_token
+            suite.student_id = primed.student_id
+            suite.teacher_id = primed.teacher_id
+            suite.report_id = primed.report_id
+        return suite
+
+    def prime(self) -> TestSuite:
+        return prime_suite(self._new_suite())
+
+    def _wait_for_slot(self, deadline: float) -> bool:
+        """Con --rps reparte los arranques de flujo a intervalos regulares entre workers"""
+        if not self.rps:
+            return time.monotonic() < deadline
+        with self._slot_lock:
+            now = time.monotonic()
+            self._next_slot = max(self._next_slot, now) + 1 / self.rps
+            slot = self._next_slot
+        if slot >= deadline:
+            return False
+        time.sleep(max(0.0, slot - time.monotonic()))
+        return True
+
+    def _worker(self, index: int, primed: TestSuite, deadline: float):
+        suite = self._new_suite(primed)
+        iteration = index
+        while self._wait_for_slot(deadline):
+            flow = self.flows[iteration % len(self.flows)]
+            iteration += 1
+            start = time.perf_counter()
+            getattr(suite, FLOWS[flow])()
+            elapsed = time.perf_counter() - start
+            new_results = suite.results
+            suite.results = []
+            self.flow_stats.record(flow, elapsed, error=any(not r.status for r in new_results))
+
+    def run(self) -> Dict:
+        primed = self.prime()
+        start = time.monotonic()
+        deadline = start + self.warmup + self.duration
+
+        def start_measuring():
+            self.endpoints.recording = True
+            self.flow_stats.recording = True
+
+        timer = threading.Timer(self.warmup, start_measuring)
+        timer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for future in [executor.submit(self._worker, i, primed, deadline) for i in range(self.concurrency)]:
+                    future.result()
+        finally:
+            timer.cancel()
+            self.session.close()
+
+        window = max(0.0, time.monotonic() - start - self.warmup)
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "config": {
+                "flows": self.flows,
+                "concurrency": self.concurrency,
+                "rps": self.rps,
+                "duration": self.duration,
+                "warmup": self.warmup,
+            },
+            "window_seconds": window,
+            "flows": self.flow_stats.stats(window),
+            "endpoints": self.endpoints.stats(window),
+        }
+
+
+def to_prometheus(report: Dict) -> str:
+    """Formato de exposición de texto de Prometheus (summaries por flujo y endpoint)"""
+    lines = []
+    for kind, label in (("flows", "flow"), ("endpoints", "endpoint")):
+        metric = f"service_flow_load_{label}_latency_seconds"
+        lines.append(f"# HELP {metric} Latencia por {label} medida por service_flow_load")
+        lines.append(f"# TYPE {metric} summary")
+        for key, stats in report[kind].items():
+            name = key.replace("\\", "\\\\").replace('"', '\\"')
+            for p in PERCENTILES:
+                value = stats[f"p{str(p).replace('.', '')}"]
+                lines.append(f'{metric}{{{label}="{name}",quantile="{p / 100:g}"}} {value:.6f}')
+            lines.append(f'{metric}_sum{{{label}="{name}"}} {stats["mean"] * stats["count"]:.6f}')
+            lines.append(f'{metric}_count{{{label}="{name}"}} {stats["count"]}')
+
+        for suffix, field, kind_help in (
+            ("errors_total", "errors", "counter"),
+            ("throughput_rps", "throughput_rps", "gauge"),
+        ):
+            metric = f"service_flow_load_{label}_{suffix}"
+            lines.append(f"# TYPE {metric} {kind_help}")
+            for key, stats in report[kind].items():
+                name = key.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{metric}{{{label}="{name}"}} {stats[field]:g}')
+    return "\n".join(lines) + "\n"
+
+
+def print_report(report: Dict):
+    print("\n" + "=" * 100)
+    print(f"📊 RESULTADOS DE CARGA ({report['window_seconds']:.1f}s medidos)")
+    print("=" * 100)
+    for kind, title in (("flows", "Flujos"), ("endpoints", "Endpoints")):
+        print(f"\n{title}:")
+        print(f"  {'nombre':<55} {'n':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'p999':>8}")
+        for key, stats in report[kind].items():
+            print(
+                f"  {key:<55} {stats['count']:>7} {stats['throughput_rps']:>8.1f} "
+                f"{stats['error_rate'] * 100:>5.1f}% "
+                f"{stats['p50'] * 1000:>6.1f}ms {stats['p95'] * 1000:>6.1f}ms "
+                f"{stats['p99'] * 1000:>6.1f}ms {stats['p999'] * 1000:>6.1f}ms"
+            )
+    print("=" * 100 + "\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera carga con los flujos de service_flow_tests")
+    parser.add_argument(
+        "--flows",
+        default=",".join(DEFAULT_FLOWS),
+        help=f"Flujos separados por coma ({', '.join(FLOWS)})"
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Workers concurrentes")
+    parser.add_argument("--rps", type=float, help="Objetivo de flujos por segundo (por defecto, sin límite)")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos medidos")
+    parser.add_argument("--warmup", type=float, default=5, help="Segundos de calentamiento no medidos")
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.0,
+        help="Tasa de error por flujo tolerada antes de salir con código 1 (0-1)"
+    )
+    parser.add_argument("--json", default="load-report.json", help="Archivo JSON de salida")
+    parser.add_argument("--prom", default="load-report.prom", help="Archivo de texto Prometheus de salida")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    runner = LoadRunner(
+        flows=[flow.strip() for flow in args.flows.split(",") if flow.strip()],
+        concurrency=args.concurrency,
+        duration=args.duration,
+        warmup=args.warmup,
+        rps=args.rps
+    )
+
+    rate = f"{args.rps:g} flujos/s" if args.rps else "sin límite"
+    print(f"🚀 Carga: {', '.join(runner.flows)} | {runner.concurrency} workers | {rate} | "
+          f"{args.warmup:g}s warmup + {args.duration:g}s")
+
+    report = runner.run()
+    print_report(report)
+
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
+    with open(args.prom, "w") as f:
+        f.write(to_prometheus(report))
+    print(f"💾 Reporte guardado en {args.json} y {args.prom}")
+
+    over_budget = [
+        flow for flow, stats in report["flows"].items() if stats["error_rate"] > args.max_error_rate
+    ]
+    if over_budget:
+        print(f"❌ Tasa de error por encima de {args.max_error_rate:.1%}: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
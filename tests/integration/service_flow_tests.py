@@ -6,77 +6,304 @@ Proyecto Acompañamiento - Sistema de Gestión Educativa
 Ejecuta pruebas completas de todos los servicios y flujos
 """
 
+import argparse
 import requests
 import json
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict, List, Tuple, Optional
+from urllib.parse import urlparse
 import subprocess
+from pathlib import Path
 
-# Configuración de instancias
-INSTANCES = {
-    'core': '3.236.99.88',
-    'api_gateway': '98.86.94.92',
-    'messaging': '35.172.111.207',
-    'db': '13.217.220.8',
-    'notifications': '98.92.17.165',
-    'monitoring': '54.205.158.101',
-    'frontend': '52.72.57.10',
-}
+# Topología compartida con el orquestador y el monitor (deployment/topology.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "deployment"))
+import topology
+
+TOPOLOGY = topology.load()
+
+# IP por alias de instancia y puerto por servicio; stub_server los reescribe en el sitio.
+# Una instancia sin IP en .env.generated (scripts/sync-ips-to-config.py) no aparece y sus pruebas fallan
+INSTANCES = TOPOLOGY.instance_ips()
+PORTS = {service: port for service, (_, port) in TOPOLOGY.http_services().items()}
+# Instancia (alias) que aloja cada servicio
+SERVICE_HOSTS = {service: TOPOLOGY.alias(service) for service in PORTS}
+
+
+def service_endpoint(service: str) -> Tuple[Optional[str], int]:
+    return INSTANCES.get(SERVICE_HOSTS[service]), PORTS[service]
+
+
+def service_host(service: str) -> str:
+    ip, port = service_endpoint(service)
+    return f"{ip}:{port}"
+
+
+def service_url(service: str) -> str:
+    ip, port = service_endpoint(service)
+    return f"http://{ip}:{port}"
+
+
+# Pool de conexiones keep-alive: un pool por host, POOL_MAXSIZE conexiones cada uno
+POOL_MAXSIZE = 10
+MAX_WORKERS = 8
 
-# Puertos de servicios
-PORTS = {
-    'api_gateway': 8080,
-    'auth': 5005,
-    'estudiantes': 5002,
-    'maestros': 5001,
-    'notificaciones': 5006,
-    'reportes_estudiantes': 5003,
-    'reportes_maestros': 5004,
-    'analytics': 5007,
-    'monitoring': 5009,
+# Circuit breaker por host (ip:puerto): se abre si falla su health check o tras
+# BREAKER_THRESHOLD errores de conexión seguidos, y las pruebas que lo necesitan
+# se omiten sin enviar peticiones
+BREAKER_THRESHOLD = 2
+
+# Atributo de TestSuite -> prueba que lo obtiene (para explicar las omisiones)
+PRODUCERS = {
+    'auth_token': "Auth: Login maestro",
+    'student_id': "Estudiantes: CREATE",
+    'teacher_id': "Maestros: CREATE",
+    'report_id': "Reportes: GENERATE",
 }
 
+
 class TestResult:
-    def __init__(self, name: str, status: bool, message: str = "", duration: float = 0):
+    def __init__(self, name: str, status: bool, message: str = "", duration: float = 0, skipped: bool = False):
         self.name = name
         self.status = status
         self.message = message
         self.duration = duration
+        self.skipped = skipped
         self.timestamp = datetime.now()
 
     def __repr__(self):
-        icon = "✅" if self.status else "❌"
+        icon = "⏭️ " if self.skipped else "✅" if self.status else "❌"
         return f"{icon} {self.name} ({self.duration:.2f}s) - {self.message}"
 
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "status": "skipped" if self.skipped else "passed" if self.status else "failed",
+            "message": self.message,
+            "duration": round(self.duration, 4),
+            "timestamp": self.timestamp.isoformat(),
+        }
+
+
+class CircuitBreaker:
+    """Estado de cada host alimentado por los health checks y los errores de conexión"""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD):
+        self.threshold = threshold
+        self.errors: Dict[str, int] = {}
+        # host -> causa de la apertura
+        self.causes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def open(self, host: str, cause: str):
+        with self._lock:
+            self.causes.setdefault(host, cause)
+
+    def record_error(self, host: str, error: Exception):
+        with self._lock:
+            self.errors[host] = self.errors.get(host, 0) + 1
+            if self.errors[host] >= self.threshold:
+                self.causes.setdefault(host, f"{self.errors[host]} errores de conexión seguidos ({error})")
+
+    def record_success(self, host: str):
+        with self._lock:
+            self.errors[host] = 0
+
+    def cause(self, host: str) -> Optional[str]:
+        with self._lock:
+            return self.causes.get(host)
+
+
+# Servicios que atraviesan las pruebas de estudiantes y maestros (vía el gateway)
+STUDENT_SERVICES = ("api_gateway", "estudiantes")
+TEACHER_SERVICES = ("api_gateway", "maestros")
+
+# Health checks: nombre en el reporte -> servicio
+HEALTH_CHECKS = [
+    ("API Gateway", "api_gateway"),
+    ("Auth Service", "auth"),
+    ("Estudiantes", "estudiantes"),
+    ("Maestros", "maestros"),
+    ("Notificaciones", "notificaciones"),
+    ("Reportes Estudiantes", "reportes_estudiantes"),
+    ("Reportes Maestros", "reportes_maestros"),
+    ("Analytics", "analytics"),
+]
+
+# Servicios que ejercita cada paso de build_steps. Un paso también depende de los
+# servicios de los pasos que lo preceden (todos pasan por el login de auth)
+STEP_SERVICES = {
+    "auth_login": ("auth",),
+    "auth_validate": ("auth",),
+    "auth_rbac": ("auth",),
+    "student_create": STUDENT_SERVICES,
+    "student_read": STUDENT_SERVICES,
+    "student_update": STUDENT_SERVICES,
+    "student_list": STUDENT_SERVICES,
+    "teacher_create": TEACHER_SERVICES,
+    "teacher_read": TEACHER_SERVICES,
+    "teacher_list": TEACHER_SERVICES,
+    "notification_send": ("notificaciones",),
+    "notification_get": ("notificaciones",),
+    "report_generate": ("reportes_estudiantes",),
+    "report_query": ("reportes_estudiantes",),
+    "analytics_metrics": ("analytics",),
+}
+
+# Paso ejecutable por run_steps: (clave, función, claves de las que depende)
+Step = Tuple[str, Callable[[], None], List[str]]
+
 
 class TestSuite:
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        session: Optional[requests.Session] = None,
+        verbose: bool = True,
+        fail_fast: bool = True,
+        services: Optional[List[str]] = None
+    ):
         self.results: List[TestResult] = []
         self.auth_token: Optional[str] = None
         self.student_id: Optional[str] = None
         self.teacher_id: Optional[str] = None
         self.report_id: Optional[str] = None
         self.timeout = 10
+        self.max_workers = max(1, max_workers)
+        self.session = session or self.build_session(pool_maxsize)
+        self.verbose = verbose
+        # Sin fail_fast (carga y benchmark) cada prueba envía sus peticiones aunque el host esté caído
+        self.breaker = CircuitBreaker() if fail_fast else None
+        # Si se indica, sólo se ejecutan los pasos (y health checks) afectados por estos servicios
+        self.services = set(services) if services is not None else None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build_session(pool_maxsize: int, session_cls=requests.Session) -> requests.Session:
+        """Sesión compartida con conexiones keep-alive reutilizadas por host"""
+        session = session_cls()
+        adapter = HTTPAdapter(
+            pool_connections=len(set(INSTANCES.values())),
+            pool_maxsize=pool_maxsize
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def run_test(
+        self,
+        name: str,
+        test_fn,
+        services: Tuple[str, ...] = (),
+        requires: Tuple[str, ...] = ()
+    ) -> TestResult:
+        """Ejecuta un test y registra el resultado
+
+        ``services`` son los servicios a los que llega la prueba y ``requires``
+        los atributos (auth_token, student_id...) que necesita. Si falta alguno
+        o el breaker de uno de sus hosts está abierto, la prueba se omite sin
+        enviar peticiones y se registra la causa. Un servicio sin IP no es una
+        omisión en cascada sino un host que no se llegó a probar: la prueba
+        cuenta como fallida.
+        """
+        failure = self._missing_ip(services)
+        cause = None if failure else self._skip_cause(services, requires)
+        if failure or cause:
+            result = TestResult(name, False, failure or f"omitida: {cause}", skipped=bool(cause))
+            line = f"🧪 {name}... ❌ {failure}" if failure else f"🧪 {name}... ⏭️  omitida - {cause}"
+            with self._lock:
+                self.results.append(result)
+                if self.verbose:
+                    print(line, flush=True)
+            return result
 
-    def run_test(self, name: str, test_fn) -> TestResult:
-        """Ejecuta un test y registra el resultado"""
         start = time.time()
         try:
-            print(f"🧪 {name}...", end=" ", flush=True)
             test_fn()
             duration = time.time() - start
             result = TestResult(name, True, "OK", duration)
-            self.results.append(result)
-            print(f"✅ ({duration:.2f}s)")
-            return result
+            line = f"🧪 {name}... ✅ ({duration:.2f}s)"
+            if self.breaker:
+                for service in services:
+                    self.breaker.record_success(service_host(service))
         except Exception as e:
             duration = time.time() - start
             result = TestResult(name, False, str(e), duration)
+            line = f"🧪 {name}... ❌ ({duration:.2f}s) - {e}"
+            request = getattr(e, "request", None)
+            if self.breaker and isinstance(e, (requests.ConnectionError, requests.Timeout)) and request is not None:
+                self.breaker.record_error(urlparse(request.url).netloc, e)
+
+        with self._lock:
             self.results.append(result)
-            print(f"❌ ({duration:.2f}s) - {e}")
-            return result
+            if self.verbose:
+                print(line, flush=True)
+        return result
+
+    def _missing_ip(self, services: Tuple[str, ...]) -> Optional[str]:
+        for service in services:
+            if service_endpoint(service)[0] is None:
+                variable = topology.ip_variable(SERVICE_HOSTS[service])
+                return f"{service} sin IP: falta {variable} en {topology.IPS_ENV_FILE} (scripts/sync-ips-to-config.py)"
+        return None
+
+    def _skip_cause(self, services: Tuple[str, ...], requires: Tuple[str, ...]) -> Optional[str]:
+        for attribute in requires:
+            if getattr(self, attribute) is None:
+                producer = PRODUCERS.get(attribute, attribute)
+                with self._lock:
+                    failed = next((r for r in self.results if r.name == producer and not r.status), None)
+                if failed is None:
+                    return f"sin {attribute}: {producer} no lo obtuvo"
+                if failed.skipped:
+                    return f"sin {attribute}: {producer} se omitió"
+                return f"sin {attribute}: {producer} falló ({failed.message})"
+        if self.breaker:
+            for service in services:
+                host = service_host(service)
+                cause = self.breaker.cause(host)
+                if cause:
+                    return f"{service} ({host}) no disponible: {cause}"
+        return None
+
+    def run_steps(self, steps: List[Step]):
+        """Ejecuta los pasos respetando sus dependencias
+
+        Cada paso se lanza en cuanto terminan todos los pasos de los que
+        depende, con como máximo ``max_workers`` en paralelo. Las dependencias
+        sólo fijan el orden (p. ej. el login antes de usar ``auth_token``);
+        un paso fallido no impide ejecutar los siguientes.
+        """
+        keys = {key for key, _, _ in steps}
+        for key, _, deps in steps:
+            unknown = [dep for dep in deps if dep not in keys]
+            if unknown:
+                raise ValueError(f"{key} depende de pasos desconocidos: {', '.join(unknown)}")
+
+        pending = list(steps)
+        completed = set()
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for step in list(pending):
+                    key, fn, deps = step
+                    if all(dep in completed for dep in deps):
+                        pending.remove(step)
+                        running[executor.submit(fn)] = key
+
+                if not running:
+                    raise ValueError(f"Dependencia circular entre: {', '.join(key for key, _, _ in pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    completed.add(running.pop(future))
+                    future.result()
 
     def print_summary(self):
         """Imprime resumen de resultados"""
@@ -88,51 +315,70 @@ class TestSuite:
             print(result)
 
         passed = sum(1 for r in self.results if r.status)
-        failed = sum(1 for r in self.results if not r.status)
+        skipped = sum(1 for r in self.results if r.skipped)
+        failed = len(self.results) - passed - skipped
         total = len(self.results)
         success_rate = (passed / total * 100) if total > 0 else 0
 
         print("\n" + "-" * 100)
-        print(f"✅ Pasadas: {passed} | ❌ Fallidas: {failed} | 📊 Total: {total}")
+        print(f"✅ Pasadas: {passed} | ❌ Fallidas: {failed} | ⏭️  Omitidas: {skipped} | 📊 Total: {total}")
         print(f"🎯 Tasa de éxito: {success_rate:.2f}%")
         print("=" * 100 + "\n")
 
         return passed, failed
 
+    def write_report(self, path: str, duration: float):
+        """Reporte JSON con el estado de cada prueba y la causa de las omisiones"""
+        report = {
+            "timestamp": datetime.now().isoformat(),
+            "duration": round(duration, 3),
+            "summary": {
+                status: sum(1 for r in self.results if r.to_dict()["status"] == status)
+                for status in ("passed", "failed", "skipped")
+            },
+            "open_hosts": dict(self.breaker.causes) if self.breaker else {},
+            "services": sorted(self.services) if self.services is not None else None,
+            "results": [result.to_dict() for result in self.results],
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Reporte guardado en {path}")
+
     # ================ HEALTH CHECKS ================
 
     def health_check(self, service: str, ip: str, port: int, path: str = "/health"):
         """Verifica que un servicio esté disponible"""
         url = f"http://{ip}:{port}{path}"
-        response = requests.get(url, timeout=self.timeout)
+        response = self.session.get(url, timeout=self.timeout)
         assert response.status_code == 200, f"Status {response.status_code}"
 
-    def test_health_checks(self):
-        """Ejecuta health checks de todos los servicios"""
-        services = [
-            ("API Gateway", INSTANCES['api_gateway'], PORTS['api_gateway']),
-            ("Auth Service", INSTANCES['core'], PORTS['auth']),
-            ("Estudiantes", INSTANCES['core'], PORTS['estudiantes']),
-            ("Maestros", INSTANCES['core'], PORTS['maestros']),
-            ("Notificaciones", INSTANCES['notifications'], PORTS['notificaciones']),
-            ("Reportes Estudiantes", INSTANCES['core'], PORTS['reportes_estudiantes']),
-            ("Reportes Maestros", INSTANCES['core'], PORTS['reportes_maestros']),
-            ("Analytics", INSTANCES['core'], PORTS['analytics']),
+    def health_check_services(self) -> List[Tuple[str, str, str, int]]:
+        """Servicios verificados en la fase de health checks: (nombre en el reporte, servicio, IP, puerto)"""
+        return [
+            (name, service, *service_endpoint(service))
+            for name, service in HEALTH_CHECKS
+            if self.services is None or service in self.checked_services()
         ]
 
-        for service, ip, port in services:
-            self.run_test(
-                f"Health: {service}",
-                lambda s=service, i=ip, p=port: self.health_check(s, i, p)
-            )
+    def test_health_checks(self):
+        """Ejecuta health checks de todos los servicios en paralelo; un fallo abre el breaker del host"""
+        def check(name: str, service: str, ip: str, port: int):
+            result = self.run_test(f"Health: {name}", lambda: self.health_check(name, ip, port), (service,))
+            if self.breaker and ip and not result.status and not result.skipped:
+                self.breaker.open(f"{ip}:{port}", f"falló el health check ({result.message})")
+
+        self.run_steps([
+            (f"health:{service}", lambda n=name, s=service, i=ip, p=port: check(n, s, i, p), [])
+            for name, service, ip, port in self.health_check_services()
+        ])
 
     # ================ AUTHENTICATION ================
 
     def test_auth_login(self):
         """Login de usuario maestro"""
         def auth_login():
-            response = requests.post(
-                f"http://{INSTANCES['core']}:{PORTS['auth']}/login",
+            response = self.session.post(
+                f"{service_url('auth')}/login",
                 json={"email": "maestro@test.com", "password": "Test@123"},
                 timeout=self.timeout
             )
@@ -141,14 +387,13 @@ class TestSuite:
             assert "token" in data, "No token en respuesta"
             self.auth_token = data["token"]
 
-        self.run_test("Auth: Login maestro", auth_login)
+        self.run_test("Auth: Login maestro", auth_login, services=("auth",))
 
     def test_auth_token_validation(self):
         """Valida token JWT"""
         def token_validation():
-            assert self.auth_token, "No hay token para validar"
-            response = requests.post(
-                f"http://{INSTANCES['core']}:{PORTS['auth']}/validate",
+            response = self.session.post(
+                f"{service_url('auth')}/validate",
                 json={"token": self.auth_token},
                 timeout=self.timeout
             )
@@ -156,14 +401,13 @@ class TestSuite:
             data = response.json()
             assert data.get("valid") == True, "Token no válido"
 
-        self.run_test("Auth: Validar token JWT", token_validation)
+        self.run_test("Auth: Validar token JWT", token_validation, services=("auth",), requires=("auth_token",))
 
     def test_auth_rbac(self):
         """Prueba control de acceso basado en roles"""
         def rbac():
-            assert self.auth_token, "No hay token para consultar roles"
-            response = requests.get(
-                f"http://{INSTANCES['core']}:{PORTS['auth']}/roles",
+            response = self.session.get(
+                f"{service_url('auth')}/roles",
                 headers={"Authorization": f"Bearer {self.auth_token}"},
                 timeout=self.timeout
             )
@@ -171,15 +415,15 @@ class TestSuite:
             data = response.json()
             assert isinstance(data.get("roles", []), list), "Roles no es lista"
 
-        self.run_test("Auth: RBAC - Control de roles", rbac)
+        self.run_test("Auth: RBAC - Control de roles", rbac, services=("auth",), requires=("auth_token",))
 
     # ================ STUDENT MANAGEMENT ================
 
     def test_create_student(self):
         """Crea nuevo estudiante"""
         def create():
-            response = requests.post(
-                f"http://{INSTANCES['api_gateway']}:{PORTS['api_gateway']}/api/estudiantes",
+            response = self.session.post(
+                f"{service_url('api_gateway')}/api/estudiantes",
                 json={
                     "nombre": "Juan",
                     "apellido": "Test",
@@ -194,40 +438,38 @@ class TestSuite:
             self.student_id = data.get("id") or data.get("_id")
             assert self.student_id, "No se retornó ID de estudiante"
 
-        self.run_test("Estudiantes: CREATE", create)
+        self.run_test("Estudiantes: CREATE", create, services=STUDENT_SERVICES, requires=("auth_token",))
 
     def test_read_student(self):
         """Lee estudiante creado"""
         def read():
-            assert self.student_id, "No hay studentId"
-            response = requests.get(
-                f"http://{INSTANCES['api_gateway']}:{PORTS['api_gateway']}/api/estudiantes/{self.student_id}",
+            response = self.session.get(
+                f"{service_url('api_gateway')}/api/estudiantes/{self.student_id}",
                 headers={"Authorization": f"Bearer {self.auth_token}"},
                 timeout=self.timeout
             )
             assert response.status_code == 200, f"Status {response.status_code}"
 
-        self.run_test("Estudiantes: READ", read)
+        self.run_test("Estudiantes: READ", read, services=STUDENT_SERVICES, requires=("auth_token", "student_id"))
 
     def test_update_student(self):
         """Actualiza estudiante"""
         def update():
-            assert self.student_id, "No hay studentId"
-            response = requests.put(
-                f"http://{INSTANCES['api_gateway']}:{PORTS['api_gateway']}/api/estudiantes/{self.student_id}",
+            response = self.session.put(
+                f"{service_url('api_gateway')}/api/estudiantes/{self.student_id}",
                 json={"grado": "10B"},
                 headers={"Authorization": f"Bearer {self.auth_token}"},
                 timeout=self.timeout
             )
             assert response.status_code == 200, f"Status {response.status_code}"
 
-        self.run_test("Estudiantes: UPDATE", update)
+        self.run_test("Estudiantes: UPDATE", update, services=STUDENT_SERVICES, requires=("auth_token", "student_id"))
 
     def test_list_students(self):
         """Lista estudiantes"""
         def list_students():
-            response = requests.get(
-                f"http://{INSTANCES['api_gateway']}:{PORTS['api_gateway']}/api/estudiantes",
+            response = self.session.get(
+                f"{service_url('api_gateway')}/api/estudiantes",
                 headers={"Authorization": f"Bearer {self.auth_token}"},
                 timeout=self.timeout
             )
@@ -235,15 +477,15 @@ class TestSuite:
             data = response.json()
             assert isinstance(data, (list, dict)), "Respuesta no es lista o dict"
 
-        self.run_test("Estudiantes: LIST", list_students)
+        self.run_test("Estudiantes: LIST", list_students, services=STUDENT_SERVICES, requires=("auth_token",))
 
     # ================ TEACHER MANAGEMENT ================
 
     def test_create_teacher(self):
         """Crea nuevo maestro"""
         def create():
-            response = requests.post(
-                f"http://{INSTANCES['api_gateway']}:{PORTS['api_gateway']}/api/maestros",
+            response = self.session.post(
+                f"{service_url('api_gateway')}/api/maestros",
                 json={
                     "nombre": "Carlos",
                     "apellido": "Test",
@@ -258,40 +500,39 @@ class TestSuite:
             self.teacher_id = data.get("id") or data.get("_id")
             assert self.teacher_id, "No se retornó ID de maestro"
 
-        self.run_test("Maestros: CREATE", create)
+        self.run_test("Maestros: CREATE", create, services=TEACHER_SERVICES, requires=("auth_token",))
 
     def test_read_teacher(self):
         """Lee maestro creado"""
         def read():
-            assert self.teacher_id, "No hay teacherId"
-            response = requests.get(
-                f"http://{INSTANCES['api_gateway']}:{PORTS['api_gateway']}/api/maestros/{self.teacher_id}",
+            response = self.session.get(
+                f"{service_url('api_gateway')}/api/maestros/{self.teacher_id}",
                 headers={"Authorization": f"Bearer {self.auth_token}"},
                 timeout=self.timeout
             )
             assert response.status_code == 200, f"Status {response.status_code}"
 
-        self.run_test("Maestros: READ", read)
+        self.run_test("Maestros: READ", read, services=TEACHER_SERVICES, requires=("auth_token", "teacher_id"))
 
     def test_list_teachers(self):
         """Lista maestros"""
         def list_teachers():
-            response = requests.get(
-                f"http://{INSTANCES['api_gateway']}:{PORTS['api_gateway']}/api/maestros",
+            response = self.session.get(
+                f"{service_url('api_gateway')}/api/maestros",
                 headers={"Authorization": f"Bearer {self.auth_token}"},
                 timeout=self.timeout
             )
             assert response.status_code == 200, f"Status {response.status_code}"
 
-        self.run_test("Maestros: LIST", list_teachers)
+        self.run_test("Maestros: LIST", list_teachers, services=TEACHER_SERVICES, requires=("auth_token",))
 
     # ================ NOTIFICATIONS ================
 
     def test_send_notification(self):
         """Envía notificación"""
         def send():
-            response = requests.post(
-                f"http://{INSTANCES['notifications']}:{PORTS['notificaciones']}/api/notificaciones",
+            response = self.session.post(
+                f"{service_url('notificaciones')}/api/notificaciones",
                 json={
                     "destinatario": "test@example.com",
                     "asunto": "Test",
@@ -303,27 +544,27 @@ class TestSuite:
             )
             assert response.status_code in [200, 201], f"Status {response.status_code}"
 
-        self.run_test("Notificaciones: SEND", send)
+        self.run_test("Notificaciones: SEND", send, services=("notificaciones",), requires=("auth_token",))
 
     def test_get_notifications(self):
         """Obtiene notificaciones"""
         def get_notif():
-            response = requests.get(
-                f"http://{INSTANCES['notifications']}:{PORTS['notificaciones']}/api/notificaciones",
+            response = self.session.get(
+                f"{service_url('notificaciones')}/api/notificaciones",
                 headers={"Authorization": f"Bearer {self.auth_token}"},
                 timeout=self.timeout
             )
             assert response.status_code == 200, f"Status {response.status_code}"
 
-        self.run_test("Notificaciones: GET", get_notif)
+        self.run_test("Notificaciones: GET", get_notif, services=("notificaciones",), requires=("auth_token",))
 
     # ================ REPORTS ================
 
     def test_generate_report(self):
         """Genera reporte"""
         def generate():
-            response = requests.post(
-                f"http://{INSTANCES['core']}:{PORTS['reportes_estudiantes']}/api/reportes",
+            response = self.session.post(
+                f"{service_url('reportes_estudiantes')}/api/reportes",
                 json={"tipo": "desempeño", "periodo": "2024-Q1"},
                 headers={"Authorization": f"Bearer {self.auth_token}"},
                 timeout=self.timeout
@@ -332,81 +573,195 @@ class TestSuite:
             data = response.json()
             self.report_id = data.get("id") or data.get("reportId")
 
-        self.run_test("Reportes: GENERATE", generate)
+        self.run_test("Reportes: GENERATE", generate, services=("reportes_estudiantes",), requires=("auth_token",))
 
     def test_query_report(self):
         """Consulta reporte"""
         def query():
-            if self.report_id:
-                response = requests.get(
-                    f"http://{INSTANCES['core']}:{PORTS['reportes_estudiantes']}/api/reportes/{self.report_id}",
-                    headers={"Authorization": f"Bearer {self.auth_token}"},
-                    timeout=self.timeout
-                )
-                assert response.status_code == 200, f"Status {response.status_code}"
-            else:
-                raise Exception("No report ID available")
-
-        if self.report_id:
-            self.run_test("Reportes: QUERY", query)
+            response = self.session.get(
+                f"{service_url('reportes_estudiantes')}/api/reportes/{self.report_id}",
+                headers={"Authorization": f"Bearer {self.auth_token}"},
+                timeout=self.timeout
+            )
+            assert response.status_code == 200, f"Status {response.status_code}"
+
+        self.run_test(
+            "Reportes: QUERY",
+            query,
+            services=("reportes_estudiantes",),
+            requires=("auth_token", "report_id")
+        )
 
     # ================ ANALYTICS ================
 
     def test_analytics_metrics(self):
         """Obtiene métricas de analytics"""
         def metrics():
-            response = requests.get(
-                f"http://{INSTANCES['core']}:{PORTS['analytics']}/api/analytics/metrics",
+            response = self.session.get(
+                f"{service_url('analytics')}/api/analytics/metrics",
                 headers={"Authorization": f"Bearer {self.auth_token}"},
                 timeout=self.timeout
             )
             assert response.status_code == 200, f"Status {response.status_code}"
 
-        self.run_test("Analytics: GET METRICS", metrics)
+        self.run_test("Analytics: GET METRICS", metrics, services=("analytics",), requires=("auth_token",))
 
     # ================ EXECUTE ALL ================
 
-    def run_all(self):
-        """Ejecuta toda la suite"""
+    def build_steps(self) -> List[Step]:
+        """Grafo de pruebas: los LIST y las fases de notificaciones y
+        analytics son independientes entre sí; sólo se ordenan los pasos que
+        consumen ``auth_token`` o los IDs creados. Los health checks van
+        primero porque alimentan el circuit breaker."""
+        return [
+            ("health", self.test_health_checks, []),
+            ("auth_login", self.test_auth_login, ["health"]),
+            ("auth_validate", self.test_auth_token_validation, ["auth_login"]),
+            ("auth_rbac", self.test_auth_rbac, ["auth_login"]),
+            ("student_create", self.test_create_student, ["auth_login"]),
+            ("student_read", self.test_read_student, ["student_create"]),
+            ("student_update", self.test_update_student, ["student_read"]),
+            ("student_list", self.test_list_students, ["auth_login"]),
+            ("teacher_create", self.test_create_teacher, ["auth_login"]),
+            ("teacher_read", self.test_read_teacher, ["teacher_create"]),
+            ("teacher_list", self.test_list_teachers, ["auth_login"]),
+            ("notification_send", self.test_send_notification, ["auth_login"]),
+            ("notification_get", self.test_get_notifications, ["auth_login"]),
+            ("report_generate", self.test_generate_report, ["auth_login"]),
+            ("report_query", self.test_query_report, ["report_generate"]),
+            ("analytics_metrics", self.test_analytics_metrics, ["auth_login"]),
+        ]
+
+    def selected_keys(self, steps: List[Step]) -> set:
+        """Pasos afectados por ``self.services`` y los pasos de los que dependen
+
+        Un paso está afectado si ``self.services`` incluye un servicio que usa
+        él o cualquier paso previo: un cambio en auth afecta a todos los
+        flujos, uno en notificaciones sólo a los de notificaciones (que
+        además necesitan el login para ejecutarse).
+        """
+        dependencies = {key: deps for key, _, deps in steps}
+        uses: Dict[str, set] = {}
+
+        def services_used(key: str) -> set:
+            if key not in uses:
+                uses[key] = set(STEP_SERVICES.get(key, ())).union(*map(services_used, dependencies[key]))
+            return uses[key]
+
+        selected = {key for key in dependencies if services_used(key) & self.services}
+        if not selected and not any(service in self.services for _, service in HEALTH_CHECKS):
+            return set()
+        selected.add("health")
+        pending = list(selected)
+        while pending:
+            for dep in dependencies[pending.pop()]:
+                if dep not in selected:
+                    selected.add(dep)
+                    pending.append(dep)
+        return selected
+
+    def select_steps(self, steps: List[Step]) -> List[Step]:
+        if self.services is None:
+            return steps
+        selected = self.selected_keys(steps)
+        return [step for step in steps if step[0] in selected]
+
+    def checked_services(self) -> set:
+        """Servicios seleccionados y los que usan sus pasos (auth para el login)"""
+        selected = self.selected_keys(self.build_steps())
+        return self.services.union(*(STEP_SERVICES.get(key, ()) for key in selected))
+
+    def describe_selection(self):
+        if self.services is None:
+            return
+        affected = sorted(service for service in self.services if service in PORTS)
+        print(f"🎯 Servicios afectados: {', '.join(affected) or 'ninguno con pruebas'}")
+
+    def run_all(self, report: Optional[str] = None):
+        """Ejecuta toda la suite; con ``report`` guarda además el resultado en JSON"""
         print("\n" + "=" * 100)
         print("🚀 INICIANDO SUITE DE PRUEBAS - MICROSERVICIOS")
         print("=" * 100 + "\n")
 
-        print("📋 FASE 1: Health Checks")
-        self.test_health_checks()
-
-        print("\n📋 FASE 2: Autenticación")
-        self.test_auth_login()
-        self.test_auth_token_validation()
-        self.test_auth_rbac()
-
-        print("\n📋 FASE 3: Gestión de Estudiantes")
-        self.test_create_student()
-        self.test_read_student()
-        self.test_update_student()
-        self.test_list_students()
-
-        print("\n📋 FASE 4: Gestión de Maestros")
-        self.test_create_teacher()
-        self.test_read_teacher()
-        self.test_list_teachers()
-
-        print("\n📋 FASE 5: Notificaciones")
-        self.test_send_notification()
-        self.test_get_notifications()
+        steps = self.select_steps(self.build_steps())
+        self.describe_selection()
+        if not steps:
+            print("ℹ️  El cambio no afecta a ningún flujo; no hay pruebas que ejecutar")
+            return 0
+        mode = "secuencial" if self.max_workers == 1 else f"paralelo, máx. {self.max_workers}"
+        print(f"📋 Ejecutando {len(steps)} grupos de pruebas ({mode})\n")
 
-        print("\n📋 FASE 6: Reportes")
-        self.test_generate_report()
-        self.test_query_report()
-
-        print("\n📋 FASE 7: Analytics")
-        self.test_analytics_metrics()
+        start = time.time()
+        try:
+            self.run_steps(steps)
+        finally:
+            self.session.close()
+        duration = time.time() - start
+        print(f"\n⏱️  Duración total: {duration:.2f}s")
 
         passed, failed = self.print_summary()
+        if report:
+            self.write_report(report, duration)
         return 0 if failed == 0 else 1
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Suite de pruebas de flujos de microservicios")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MAX_WORKERS,
+        help="Pruebas independientes ejecutadas en paralelo (1 = secuencial)"
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=POOL_MAXSIZE,
+        help="Conexiones keep-alive por host"
+    )
+    parser.add_argument(
+        "--no-fail-fast",
+        action="store_true",
+        help="Ejecutar todas las pruebas aunque su host no responda (sin circuit breaker)"
+    )
+    parser.add_argument("--report", help="Guardar el resultado de cada prueba en un archivo JSON")
+    parser.add_argument(
+        "--services",
+        help=f"Ejecutar sólo las pruebas afectadas por estos servicios, separados por coma ({', '.join(PORTS)})"
+    )
+    parser.add_argument(
+        "--changed-instances",
+        help="Instancias redesplegadas (tag, alias o docker-compose), separadas por coma: "
+             "se ejecutan sólo las pruebas de sus servicios y de los que dependen de ellos"
+    )
+    return parser.parse_args()
+
+
+def split_list(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def affected_services(services: List[str], changed_instances: List[str]) -> Optional[List[str]]:
+    """Servicios a probar según --services y --changed-instances (None = todos)"""
+    if not services and not changed_instances:
+        return None
+    unknown = [service for service in services if service not in PORTS]
+    tags = [TOPOLOGY.instance_tag(instance) for instance in changed_instances]
+    unknown += [instance for instance, tag in zip(changed_instances, tags) if tag is None]
+    if unknown:
+        print(f"❌ Servicios o instancias desconocidos: {', '.join(unknown)}")
+        sys.exit(2)
+    return sorted(TOPOLOGY.impacted_services(tags) | set(services))
+
+
 if __name__ == "__main__":
-    suite = TestSuite()
-    exit_code = suite.run_all()
+    args = parse_args()
+    services = affected_services(split_list(args.services), split_list(args.changed_instances))
+    suite = TestSuite(
+        max_workers=args.workers,
+        pool_maxsize=args.pool_size,
+        fail_fast=not args.no_fail_fast,
+        services=services
+    )
+    exit_code = suite.run_all(report=args.report)
     sys.exit(exit_code)
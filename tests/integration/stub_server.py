@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Servidor stub local para la Suite de Flujos de Microservicios
+Proyecto Acompañamiento - Sistema de Gestión Educativa
+
+Responde a todas las rutas que usa service_flow_tests.TestSuite con una
+latencia fija y configurable, de modo que los benchmarks sean deterministas
+en CI sin depender de las instancias EC2.
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+
+import service_flow_tests
+
+DEFAULT_LATENCY = 0.02
+# Las altas de recursos responden 201; el resto de POST (login, validate) son consultas y responden 200
+CREATED_PREFIXES = ("/api/",)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Respuesta JSON genérica que satisface las aserciones de TestSuite"""
+
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo van en escrituras separadas; sin esto el ACK retardado añade ~40ms
+    disable_nagle_algorithm = True
+
+    def _respond(self, status: int):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        time.sleep(self.server.latency_for(self.command, self.path))
+
+        body = json.dumps({
+            "id": uuid.uuid4().hex[:24],
+            "token": "stub-token",
+            "valid": True,
+            "roles": ["maestro"],
+            "items": [],
+        }).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(200)
+
+    def do_PUT(self):
+        self._respond(200)
+
+    def do_POST(self):
+        self._respond(201 if self.path.startswith(CREATED_PREFIXES) else 200)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, latency: float, route_latency: Optional[Dict[str, float]] = None):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.latency = latency
+        # Prefijo "MÉTODO /ruta" -> latencia (segundos), para simular endpoints lentos
+        self.route_latency = route_latency or {}
+
+    def latency_for(self, method: str, path: str) -> float:
+        for prefix, latency in self.route_latency.items():
+            if f"{method} {path}".startswith(prefix):
+                return latency
+        return self.latency
+
+
+def start_stub_servers(
+    services: List[str],
+    latency: float = DEFAULT_LATENCY,
+    route_latency: Optional[Dict[str, float]] = None,
+    ports: Optional[Dict[str, int]] = None
+) -> Dict[str, StubServer]:
+    """Arranca un stub por servicio (puerto efímero salvo que se indique ``ports``)"""
+    servers = {}
+    for service in services:
+        server = StubServer((ports or {}).get(service, 0), latency, route_latency)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[service] = server
+    return servers
+
+
+@contextmanager
+def stubbed_topology(
+    latency: float = DEFAULT_LATENCY,
+    route_latency: Optional[Dict[str, float]] = None
+) -> Iterator[Dict[str, StubServer]]:
+    """Redirige INSTANCES y PORTS de service_flow_tests a stubs locales mientras dure el bloque"""
+    original_instances = dict(service_flow_tests.INSTANCES)
+    original_ports = dict(service_flow_tests.PORTS)
+    servers = start_stub_servers(list(original_ports), latency, route_latency)
+    try:
+        # También las instancias sin IP en .env.generated: en local todas responden en 127.0.0.1
+        for name in set(service_flow_tests.SERVICE_HOSTS.values()):
+            service_flow_tests.INSTANCES[name] = "127.0.0.1"
+        for service, server in servers.items():
+            service_flow_tests.PORTS[service] = server.server_address[1]
+        yield servers
+    finally:
+        for server in servers.values():
+            server.shutdown()
+            server.server_close()
+        service_flow_tests.INSTANCES.clear()
+        service_flow_tests.INSTANCES.update(original_instances)
+        service_flow_tests.PORTS.update(original_ports)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local de los microservicios (puertos de PORTS en 127.0.0.1)")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY * 1000, help="Latencia por respuesta")
+    args = parser.parse_args()
+
+    servers = start_stub_servers(
+        list(service_flow_tests.PORTS),
+        latency=args.latency_ms / 1000,
+        ports=service_flow_tests.PORTS
+    )
+    for service, server in servers.items():
+        print(f"🧩 {service}: http://127.0.0.1:{server.server_address[1]}")
+    print("Ctrl+C para detener")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("yaml")
+
+import service_flow_tests
+import stub_server
+
+
+def test_run_all_passes_against_stub_topology(capsys):
+    with stub_server.stubbed_topology(latency=0):
+        suite = service_flow_tests.TestSuite(verbose=False)
+        assert suite.run_all() == 0
+    health = {result.name for result in suite.results if result.name.startswith("Health: ")}
+    assert health == {f"Health: {name}" for name, _ in service_flow_tests.HEALTH_CHECKS}
+    assert all(result.status for result in suite.results)
+
+
+def test_changed_instances_selects_health_checks_by_service(capsys):
+    services = service_flow_tests.affected_services([], ["EC2-Notificaciones"])
+    with stub_server.stubbed_topology(latency=0):
+        suite = service_flow_tests.TestSuite(verbose=False, services=services)
+        assert suite.run_all() == 0
+    names = {result.name for result in suite.results}
+    assert {"Health: Notificaciones", "Health: Auth Service", "Notificaciones: SEND"} <= names
+    assert "Health: Maestros" not in names
+
+
+def test_services_without_ip_fail_the_run(capsys):
+    with stub_server.stubbed_topology(latency=0):
+        del service_flow_tests.INSTANCES["reportes"]
+        suite = service_flow_tests.TestSuite(verbose=False)
+        assert suite.run_all() == 1
+    failed = {result.name: result for result in suite.results if not result.status}
+    assert set(failed) == {"Health: Reportes Estudiantes", "Health: Reportes Maestros", "Reportes: GENERATE", "Reportes: QUERY"}
+    assert not any(result.skipped for result in failed.values())
+    assert all("falta REPORTES_IP" in result.message for result in failed.values())
+    assert "reportes" in service_flow_tests.INSTANCES
+
+
+def test_only_cascade_skips_keep_exit_code_zero():
+    suite = service_flow_tests.TestSuite(verbose=False)
+    suite.results = [
+        service_flow_tests.TestResult("Reportes: GENERATE", True, "OK"),
+        service_flow_tests.TestResult("Reportes: QUERY", False, "omitida: sin report_id", skipped=True),
+    ]
+    assert suite.print_summary() == (1, 0)